@@ -22,12 +22,71 @@ interface FormJournalProps {
     onAnalysisComplete?: (analysis: JournalAnalysis, journalText: string) => void;
 }
 
+type StreamedFields = Partial<Record<keyof JournalAnalysis, string>>;
+
 const API_URL = "http://localhost:8000"
 
+// Reads the server-sent events of /analyze-journal/stream: `field` events carry
+// the text the model is writing, the final `result` event the saved entry
+const streamAnalysis = async (
+    token: string,
+    journalText: string,
+    onField: (field: keyof JournalAnalysis, delta: string) => void
+): Promise<JournalAnalysis> => {
+    const response = await fetch(`${API_URL}/analyze-journal/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+            Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify({
+            journal_text: journalText
+        })
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Streaming request failed: ${response.status} ${response.statusText}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value, { stream: !done });
+
+        let boundary: number;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = "message";
+            const data: string[] = [];
+            for (const line of block.split("\n")) {
+                if (line.startsWith("event:")) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith("data:")) {
+                    data.push(line.slice(5).replace(/^ /, ""));
+                }
+            }
+            if (event === "field") {
+                const { field, delta } = JSON.parse(data.join("\n"));
+                onField(field, delta);
+            } else if (event === "result") {
+                return JSON.parse(data.join("\n"));
+            }
+        }
+        if (done) {
+            throw new Error("Stream ended before the analysis was saved");
+        }
+    }
+};
+
 export const FormJournal = ({ onAnalysisComplete }: FormJournalProps) => {
     const [journal, setJournal] = useState<string>("");
     const [loading, setLoading] = useState<boolean>(false);
     const [error, setError] = useState<string>("");
+    const [streamed, setStreamed] = useState<StreamedFields | null>(null);
     const { getAccessTokenSilently } = useAuth0();
 
     const handleSubmit = async (event: React.FormEvent<HTMLFormElement>) => {
@@ -41,37 +100,47 @@ export const FormJournal = ({ onAnalysisComplete }: FormJournalProps) => {
                     audience: "http://localhost:8000",
                 }
             });
-            const response = await fetch(`${API_URL}/analyze-journal`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    Authorization: `Bearer ${token}`,
-                },
-                body: JSON.stringify({
-                    journal_text: journal
-                })
-            });
-            
-            if (response.ok) {
-                const data = await response.json();
-                
-                // Call the callback to save the analysis
-                if (onAnalysisComplete) {
-                    onAnalysisComplete(data, journal);
+            let data: JournalAnalysis;
+            try {
+                setStreamed({});
+                data = await streamAnalysis(token, journal, (field, delta) => {
+                    setStreamed(previous => ({ ...previous, [field]: (previous?.[field] ?? "") + delta }));
+                });
+            } catch (streamError) {
+                // e.g. a proxy that buffers or drops event streams: ask for the whole analysis at once
+                console.warn('Streaming analysis failed, falling back to /analyze-journal:', streamError);
+                setStreamed(null);
+                const response = await fetch(`${API_URL}/analyze-journal`, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        Authorization: `Bearer ${token}`,
+                    },
+                    body: JSON.stringify({
+                        journal_text: journal
+                    })
+                });
+                if (!response.ok) {
+                    setError('Failed to analyze journal entry. Please try again.');
+                    console.error('Error analyzing journal:', response.statusText);
+                    return;
                 }
-                
-                // Clear the form
-                setJournal("");
-                
-            } else {
-                setError('Failed to analyze journal entry. Please try again.');
-                console.error('Error analyzing journal:', response.statusText);
+                data = await response.json();
             }
+            
+            // Call the callback to save the analysis
+            if (onAnalysisComplete) {
+                onAnalysisComplete(data, journal);
+            }
+            
+            // Clear the form
+            setJournal("");
         } catch (error) {
             setError('Network error. Please check your connection and try again.');
             console.error('Error calling backend:', error);
         } finally {
             setLoading(false);
+            setStreamed(null);
         }
     }
 
@@ -161,6 +230,35 @@ export const FormJournal = ({ onAnalysisComplete }: FormJournalProps) => {
                 </form>
             </Paper>
 
+            {/* Analysis as the model writes it */}
+            {loading && streamed && (streamed.mood || streamed.summary || streamed.reflection) && (
+                <Fade in={true}>
+                    <Paper 
+                        elevation={0} 
+                        sx={{ 
+                            p: 3, 
+                            background: 'rgba(255, 255, 255, 0.8)',
+                            border: '1px solid rgba(99, 102, 241, 0.1)',
+                            borderRadius: 3
+                        }}
+                    >
+                        <Stack spacing={1.5}>
+                            {streamed.mood && (
+                                <Typography variant="subtitle1" sx={{ fontWeight: 600, textTransform: 'capitalize' }}>
+                                    Mood: {streamed.mood}
+                                </Typography>
+                            )}
+                            {streamed.summary && (
+                                <Typography variant="body1">{streamed.summary}</Typography>
+                            )}
+                            {streamed.reflection && (
+                                <Typography variant="body2" color="text.secondary">{streamed.reflection}</Typography>
+                            )}
+                        </Stack>
+                    </Paper>
+                </Fade>
+            )}
+
             {/* Error Message */}
             {error && (
                 <Fade in={!!error}>
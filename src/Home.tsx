@@ -16,6 +16,8 @@ interface JournalEntry {
 }
 
 const API_URL = "http://localhost:8000";
+// JOURNAL_PAGE_SIZE_MAX on the backend
+const JOURNAL_PAGE_SIZE = 200;
 
 const Home = () => {
   const [activeTab, setActiveTab] = useState(0);
@@ -81,32 +83,42 @@ const Home = () => {
           },
         });
 
-        const response = await fetch(`${API_URL}/journal-entries`, {
-          method: "GET",
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-        });
+        // The API returns one page at a time, follow X-Next-Cursor until the last one
+        const data: any[] = [];
+        let cursor: string | null = null;
+        do {
+          const params = new URLSearchParams({ limit: String(JOURNAL_PAGE_SIZE) });
+          if (cursor) {
+            params.set("cursor", cursor);
+          }
+          const response = await fetch(`${API_URL}/journal-entries?${params}`, {
+            method: "GET",
+            headers: {
+              "Content-Type": "application/json",
+              Authorization: `Bearer ${token}`,
+            },
+          });
 
-        if (response.ok) {
-          const data = await response.json();
-          console.log("Fetched journal entries:", data);
-        
-          // Convert the API data to the format expected by the frontend
-          const formattedEntries: JournalEntry[] = data.map((entry: any) => ({
-            id: entry.id.toString(),
-            mood: entry.mood,
-            summary: entry.summary,
-            reflection: entry.reflection,
-            timestamp: entry.created_at ? new Date(entry.created_at).toLocaleString() : new Date().toLocaleString(),
-            journalText: entry.journal_text
-          }));
-        
-          setJournalHistory(formattedEntries);
-        } else {
-          console.error("Failed to fetch journal entries:", response.status, response.statusText);
-        }
+          if (!response.ok) {
+            console.error("Failed to fetch journal entries:", response.status, response.statusText);
+            return;
+          }
+          data.push(...(await response.json()));
+          cursor = response.headers.get("X-Next-Cursor");
+        } while (cursor);
+        console.log("Fetched journal entries:", data);
+
+        // Convert the API data to the format expected by the frontend
+        const formattedEntries: JournalEntry[] = data.map((entry: any) => ({
+          id: entry.id.toString(),
+          mood: entry.mood,
+          summary: entry.summary,
+          reflection: entry.reflection,
+          timestamp: entry.created_at ? new Date(entry.created_at).toLocaleString() : new Date().toLocaleString(),
+          journalText: entry.journal_text
+        }));
+
+        setJournalHistory(formattedEntries);
       } catch (error) {
         console.error(`Error fetching journal from server: ${error}`);
       }
@@ -0,0 +1,69 @@
+"""
+Journal analysis shared by the API endpoints and the background workers.
+
+analyze_text turns journal text into a {mood, summary, reflection} dict, going
+through the analysis cache before calling the LLM. Results are stored with
+repositories.JournalAnalysisRepository.
+"""
+
+import json
+import logging
+import os
+
+from analysis_cache import AnalysisCache, make_cache_key
+from db import AsyncSessionLocal
+from llm_client import AsyncLLMClient
+from metrics import stage_timer
+from prompts import build_analysis_messages
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_MAX_TOKENS = int(os.getenv("ANALYSIS_MAX_TOKENS", "200"))  # Limit tokens to reduce cost
+
+llm_client = AsyncLLMClient(api_key=os.getenv("OPENAI_API_KEY"))
+analysis_cache = AnalysisCache(AsyncSessionLocal)
+
+
+def parse_analysis_output(raw_output):
+    """Parse the model's JSON answer, raises ValueError if it isn't an analysis"""
+    parsed = json.loads(raw_output)
+    if not isinstance(parsed, dict):
+        raise ValueError("Model output is not a JSON object")
+    return {
+        "mood": str(parsed.get("mood", "")),
+        "summary": str(parsed.get("summary", "")),
+        "reflection": str(parsed.get("reflection", "")),
+    }
+
+
+async def analyze_text(journal_text):
+    """Analyze journal_text, reusing a cached result for text we've already seen"""
+    cache_key = make_cache_key(journal_text, llm_client.model)
+    with stage_timer("analysis_cache"):
+        cached = await analysis_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Reusing cached analysis for identical journal text", extra={"sample": True})
+        return cached
+
+    with stage_timer("llm"):
+        raw_output = await llm_client.complete_text(
+            build_analysis_messages(journal_text),
+            max_tokens=ANALYSIS_MAX_TOKENS
+        )
+    logger.debug("LLM analysis call succeeded", extra={"sample": True})
+
+    with stage_timer("parse"):
+        parsed = parse_analysis_output(raw_output)
+    await analysis_cache.put(cache_key, llm_client.model, parsed)
+    return parsed
+
+
+def serialize_analysis(entry):
+    return {
+        "id": entry.id,
+        "journal_text": entry.journal_text,
+        "mood": entry.mood,
+        "summary": entry.summary,
+        "reflection": entry.reflection,
+        "created_at": entry.created_at.isoformat() if entry.created_at else None
+    }
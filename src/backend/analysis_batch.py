@@ -0,0 +1,166 @@
+"""
+Batched analysis for imports and backfills (POST /analyze-journal/batch).
+
+Entries already in the analysis cache are reused. The rest are packed several
+per model call while the estimated prompt stays under BATCH_CONTEXT_BUDGET
+tokens, and the packed calls run concurrently up to BATCH_MAX_CONCURRENT_CALLS.
+If a packed call fails or its answer can't be matched back to its entries
+(wrong count, repeated or unknown indexes), those entries fall back to one
+call each. All analyses are then written with a single bulk insert.
+"""
+
+import asyncio
+import json
+import logging
+import os
+
+from analysis import ANALYSIS_MAX_TOKENS, analysis_cache, analyze_text, llm_client, parse_analysis_output
+from analysis_cache import make_cache_key
+from db import AsyncSessionLocal
+from prompts import build_batch_analysis_messages
+from repositories import JournalAnalysisRepository
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ENTRIES = int(os.getenv("BATCH_MAX_ENTRIES", "500"))
+BATCH_MAX_ENTRIES_PER_CALL = int(os.getenv("BATCH_MAX_ENTRIES_PER_CALL", "5"))
+BATCH_CONTEXT_BUDGET = int(os.getenv("BATCH_CONTEXT_BUDGET", "3000"))  # Prompt tokens per packed call
+BATCH_MAX_CONCURRENT_CALLS = int(os.getenv("BATCH_MAX_CONCURRENT_CALLS", "4"))
+
+STATUS_OK = "ok"
+STATUS_CACHED = "cached"
+STATUS_FAILED = "failed"
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text, good enough for packing
+    return len(text) // 4 + 1
+
+
+def pack_entries(indexed_texts, budget=BATCH_CONTEXT_BUDGET, max_per_call=BATCH_MAX_ENTRIES_PER_CALL):
+    """Group (index, text) pairs into calls that fit the token budget"""
+    packs = []
+    current = []
+    current_tokens = 0
+    for index, journal_text in indexed_texts:
+        tokens = estimate_tokens(journal_text)
+        if current and (current_tokens + tokens > budget or len(current) >= max_per_call):
+            packs.append(current)
+            current = []
+            current_tokens = 0
+        current.append((index, journal_text))
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def parse_batch_output(raw_output, expected):
+    """Parse a packed answer into a list of analyses in entry order
+
+    Raises ValueError unless every entry gets exactly one analysis.
+    """
+    parsed = json.loads(raw_output)
+    if isinstance(parsed, dict):
+        # Some answers wrap the array, e.g. {"entries": [...]}
+        parsed = next((value for value in parsed.values() if isinstance(value, list)), None)
+    if not isinstance(parsed, list) or len(parsed) != expected:
+        raise ValueError(f"Expected {expected} analyses in batch output")
+
+    results = [None] * expected
+    for position, item in enumerate(parsed):
+        if not isinstance(item, dict):
+            raise ValueError("Batch output item is not an object")
+        index = item.get("index", position)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < expected:
+            raise ValueError(f"Batch output has an invalid index {index!r}")
+        if results[index] is not None:
+            # Guessing which entry the repeat belongs to could attach an analysis to the wrong entry
+            raise ValueError(f"Batch output repeats index {index}")
+        results[index] = parse_analysis_output(json.dumps(item))
+    return results
+
+
+async def _analyze_pack(pack, semaphore):
+    """Analyze one pack, returns {index: parsed or Exception}"""
+    texts = [journal_text for _, journal_text in pack]
+    if len(pack) > 1:
+        try:
+            async with semaphore:
+                raw_output = await llm_client.complete_text(
+                    build_batch_analysis_messages(texts),
+                    max_tokens=ANALYSIS_MAX_TOKENS * len(pack)
+                )
+            analyses = parse_batch_output(raw_output, len(pack))
+            for journal_text, parsed in zip(texts, analyses):
+                await analysis_cache.put(make_cache_key(journal_text, llm_client.model), llm_client.model, parsed)
+            return {index: parsed for (index, _), parsed in zip(pack, analyses)}
+        except Exception as e:
+            # Unparseable or mismatched answers, but also timeouts and API errors on the packed call
+            logger.warning("Packed analysis of %d entries unusable, retrying individually: %s", len(pack), e)
+
+    results = {}
+    for index, journal_text in pack:
+        try:
+            async with semaphore:
+                results[index] = await analyze_text(journal_text)
+        except Exception as e:
+            results[index] = e
+    return results
+
+
+async def analyze_batch(user_id, entries):
+    """Analyze and store entries ([(journal_text, created_at)]), returns the per-entry report"""
+    report = [{"index": index, "status": None} for index in range(len(entries))]
+    analyses = {}
+
+    keys = [make_cache_key(journal_text, llm_client.model) for journal_text, _ in entries]
+    cached_analyses = await analysis_cache.get_many(keys)
+    pending = []
+    for index, (journal_text, _) in enumerate(entries):
+        cached = cached_analyses.get(keys[index])
+        if cached is not None:
+            analyses[index] = cached
+            report[index]["status"] = STATUS_CACHED
+        else:
+            pending.append((index, journal_text))
+
+    packs = pack_entries(pending)
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENT_CALLS)
+    pack_results = await asyncio.gather(
+        *(_analyze_pack(pack, semaphore) for pack in packs),
+        return_exceptions=True
+    )
+    for pack, results in zip(packs, pack_results):
+        for index, _ in pack:
+            outcome = results if isinstance(results, Exception) else results.get(index)
+            if isinstance(outcome, Exception) or outcome is None:
+                report[index]["status"] = STATUS_FAILED
+                report[index]["error"] = str(outcome) if outcome is not None else "No analysis returned"
+            else:
+                analyses[index] = outcome
+                report[index]["status"] = STATUS_OK
+
+    ordered = sorted(analyses)
+    if ordered:
+        ids = await _store_batch(
+            user_id, [(entries[index][0], analyses[index], entries[index][1]) for index in ordered]
+        )
+        for index, entry_id in zip(ordered, ids):
+            parsed = analyses[index]
+            report[index].update(id=entry_id, mood=parsed["mood"], summary=parsed["summary"], reflection=parsed["reflection"])
+
+    failed = sum(1 for item in report if item["status"] == STATUS_FAILED)
+    return {
+        "total": len(entries),
+        "succeeded": len(entries) - failed,
+        "failed": failed,
+        "results": report,
+    }
+
+
+async def _store_batch(user_id, items):
+    async with AsyncSessionLocal() as session:
+        ids = await JournalAnalysisRepository(session).add_many(user_id, items)
+        await session.commit()
+        return ids
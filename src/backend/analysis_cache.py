@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of journal analyses.
+
+Resubmitted entries (drafts, retries after a timeout, double-clicks) reuse the
+stored mood/summary/reflection instead of paying for another LLM call. The key
+is a SHA-256 of the normalized journal text plus the model name and
+ANALYSIS_PROMPT_VERSION. Results are stored durably in the analysis_cache
+table and fronted by an in-process LRU.
+
+When the prompt template changes, bump ANALYSIS_PROMPT_VERSION and run
+    python analysis_cache.py purge
+to delete analyses produced by older prompts.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import AnalysisCacheEntry
+from prompts import ANALYSIS_PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_MAXSIZE = int(os.getenv("ANALYSIS_CACHE_MAXSIZE", "2048"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_journal_text(journal_text):
+    """Collapse differences that don't change the meaning of an entry"""
+    text = unicodedata.normalize("NFKC", journal_text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def make_cache_key(journal_text, model, prompt_version=ANALYSIS_PROMPT_VERSION):
+    material = "\x1f".join([prompt_version, model, normalize_journal_text(journal_text)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """In-memory LRU in front of the analysis_cache table
+
+    session_factory makes AsyncSessions (db.AsyncSessionLocal).
+    """
+
+    def __init__(self, session_factory, maxsize=ANALYSIS_CACHE_MAXSIZE, enabled=ANALYSIS_CACHE_ENABLED):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    async def get(self, key):
+        """Return a cached {mood, summary, reflection} dict or None"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return result
+
+        async with self.session_factory() as session:
+            try:
+                entry = (await session.execute(select(AnalysisCacheEntry).filter_by(cache_key=key))).scalar_one_or_none()
+                if entry is None:
+                    self.misses += 1
+                    return None
+
+                result = {"mood": entry.mood, "summary": entry.summary, "reflection": entry.reflection}
+                entry.hit_count += 1
+                entry.last_used_at = datetime.utcnow()
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.warning("Analysis cache lookup failed: %s", e)
+                return None
+
+        self.db_hits += 1
+        self._remember(key, result)
+        return result
+
+    async def get_many(self, keys):
+        """get for many keys at once, returns {key: result} for the cached ones
+
+        Keys missing from memory are read in a single query.
+        """
+        if not self.enabled:
+            return {}
+
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._memory.get(key)
+                if result is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = result
+            self.memory_hits += len(found)
+        remaining = list({key: None for key in keys if key not in found})
+        if not remaining:
+            return found
+
+        async with self.session_factory() as session:
+            try:
+                rows = (await session.execute(
+                    select(
+                        AnalysisCacheEntry.cache_key, AnalysisCacheEntry.mood,
+                        AnalysisCacheEntry.summary, AnalysisCacheEntry.reflection
+                    ).where(AnalysisCacheEntry.cache_key.in_(remaining))
+                )).all()
+                if rows:
+                    await session.execute(
+                        update(AnalysisCacheEntry)
+                        .where(AnalysisCacheEntry.cache_key.in_([row.cache_key for row in rows]))
+                        .values(hit_count=AnalysisCacheEntry.hit_count + 1, last_used_at=datetime.utcnow())
+                    )
+                    await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.warning("Analysis cache lookup failed: %s", e)
+                return found
+
+        for row in rows:
+            result = {"mood": row.mood, "summary": row.summary, "reflection": row.reflection}
+            found[row.cache_key] = result
+            self._remember(row.cache_key, result)
+        self.db_hits += len(rows)
+        self.misses += len(remaining) - len(rows)
+        return found
+
+    async def put(self, key, model, result):
+        """Store a successful analysis under key"""
+        # Never cache malformed model output, the next submission should retry
+        if not self.enabled or not isinstance(result, dict) or not result.get("mood"):
+            return
+
+        result = {
+            "mood": result.get("mood", ""),
+            "summary": result.get("summary", ""),
+            "reflection": result.get("reflection", ""),
+        }
+        self._remember(key, result)
+
+        async with self.session_factory() as session:
+            try:
+                session.add(AnalysisCacheEntry(
+                    cache_key=key,
+                    model=model,
+                    prompt_version=ANALYSIS_PROMPT_VERSION,
+                    **result
+                ))
+                await session.commit()
+            except IntegrityError:
+                # A concurrent request for the same text already stored it
+                await session.rollback()
+            except Exception as e:
+                await session.rollback()
+                logger.warning("Analysis cache write failed: %s", e)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "memory_size": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+def purge_stale_entries(session, prompt_version=ANALYSIS_PROMPT_VERSION):
+    """Delete cached analyses produced by any other prompt version"""
+    deleted = (
+        session.query(AnalysisCacheEntry)
+        .filter(AnalysisCacheEntry.prompt_version != prompt_version)
+        .delete(synchronize_session=False)
+    )
+    session.commit()
+    return deleted
+
+
+def purge_all_entries(session):
+    deleted = session.query(AnalysisCacheEntry).delete(synchronize_session=False)
+    session.commit()
+    return deleted
+
+
+if __name__ == "__main__":
+    import sys
+    from sqlalchemy.orm import sessionmaker
+    from db import engine
+    from migrations import ensure_schema
+
+    if len(sys.argv) > 1 and sys.argv[1] in ("purge", "clear"):
+        ensure_schema()
+        session = sessionmaker(bind=engine)()
+        try:
+            if sys.argv[1] == "purge":
+                deleted = purge_stale_entries(session)
+                print(f"Deleted {deleted} cached analyses from prompt versions other than {ANALYSIS_PROMPT_VERSION}")
+            else:
+                deleted = purge_all_entries(session)
+                print(f"Deleted {deleted} cached analyses")
+        finally:
+            session.close()
+    else:
+        print("Usage:")
+        print("  python analysis_cache.py purge    # Drop analyses from older prompt versions")
+        print("  python analysis_cache.py clear    # Drop every cached analysis")
@@ -0,0 +1,174 @@
+"""
+Streaming journal analysis for POST /analyze-journal/stream.
+
+The model is asked for the same JSON object as /analyze-journal, but tokens
+are forwarded as they arrive. IncrementalAnalysisParser decodes the partial
+JSON and reports text appended to mood/summary/reflection, so the client can
+render the analysis while it is still being generated.
+"""
+
+import json
+
+from analysis import analysis_cache, llm_client, parse_analysis_output, ANALYSIS_MAX_TOKENS
+from analysis_cache import make_cache_key
+from prompts import build_analysis_messages
+
+ANALYSIS_FIELDS = ("mood", "summary", "reflection")
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class IncrementalAnalysisParser:
+    """Character-level parser for a streamed top-level JSON object of string fields"""
+
+    def __init__(self, fields=ANALYSIS_FIELDS):
+        self.fields = fields
+        self.values = {field: "" for field in fields}
+        self.done = False
+
+        self._state = "start"
+        self._key = ""
+        self._field = None
+        self._unicode = ""
+        self._high_surrogate = None
+        # Used to skip values that aren't strings (numbers, nested objects...)
+        self._depth = 0
+        self._in_string = False
+        self._string_escape = False
+
+    def feed(self, chunk):
+        """Consume chunk and return a list of (field, appended_text)"""
+        deltas = []
+
+        def emit(text):
+            if self._field is None:
+                return
+            self.values[self._field] += text
+            if deltas and deltas[-1][0] == self._field:
+                deltas[-1] = (self._field, deltas[-1][1] + text)
+            else:
+                deltas.append((self._field, text))
+
+        for char in chunk:
+            state = self._state
+            if state == "start":
+                # Skip anything before the object, e.g. a ```json fence
+                if char == "{":
+                    self._state = "object"
+            elif state == "object":
+                if char == '"':
+                    self._key = ""
+                    self._state = "key"
+                elif char == "}":
+                    self._state = "done"
+                    self.done = True
+            elif state == "key":
+                if char == "\\":
+                    self._state = "key_escape"
+                elif char == '"':
+                    self._state = "colon"
+                else:
+                    self._key += char
+            elif state == "key_escape":
+                self._key += _ESCAPES.get(char, char)
+                self._state = "key"
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value"
+            elif state == "value":
+                if char == '"':
+                    self._field = self._key if self._key in self.values else None
+                    self._state = "string"
+                elif not char.isspace():
+                    self._depth = 1 if char in "{[" else 0
+                    self._in_string = False
+                    self._string_escape = False
+                    self._state = "other"
+            elif state == "string":
+                if char == "\\":
+                    self._state = "escape"
+                elif char == '"':
+                    self._field = None
+                    self._state = "object"
+                else:
+                    emit(char)
+            elif state == "escape":
+                if char == "u":
+                    self._unicode = ""
+                    self._state = "unicode"
+                else:
+                    emit(_ESCAPES.get(char, char))
+                    self._state = "string"
+            elif state == "unicode":
+                self._unicode += char
+                if len(self._unicode) == 4:
+                    self._state = "string"
+                    emit(self._decode_unicode(self._unicode))
+            elif state == "other":
+                if self._in_string:
+                    if self._string_escape:
+                        self._string_escape = False
+                    elif char == "\\":
+                        self._string_escape = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]" and self._depth > 0:
+                    self._depth -= 1
+                elif self._depth == 0 and char == ",":
+                    self._state = "object"
+                elif self._depth == 0 and char == "}":
+                    self._state = "done"
+                    self.done = True
+
+        return deltas
+
+    def _decode_unicode(self, hex_digits):
+        try:
+            code = int(hex_digits, 16)
+        except ValueError:
+            return ""
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_analysis_events(journal_text):
+    """Yield ("field", {field, delta}) events followed by one ("analysis", parsed) event"""
+    cache_key = make_cache_key(journal_text, llm_client.model)
+    cached = await analysis_cache.get(cache_key)
+    if cached is not None:
+        for field in ANALYSIS_FIELDS:
+            yield "field", {"field": field, "delta": cached.get(field, "")}
+        yield "analysis", cached
+        return
+
+    parser = IncrementalAnalysisParser()
+    raw_chunks = []
+    async for chunk in llm_client.stream_text(build_analysis_messages(journal_text), max_tokens=ANALYSIS_MAX_TOKENS):
+        raw_chunks.append(chunk)
+        for field, delta in parser.feed(chunk):
+            yield "field", {"field": field, "delta": delta}
+
+    raw_output = "".join(raw_chunks)
+    try:
+        parsed = parse_analysis_output(raw_output)
+    except ValueError:
+        # Fenced or slightly malformed JSON still streamed fine, keep what we decoded
+        if not parser.values["mood"]:
+            raise
+        parsed = dict(parser.values)
+
+    await analysis_cache.put(cache_key, llm_client.model, parsed)
+    yield "analysis", parsed
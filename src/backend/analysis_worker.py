@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Background analysis queue backed by the analysis_jobs table.
+
+POST /analysis stores the journal text as a queued job and returns right away.
+Workers claim jobs with a single UPDATE ... RETURNING (using FOR UPDATE SKIP
+LOCKED on PostgreSQL so several workers never claim the same row), run the
+analysis, and save the JournalAnalysis row and the job result in one
+transaction. Failed jobs are retried with backoff up to ANALYSIS_JOB_MAX_ATTEMPTS.
+
+The API runs ANALYSIS_WORKER_CONCURRENCY workers in-process by default. Set
+ANALYSIS_WORKERS_IN_PROCESS=false and run this file to scale workers
+separately from the API:
+    python analysis_worker.py
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from analysis import analyze_text, serialize_analysis
+from db import AsyncSessionLocal
+from logging_config import configure_logging, request_id_var
+from models import AnalysisJob
+from repositories import JournalAnalysisRepository
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS_IN_PROCESS = os.getenv("ANALYSIS_WORKERS_IN_PROCESS", "true").lower() == "true"
+ANALYSIS_WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "4"))
+ANALYSIS_WORKER_POLL_INTERVAL = float(os.getenv("ANALYSIS_WORKER_POLL_INTERVAL", "1"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+ANALYSIS_JOB_TIMEOUT = float(os.getenv("ANALYSIS_JOB_TIMEOUT", "300"))  # Running longer than this means the worker died
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+async def enqueue_job(session, user_id, journal_text):
+    job = AnalysisJob(user_id=user_id, journal_text=journal_text, status=JOB_QUEUED)
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def get_job(session, user_id, job_id):
+    return (await session.execute(
+        select(AnalysisJob).where(AnalysisJob.id == job_id, AnalysisJob.user_id == user_id)
+    )).scalar_one_or_none()
+
+
+async def serialize_job(session, job):
+    result = {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "analysis": None,
+    }
+    if job.analysis_id is not None:
+        entry = await JournalAnalysisRepository(session).get_by_id(job.analysis_id)
+        if entry is not None:
+            result["analysis"] = serialize_analysis(entry)
+    return result
+
+
+async def load_job(user_id, job_id):
+    """Serialized job in a short-lived session, or None, for polling outside a request"""
+    async with AsyncSessionLocal() as session:
+        job = await get_job(session, user_id, job_id)
+        return await serialize_job(session, job) if job else None
+
+
+async def claim_next_job(session):
+    """Atomically move the oldest runnable job to running, returns (id, user_id, journal_text) or None"""
+    now = datetime.utcnow()
+    next_job_id = (
+        select(AnalysisJob.id)
+        .where(AnalysisJob.status == JOB_QUEUED, AnalysisJob.available_at <= now)
+        .order_by(AnalysisJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)  # Ignored by SQLite, which serializes writers anyway
+        .scalar_subquery()
+    )
+    claimed = (await session.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == next_job_id, AnalysisJob.status == JOB_QUEUED)
+        .values(status=JOB_RUNNING, started_at=now, updated_at=now, attempts=AnalysisJob.attempts + 1)
+        .returning(AnalysisJob.id, AnalysisJob.user_id, AnalysisJob.journal_text)
+    )).first()
+    await session.commit()
+    return claimed
+
+
+async def complete_job(job_id, user_id, journal_text, parsed):
+    async with AsyncSessionLocal() as session:
+        entry = await JournalAnalysisRepository(session).add(user_id, journal_text, parsed)
+        await session.flush()
+        await session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.id == job_id)
+            .values(status=JOB_DONE, analysis_id=entry.id, error=None, updated_at=datetime.utcnow())
+        )
+        await session.commit()
+        return entry.id
+
+
+async def fail_job(job_id, error):
+    async with AsyncSessionLocal() as session:
+        job = await session.get(AnalysisJob, job_id)
+        if job is None:
+            return
+        job.error = error
+        if job.attempts >= ANALYSIS_JOB_MAX_ATTEMPTS:
+            job.status = JOB_FAILED
+        else:
+            job.status = JOB_QUEUED
+            job.available_at = datetime.utcnow() + timedelta(seconds=5 * 2 ** (job.attempts - 1))
+        await session.commit()
+
+
+async def claim_job():
+    async with AsyncSessionLocal() as session:
+        return await claim_next_job(session)
+
+
+async def requeue_stale_jobs():
+    """Put back jobs left running by a worker that crashed"""
+    async with AsyncSessionLocal() as session:
+        cutoff = datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_TIMEOUT)
+        requeued = (await session.execute(
+            update(AnalysisJob)
+            .where(AnalysisJob.status == JOB_RUNNING, AnalysisJob.started_at < cutoff)
+            .values(status=JOB_QUEUED, available_at=datetime.utcnow())
+        )).rowcount
+        await session.commit()
+        if requeued:
+            logger.warning("Requeued %d stale analysis jobs", requeued)
+        return requeued
+
+
+class AnalysisWorkerPool:
+    """asyncio workers that drain the analysis_jobs table"""
+
+    def __init__(self, concurrency=ANALYSIS_WORKER_CONCURRENCY, poll_interval=ANALYSIS_WORKER_POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup = None
+        self._waiters = {}
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await requeue_stale_jobs()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        logger.info("Started %d analysis workers", self.concurrency)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers, call after enqueueing a job from this process"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait_for_update(self, job_id, timeout):
+        """Wait until a worker in this process finishes job_id, or timeout passes"""
+        event = self._waiters.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            # The job may be running in another process, the caller re-reads the DB
+            self._waiters.pop(job_id, None)
+
+    def _job_finished(self, job_id):
+        event = self._waiters.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _run(self):
+        while True:
+            try:
+                job = await claim_job()
+            except Exception:
+                logger.exception("Failed to claim analysis job")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            await self._process(job)
+
+    async def _process(self, job):
+        job_id, user_id, journal_text = job
+        # Tag the job's log lines (and its LLM call) like a request
+        request_id = request_id_var.set(f"job-{job_id}")
+        try:
+            parsed = await analyze_text(journal_text)
+            await complete_job(job_id, user_id, journal_text, parsed)
+            self.processed += 1
+        except Exception as e:
+            logger.warning("Analysis job failed: %s", e, extra={"job_id": job_id, "user_id": user_id})
+            self.failed += 1
+            try:
+                await fail_job(job_id, str(e))
+            except Exception as db_error:
+                logger.error("Could not record failure for job: %s", db_error, extra={"job_id": job_id})
+        finally:
+            self._job_finished(job_id)
+            request_id_var.reset(request_id)
+
+    def stats(self):
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+
+worker_pool = AnalysisWorkerPool()
+
+
+async def run_standalone():
+    configure_logging()
+    from migrations import check_schema
+
+    await check_schema()
+    await worker_pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker_pool.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_standalone())
+    except KeyboardInterrupt:
+        logger.info("Analysis worker stopped")
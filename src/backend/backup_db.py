@@ -2,77 +2,402 @@
 """
 Database backup script for AI Journal application
 Run this script before making any database changes to backup your data
+
+Tables are streamed with a server-side cursor and written as compressed JSON
+Lines (one row per line) in size-bounded chunk files, so memory use stays flat
+however many journal entries there are. Each backup is a directory:
+
+    backups/20250831_140225/
+        manifest.json
+        users.00000.jsonl.gz
+        journal_analysis.00000.jsonl.gz
+        journal_analysis.00001.jsonl.gz
+        ...
+
+manifest.json lists every table's columns and chunks with their row counts and
+sha256 checksums, restore_db.py reads it back. The directory only gets its
+final name once every chunk and the manifest are written.
+
+`python backup_db.py --incremental` only copies what changed since the newest
+backup in BACKUP_DIR: rows of the tables in INCREMENTAL_COLUMNS whose
+created/updated timestamp is at or after that backup started, plus the
+deletions logged in deleted_rows (see JournalAnalysisRepository.remove).
+Other tables are small or derived and are copied whole. The manifest names
+its base backup, so restore_db.py can replay full + incrementals as a chain.
+
+Settings:
+    BACKUP_DIR=backups
+    BACKUP_COMPRESSION=gzip        # or zstd (needs the zstandard package)
+    BACKUP_CHUNK_ROWS=100000       # rows per chunk file
+    BACKUP_CHUNK_BYTES=67108864    # uncompressed bytes per chunk file
+    BACKUP_FETCH_SIZE=1000         # rows fetched from the cursor at a time
+    BACKUP_INCREMENTAL_OVERLAP=300 # seconds before the previous backup an incremental re-reads
 """
 
-import os
+import base64
+import gzip
+import hashlib
+import importlib.util
+import io
 import json
-from datetime import datetime
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
+import os
+import time
+from datetime import date, datetime, time as time_of_day, timedelta
+from decimal import Decimal
+
+from sqlalchemy import MetaData, Table, create_engine, delete, inspect, select
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def backup_database():
-    """Backup the database to JSON files"""
-    
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_COMPRESSION = os.getenv("BACKUP_COMPRESSION", "gzip").lower()
+BACKUP_CHUNK_ROWS = int(os.getenv("BACKUP_CHUNK_ROWS", "100000"))
+BACKUP_CHUNK_BYTES = int(os.getenv("BACKUP_CHUNK_BYTES", str(64 * 1024 * 1024)))
+BACKUP_FETCH_SIZE = int(os.getenv("BACKUP_FETCH_SIZE", "1000"))
+# Writes still uncommitted when the previous backup took its snapshot carry
+# earlier timestamps; re-reading a window before it picks them up (restores upsert)
+BACKUP_INCREMENTAL_OVERLAP = int(os.getenv("BACKUP_INCREMENTAL_OVERLAP", "300"))
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 2
+
+# Parents before children, which is also the order a restore loads them in
+BACKUP_TABLES = (
+    "users",
+    "journal_analysis",
+    "monthly_summaries",
+    "daily_mood_counts",
+    "analysis_jobs",
+    "analysis_cache",
+    "journal_embeddings",
+)
+
+# Tables an incremental backup copies partially, by the column marking a row's
+# last change (None: every row, for tables without one). Restores upsert these
+# by primary key; tables not listed are copied whole and replace the table.
+INCREMENTAL_COLUMNS = {
+    "users": None,
+    "journal_analysis": "updated_at",
+    "monthly_summaries": "updated_at",
+    "analysis_jobs": "updated_at",
+    "journal_embeddings": "created_at",  # Re-embedding replaces the row, so it is never updated in place
+}
+
+TOMBSTONE_TABLE = "deleted_rows"
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time_of_day)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    return str(value)
+
+
+def encode_row(row):
+    """One row mapping as a JSON Lines record (bytes, newline included)"""
+    return (json.dumps(dict(row), default=_json_default, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _HashingFile:
+    """Write-only file wrapper that checksums and counts what reaches the disk"""
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.bytes_written += len(data)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def open_compressed_writer(fileobj, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=6)
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).stream_writer(fileobj, closefd=False)
+    raise ValueError(f"Unknown backup compression {compression!r}, expected one of {sorted(COMPRESSION_SUFFIXES)}")
+
+
+def open_compressed_reader(path, compression):
+    """Binary reader over a chunk file, used by restores and by verify_backup"""
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        import zstandard
+        # BufferedReader adds the line iteration the raw zstd reader lacks
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+    raise ValueError(f"Unknown backup compression {compression!r}")
+
+
+class ChunkWriter:
+    """Writes one table's rows into numbered chunk files of bounded size"""
+
+    def __init__(self, backup_path, table_name, compression, max_rows=BACKUP_CHUNK_ROWS, max_bytes=BACKUP_CHUNK_BYTES):
+        self.backup_path = backup_path
+        self.table_name = table_name
+        self.compression = compression
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self._raw = None
+        self._writer = None
+        self._rows = 0
+        self._uncompressed_bytes = 0
+
+    def _open(self):
+        name = f"{self.table_name}.{len(self.chunks):05d}.jsonl{COMPRESSION_SUFFIXES[self.compression]}"
+        self._file_name = name
+        self._raw = _HashingFile(os.path.join(self.backup_path, name))
+        self._writer = open_compressed_writer(self._raw, self.compression)
+        self._rows = 0
+        self._uncompressed_bytes = 0
+
+    def _close(self):
+        self._writer.close()
+        self._raw.close()
+        self.chunks.append({
+            "file": self._file_name,
+            "rows": self._rows,
+            "bytes": self._raw.bytes_written,
+            "uncompressed_bytes": self._uncompressed_bytes,
+            "sha256": self._raw.sha256.hexdigest(),
+        })
+        self._writer = self._raw = None
+
+    def write(self, line):
+        if self._writer is None:
+            self._open()
+        self._writer.write(line)
+        self._rows += 1
+        self._uncompressed_bytes += len(line)
+        if self._rows >= self.max_rows or self._uncompressed_bytes >= self.max_bytes:
+            self._close()
+
+    def close(self):
+        if self._writer is not None:
+            self._close()
+        return self.chunks
+
+
+def backup_table(connection, table, backup_path, compression, where=None, fetch_size=BACKUP_FETCH_SIZE, **chunk_options):
+    """Stream one table (or its rows matching where) into chunk files, returns its manifest entry"""
+    # Generated columns (e.g. journal_analysis.search_vector) are recomputed on restore
+    columns = [column for column in table.columns if column.computed is None]
+    order_by = list(table.primary_key.columns) or columns
+    query = select(*columns).order_by(*order_by)
+    if where is not None:
+        query = query.where(where)
+    result = connection.execution_options(stream_results=True, yield_per=fetch_size).execute(query)
+    writer = ChunkWriter(backup_path, table.name, compression, **chunk_options)
+    try:
+        for row in result:
+            writer.write(encode_row(row._mapping))
+    finally:
+        result.close()
+        chunks = writer.close()
+    return {
+        "columns": [column.name for column in columns],
+        "primary_key": [column.name for column in table.primary_key.columns],
+        "rows": sum(chunk["rows"] for chunk in chunks),
+        "chunks": chunks,
+    }
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(backup_path):
+    with open(os.path.join(backup_path, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def latest_backup(backup_dir=BACKUP_DIR):
+    """Manifest of the newest completed backup in backup_dir, or None"""
+    if not os.path.isdir(backup_dir):
+        return None
+    completed = sorted(
+        name for name in os.listdir(backup_dir)
+        if os.path.exists(os.path.join(backup_dir, name, MANIFEST_NAME))
+    )
+    return load_manifest(os.path.join(backup_dir, completed[-1])) if completed else None
+
+
+def _manifest_entries(manifest):
+    entries = list(manifest["tables"].values())
+    if manifest.get("deletions"):
+        entries.append(manifest["deletions"])
+    return entries
+
+
+def verify_backup(backup_path):
+    """Check every chunk against the manifest's checksums and row counts, returns a list of problems"""
+    manifest = load_manifest(backup_path)
+    problems = []
+    for entry in _manifest_entries(manifest):
+        for chunk in entry["chunks"]:
+            path = os.path.join(backup_path, chunk["file"])
+            if not os.path.exists(path):
+                problems.append(f"{chunk['file']}: missing")
+                continue
+            if file_sha256(path) != chunk["sha256"]:
+                problems.append(f"{chunk['file']}: checksum mismatch")
+                continue
+            with open_compressed_reader(path, manifest["compression"]) as reader:
+                rows = sum(1 for _ in reader)
+            if rows != chunk["rows"]:
+                problems.append(f"{chunk['file']}: {rows} rows, manifest says {chunk['rows']}")
+    return problems
+
+
+def backup_database(compression=BACKUP_COMPRESSION, backup_dir=BACKUP_DIR, tables=BACKUP_TABLES, incremental=False):
+    """Back up the database into a new timestamped directory, returns its path
+
+    With incremental=True only changes since the newest backup in backup_dir
+    are written.
+    """
+
     # Get database URL
     DATABASE_URL = os.environ.get("DATABASE_URL")
     if not DATABASE_URL:
         print("DATABASE_URL not found in environment variables!")
-        return
-    
-    # Create engine
+        return None
+
+    if compression not in COMPRESSION_SUFFIXES:
+        print(f"Unknown compression {compression!r}, use one of: {', '.join(COMPRESSION_SUFFIXES)}")
+        return None
+    if compression == "zstd":
+        if importlib.util.find_spec("zstandard") is None:
+            print("zstandard is not installed, falling back to gzip (pip install zstandard)")
+            compression = "gzip"
+
+    base = None
+    if incremental:
+        base = latest_backup(backup_dir)
+        if base is None:
+            print(f"No backup in {backup_dir}/ to base an incremental backup on, take a full backup first")
+            return None
+
     engine = create_engine(DATABASE_URL)
-    
-    # Create backup directory
-    backup_dir = "backups"
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-    
+
     # Create timestamp for backup
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
+    backup_path = os.path.join(backup_dir, timestamp)
+    partial_path = backup_path + ".partial"
+    os.makedirs(partial_path)
+
+    started = time.perf_counter()
+    # Taken before the snapshot: the next incremental copies rows changed from here on
+    created_at = datetime.utcnow()
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "type": "incremental" if incremental else "full",
+        "timestamp": timestamp,
+        "created_at": created_at.isoformat(),
+        "dialect": engine.dialect.name,
+        "compression": compression,
+        "tables": {},
+    }
+    since = None
+    if incremental:
+        since = datetime.fromisoformat(base["created_at"]) - timedelta(seconds=BACKUP_INCREMENTAL_OVERLAP)
+        manifest.update(base=base["timestamp"], since=since.isoformat())
+
     try:
         with engine.connect() as connection:
-            # Backup users table
-            users_result = connection.execute(text("SELECT * FROM users"))
-            users_data = [dict(row._mapping) for row in users_result]
-            
-            with open(f"{backup_dir}/users_{timestamp}.json", "w") as f:
-                json.dump(users_data, f, indent=2, default=str)
-            
-            # Backup journal_analysis table
-            journal_result = connection.execute(text("SELECT * FROM journal_analysis"))
-            journal_data = [dict(row._mapping) for row in journal_result]
-            
-            with open(f"{backup_dir}/journal_analysis_{timestamp}.json", "w") as f:
-                json.dump(journal_data, f, indent=2, default=str)
-            
-            # Backup monthly_summaries table (if it exists)
-            try:
-                summary_result = connection.execute(text("SELECT * FROM monthly_summaries"))
-                summary_data = [dict(row._mapping) for row in summary_result]
-                
-                with open(f"{backup_dir}/monthly_summaries_{timestamp}.json", "w") as f:
-                    json.dump(summary_data, f, indent=2, default=str)
-            except Exception as e:
-                print(f"Monthly summaries table doesn't exist yet: {e}")
-            
-            print(f"Database backup completed successfully!")
-            print(f"Backup files created in {backup_dir}/")
-            print(f"- users_{timestamp}.json")
-            print(f"- journal_analysis_{timestamp}.json")
-            if 'summary_data' in locals():
-                print(f"- monthly_summaries_{timestamp}.json")
-                
-    except Exception as e:
-        print(f"Error backing up database: {e}")
+            if engine.dialect.name == "postgresql":
+                # One snapshot for every table, so rows written mid-backup can't
+                # leave e.g. a journal entry pointing at a user that wasn't copied
+                connection = connection.execution_options(isolation_level="REPEATABLE READ")
+            with connection.begin():
+                existing = set(inspect(connection).get_table_names())
+                for table_name in tables:
+                    if table_name not in existing:
+                        print(f"Skipping {table_name}: table doesn't exist yet")
+                        continue
+                    table = Table(table_name, MetaData(), autoload_with=connection)
+                    where, mode = None, "replace"
+                    if incremental and table_name in INCREMENTAL_COLUMNS:
+                        mode = "upsert"
+                        column = INCREMENTAL_COLUMNS[table_name]
+                        if column is not None and column in table.columns:
+                            where = table.columns[column] >= since
+                    entry = backup_table(connection, table, partial_path, compression, where=where)
+                    entry["mode"] = mode
+                    manifest["tables"][table_name] = entry
+                    print(f"- {table_name}: {entry['rows']} rows in {len(entry['chunks'])} chunk(s)")
 
-if __name__ == "__main__":
-    backup_database()
+                tombstones = None
+                if TOMBSTONE_TABLE in existing:
+                    tombstones = Table(TOMBSTONE_TABLE, MetaData(), autoload_with=connection)
+                if incremental and tombstones is not None:
+                    manifest["deletions"] = backup_table(
+                        connection, tombstones, partial_path, compression,
+                        where=tombstones.columns.deleted_at >= since
+                    )
+                    print(f"- {manifest['deletions']['rows']} deletions")
 
+            if not incremental and tombstones is not None:
+                # Incrementals on top of this backup only need deletions from here on
+                with connection.begin():
+                    connection.execute(delete(tombstones).where(
+                        tombstones.columns.deleted_at < created_at - timedelta(seconds=BACKUP_INCREMENTAL_OVERLAP)
+                    ))
 
+        manifest["total_rows"] = sum(table["rows"] for table in manifest["tables"].values())
+        manifest["duration_seconds"] = round(time.perf_counter() - started, 3)
+        with open(os.path.join(partial_path, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(partial_path, backup_path)
+    except Exception as e:
+        print(f"Error backing up database: {e}")
+        print(f"Incomplete backup left in {partial_path}/")
+        return None
+    finally:
+        engine.dispose()
 
+    print(f"{manifest['type'].capitalize()} database backup completed successfully!")
+    if incremental:
+        print(f"Changes since {manifest['since']} (on top of {manifest['base']})")
+    print(f"{manifest['total_rows']} rows written to {backup_path}/ in {manifest['duration_seconds']}s")
+    return backup_path
 
 
+if __name__ == "__main__":
+    import sys
+
+    args = [arg for arg in sys.argv[1:] if arg != "--incremental"]
+    if len(args) > 1 and args[0] == "verify":
+        problems = verify_backup(args[1])
+        for problem in problems:
+            print(problem)
+        print("Backup is intact" if not problems else f"{len(problems)} problem(s) found")
+        sys.exit(1 if problems else 0)
+    elif not args or args[0] in COMPRESSION_SUFFIXES:
+        path = backup_database(args[0] if args else BACKUP_COMPRESSION, incremental="--incremental" in sys.argv)
+        sys.exit(0 if path else 1)
+    else:
+        print("Usage:")
+        print("  python backup_db.py                          # Full backup with BACKUP_COMPRESSION (gzip)")
+        print("  python backup_db.py zstd                     # Full backup with zstd compression")
+        print("  python backup_db.py --incremental            # Changes since the newest backup")
+        print("  python backup_db.py verify backups/<stamp>   # Check a backup against its manifest")
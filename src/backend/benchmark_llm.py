@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for AsyncLLMClient against the fake LLM server
+
+    python fake_llm_server.py &
+    OPENAI_BASE_URL=http://localhost:8100/v1 python benchmark_llm.py 200
+"""
+
+import asyncio
+import sys
+import time
+
+from llm_client import AsyncLLMClient
+
+
+async def run_benchmark(total_requests):
+    client = AsyncLLMClient()
+    messages = [{"role": "user", "content": "Journal Entry:\nToday was a good day."}]
+
+    latencies = []
+    failures = []
+
+    async def one_request():
+        started = time.perf_counter()
+        try:
+            await client.complete_text(messages, max_tokens=200)
+        except Exception as e:
+            failures.append(e)
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+
+    latencies = sorted(latencies) or [0.0]
+    print(f"Requests:      {total_requests}")
+    print(f"Failed:        {len(failures)}")
+    print(f"Concurrency:   {client.max_concurrency}")
+    print(f"Elapsed:       {elapsed:.2f}s")
+    print(f"Throughput:    {total_requests / elapsed:.1f} req/s")
+    print(f"p50 latency:   {latencies[len(latencies) // 2] * 1000:.0f} ms")
+    print(f"p95 latency:   {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:.0f} ms")
+    print(f"Retries:       {client.retries}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100))
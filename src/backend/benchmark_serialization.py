@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the list endpoints (no database or server needed)
+
+    python benchmark_serialization.py              # 1000 and 10000 entries
+    python benchmark_serialization.py 500 50000
+
+Times turning one page of /journal-entries rows into response bytes three ways:
+
+- jsonable_encoder: the previous path, isoformat() per row, then FastAPI's
+  jsonable_encoder and JSONResponse
+- response_model: FastAPI validating the rows against JournalEntryResponse and
+  serializing them with pydantic
+- orjson: responses.OrjsonResponse, what the endpoints return now
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from responses import JournalEntryResponse, MonthlySummaryResponse, OrjsonResponse
+
+MOODS = ("happy", "calm", "sad", "anxious", "grateful", "stressed")
+
+
+def make_entries(count):
+    now = datetime.utcnow()
+    return [
+        {
+            "id": count - i,
+            "created_at": now - timedelta(hours=i),
+            "journal_text": "Went for a long walk after work and called my sister, felt lighter afterwards. " * 6,
+            "mood": MOODS[i % len(MOODS)],
+            "summary": "An evening walk and a call with family lifted the mood.",
+            "reflection": "Movement and connection seem to help you unwind; keep making room for both. " * 2,
+        }
+        for i in range(count)
+    ]
+
+
+def make_month_summary():
+    return {
+        "month": "2025-08",
+        "daily_data": {f"2025-08-{day:02d}": {mood: day % 4 + 1 for mood in MOODS} for day in range(1, 32)},
+        "monthly_totals": {mood: 80 for mood in MOODS},
+        "total_entries": 480,
+        "user_id": 1,
+    }
+
+
+def time_per_call(serialize, payload, min_seconds=1.0):
+    serialize(payload)  # Warm up
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < min_seconds:
+        serialize(payload)
+        calls += 1
+    return (time.perf_counter() - started) / calls
+
+
+def isoformat_rows(entries):
+    return [dict(entry, created_at=entry["created_at"].isoformat()) for entry in entries]
+
+
+def serializers(model, prepare_for_encoder=lambda payload: payload):
+    adapter = TypeAdapter(model)
+    return [
+        ("jsonable_encoder", lambda payload: JSONResponse(jsonable_encoder(prepare_for_encoder(payload))).body),
+        ("response_model", lambda payload: adapter.dump_json(adapter.validate_python(payload))),
+        ("orjson", lambda payload: OrjsonResponse(payload).body),
+    ]
+
+
+def run_benchmark(sizes):
+    print(f"{'payload':<26}{'serializer':<18}{'per call':>12}{'per 1k entries':>16}")
+    for size in sizes:
+        entries = make_entries(size)
+        for name, serialize in serializers(List[JournalEntryResponse], isoformat_rows):
+            seconds = time_per_call(serialize, entries)
+            print(f"{f'{size} journal entries':<26}{name:<18}{seconds * 1000:>9.2f} ms{seconds * 1e6 / size:>13.1f} ms")
+
+    summary = make_month_summary()
+    for name, serialize in serializers(MonthlySummaryResponse):
+        seconds = time_per_call(serialize, summary)
+        print(f"{'monthly summary':<26}{name:<18}{seconds * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    run_benchmark([int(size) for size in sys.argv[1:]] or [1000, 10000])
@@ -0,0 +1,75 @@
+"""
+Conditional GET (ETag / If-None-Match) for /journal-entries and /monthly-summary.
+
+Each users row carries a data_version that every journal write bumps in the
+same transaction (JournalAnalysisRepository.add, add_many and remove; restores
+and counter rebuilds bump every user they touch). The ETag of a response is
+built from the user, that version and whatever else picks the response apart
+from the URL, so answering a revalidation costs one primary-key read: when
+If-None-Match matches, the handler returns 304 before the page query or the
+serialization runs.
+
+Versions are a millisecond timestamp or the previous version + 1, whichever is
+larger, so they never go backwards, not even after restoring an older backup.
+
+The ETags are weak: they promise the same data, not the same bytes.
+Cache-Control defaults to `private, no-cache`: browsers keep the response but
+revalidate it on every use, shared caches don't store it.
+"""
+
+import os
+import time
+from collections import Counter
+
+from fastapi.responses import Response
+from sqlalchemy import case, update
+
+from models import User as UserModel
+
+HTTP_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+# Part of every ETag; bump it when a response format changes so clients drop old copies
+RESPONSE_FORMAT_VERSION = 1
+
+# (endpoint, "not_modified" or "full") -> responses, for /metrics
+conditional_requests = Counter()
+
+
+def bump_data_version(user_id=None):
+    """UPDATE statement bumping user_id's data_version (every user's if None), the caller commits"""
+    now = int(time.time() * 1000)
+    statement = update(UserModel).values(
+        data_version=case((UserModel.data_version + 1 > now, UserModel.data_version + 1), else_=now)
+    )
+    if user_id is not None:
+        statement = statement.where(UserModel.id == user_id)
+    # No User objects to refresh, the API only caches CachedUser
+    return statement.execution_options(synchronize_session=False)
+
+
+def user_etag(user_id, data_version, *parts):
+    tag = "-".join(str(part) for part in (RESPONSE_FORMAT_VERSION, user_id, data_version, *parts))
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of etag against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def cache_headers(etag):
+    return {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL, "Vary": "Authorization"}
+
+
+def not_modified(endpoint, if_none_match, etag):
+    """A 304 response if the client's copy is current, otherwise None (the caller builds the full response)"""
+    if etag_matches(if_none_match, etag):
+        conditional_requests[(endpoint, "not_modified")] += 1
+        return Response(status_code=304, headers=cache_headers(etag))
+    conditional_requests[(endpoint, "full")] += 1
+    return None
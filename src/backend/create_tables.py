@@ -1,4 +0,0 @@
-from db import engine
-from models.journal_analysis import Base
-
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
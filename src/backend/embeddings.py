@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Embeddings of journal entries and the per-user vector index behind
+GET /journal-entries/{id}/similar.
+
+Each entry's text (journal_text plus its summary) is embedded once, when it is
+written (repositories.JournalAnalysisRepository.add/add_many), and stored in
+journal_embeddings as an L2-normalized float32 blob tagged with the embedder's
+name. The embedder is pluggable (EMBEDDER):
+
+- hashing: deterministic, local and free; hashed word and word-pair counts, so
+  "similar" means sharing vocabulary. Used by default and in tests
+- openai: EMBEDDING_MODEL through the OpenAI API (or OPENAI_BASE_URL),
+  shortened to EMBEDDING_DIMENSIONS
+
+Searching needs no vector service: a user's vectors are read in one query into
+contiguous float32 matrices, one per mood, kept in an in-process LRU
+(VectorIndex), and a search is a matrix-vector product per matrix followed by
+argpartition for the top k (a same-mood search reads only its mood's matrix).
+New entries are appended in place to a cached user's matrices, so they only
+have to be reloaded after VECTOR_CACHE_TTL (other workers' writes) or when
+evicted.
+
+Entries written before embeddings existed, or embedded by a different
+embedder, are filled in with
+
+    python embeddings.py backfill [user_id]
+
+Settings:
+    EMBEDDER=hashing
+    EMBEDDING_DIMENSIONS=128          # openai: text-embedding-3 models shorten their vectors to this
+    EMBEDDING_MODEL=text-embedding-3-small
+    EMBEDDING_BATCH_SIZE=128          # entries per embedding call during backfills
+    VECTOR_CACHE_MAX_VECTORS=1000000  # vectors kept in memory over all users
+    VECTOR_CACHE_TTL=300
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import delete, insert, or_, select
+
+from db import AsyncSessionLocal
+from models import JournalAnalysis as JournalAnalysisModel, JournalEmbedding
+
+logger = logging.getLogger(__name__)
+
+EMBEDDER = os.getenv("EMBEDDER", "hashing")
+# Search time is dominated by reading the matrix: 100k vectors x 128 float32 is 51 MB
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "128"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+VECTOR_CACHE_MAX_VECTORS = int(os.getenv("VECTOR_CACHE_MAX_VECTORS", "1000000"))
+VECTOR_CACHE_TTL = float(os.getenv("VECTOR_CACHE_TTL", "300"))
+
+SIMILAR_DEFAULT_LIMIT = 5
+SIMILAR_MAX_LIMIT = 50
+
+_WORD = re.compile(r"\w+")
+
+
+def entry_text(journal_text, summary):
+    return f"{journal_text or ''}\n{summary or ''}"
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def to_blob(vector):
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def from_blobs(blobs, dimensions):
+    """Stack stored vectors into one (len(blobs), dimensions) float32 matrix"""
+    if not blobs:
+        return np.empty((0, dimensions), dtype=np.float32)
+    return np.frombuffer(b"".join(blobs), dtype="<f4").reshape(len(blobs), dimensions).astype(np.float32)
+
+
+@lru_cache(maxsize=65536)
+def _feature_slot(feature, dimensions):
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    # The top bit picks the sign so colliding features tend to cancel out instead of piling up
+    return digest % dimensions, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """Feature hashing of words and word pairs into a fixed number of dimensions"""
+
+    def __init__(self, dimensions=EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed_sync(self, texts):
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                slot, sign = _feature_slot(feature, self.dimensions)
+                matrix[row, slot] += sign
+        return _normalize(matrix)
+
+    async def embed(self, texts):
+        return self.embed_sync(texts)
+
+
+class OpenAIEmbedder:
+    """EMBEDDING_MODEL through the OpenAI embeddings API"""
+
+    def __init__(self, model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS, client=None):
+        from llm_client import AsyncLLMClient
+
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}:{dimensions}"
+        self.client = client if client is not None else AsyncLLMClient()
+
+    async def embed(self, texts):
+        vectors = await self.client.embed(texts, model=self.model, dimensions=self.dimensions)
+        return _normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def create_embedder(kind=EMBEDDER):
+    if kind == "hashing":
+        return HashingEmbedder()
+    if kind == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Unknown EMBEDDER {kind!r}, expected hashing or openai")
+
+
+embedder = create_embedder()
+
+
+class _VectorBlock:
+    """Entry vectors sorted by id in preallocated arrays that grow by doubling
+
+    Ids only ever grow, so an append writes past the end of what readers can
+    see and then moves `size`; a search keeps working on the (ids, matrix,
+    size) snapshot it took. Removed ids are masked until they make up
+    COMPACT_RATIO of the block, then the block is rebuilt without them. Only
+    an out-of-order id (an entry re-embedded by a backfill) copies the block.
+    """
+
+    COMPACT_RATIO = 0.125
+
+    def __init__(self, ids, matrix):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.size = len(self.ids)
+        self.removed = frozenset()
+
+    def snapshot(self):
+        return self.ids[:self.size], self.matrix[:self.size], self.removed
+
+    def position(self, entry_id):
+        ids = self.ids[:self.size]
+        position = int(np.searchsorted(ids, entry_id))
+        if position < len(ids) and ids[position] == entry_id and entry_id not in self.removed:
+            return position
+        return None
+
+    def live(self):
+        return self.size - len(self.removed)
+
+    def append(self, entry_ids, vectors):
+        entry_ids = np.asarray(entry_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.size and entry_ids[0] <= self.ids[self.size - 1] or np.any(np.diff(entry_ids) <= 0):
+            self._insert_unordered(entry_ids, vectors)
+            return
+        end = self.size + len(entry_ids)
+        if end > len(self.ids):
+            capacity = max(end, 2 * len(self.ids), 16)
+            ids = np.empty(capacity, dtype=np.int64)
+            matrix = np.empty((capacity, self.matrix.shape[1]), dtype=np.float32)
+            ids[:self.size], matrix[:self.size] = self.ids[:self.size], self.matrix[:self.size]
+            self.ids, self.matrix = ids, matrix
+        self.ids[self.size:end], self.matrix[self.size:end] = entry_ids, vectors
+        self.size = end
+
+    def _insert_unordered(self, entry_ids, vectors):
+        ids, matrix, removed = self.snapshot()
+        keep = ~np.isin(ids, entry_ids)
+        if removed:
+            keep &= ~np.isin(ids, list(removed))
+        ids = np.concatenate([ids[keep], entry_ids])
+        order = np.argsort(ids, kind="stable")
+        self.ids, self.matrix = ids[order], np.concatenate([matrix[keep], vectors])[order]
+        self.size, self.removed = len(self.ids), frozenset()
+
+    def remove(self, entry_id):
+        if self.position(entry_id) is None:
+            return False
+        self.removed = self.removed | {entry_id}
+        if len(self.removed) > self.COMPACT_RATIO * self.size:
+            ids, matrix, removed = self.snapshot()
+            keep = ~np.isin(ids, list(removed))
+            self.ids, self.matrix = ids[keep], matrix[keep]
+            self.size, self.removed = len(self.ids), frozenset()
+        return True
+
+
+class UserVectors:
+    """One user's embedded entries, one contiguous block per mood
+
+    A same-mood search reads only that mood's block; a full search reads every
+    block and merges their best k.
+    """
+
+    def __init__(self, ids, moods, matrix):
+        ids = np.asarray(ids, dtype=np.int64)
+        moods = np.asarray(moods, dtype=object)
+        self.dimensions = matrix.shape[1]
+        self._blocks = {mood: _VectorBlock(ids[moods == mood], matrix[moods == mood]) for mood in set(moods.tolist())}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(block.live() for block in self._blocks.values())
+
+    def vector_of(self, entry_id):
+        with self._lock:
+            for block in self._blocks.values():
+                position = block.position(entry_id)
+                if position is not None:
+                    return block.matrix[position].copy()
+        return None
+
+    def append(self, entry_ids, moods, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        moods = np.asarray(moods, dtype=object)
+        entry_ids = np.asarray(entry_ids, dtype=np.int64)
+        with self._lock:
+            for mood in set(moods.tolist()):
+                rows = moods == mood
+                block = self._blocks.get(mood)
+                if block is None:
+                    self._blocks[mood] = _VectorBlock(entry_ids[rows], vectors[rows])
+                else:
+                    block.append(entry_ids[rows], vectors[rows])
+
+    def remove(self, entry_id):
+        with self._lock:
+            for block in self._blocks.values():
+                if block.remove(entry_id):
+                    return
+
+    def top_k(self, vector, k, exclude_id=None, mood=None):
+        """[(entry_id, cosine similarity)] of the k closest entries, closest first"""
+        with self._lock:
+            blocks = self._blocks.values() if mood is None else [self._blocks[mood]] if mood in self._blocks else []
+            snapshots = [block.snapshot() for block in blocks]
+        vector = np.asarray(vector, dtype=np.float32)
+        candidate_ids, candidate_scores = [], []
+        for ids, matrix, removed in snapshots:
+            if not len(ids):
+                continue
+            # Rows are normalized, so the dot product is the cosine similarity
+            scores = matrix @ vector
+            for entry_id in removed | ({exclude_id} if exclude_id is not None else set()):
+                position = np.searchsorted(ids, entry_id)
+                if position < len(ids) and ids[position] == entry_id:
+                    scores[position] = -np.inf
+            block_k = min(k, len(scores))
+            top = np.argpartition(scores, -block_k)[-block_k:]
+            candidate_ids.append(ids[top])
+            candidate_scores.append(scores[top])
+        if not candidate_ids:
+            return []
+        ids, scores = np.concatenate(candidate_ids), np.concatenate(candidate_scores)
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > -np.inf]
+
+
+class VectorIndex:
+    """Process-local LRU of UserVectors, bounded by the total number of vectors"""
+
+    def __init__(self, max_vectors=VECTOR_CACHE_MAX_VECTORS, ttl=VECTOR_CACHE_TTL):
+        self.max_vectors = max_vectors
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, embedder name) -> (expires_at, UserVectors)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, model):
+        key = (user_id, model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id, model, vectors):
+        with self._lock:
+            self._entries[(user_id, model)] = (time.monotonic() + self.ttl, vectors)
+            self._entries.move_to_end((user_id, model))
+            while len(self._entries) > 1 and self.vectors() > self.max_vectors:
+                self._entries.popitem(last=False)
+
+    def add(self, user_id, model, entry_ids, moods, vectors):
+        """Append freshly embedded entries to the user's matrix if it is cached"""
+        with self._lock:
+            entry = self._entries.get((user_id, model))
+        if entry is not None:
+            entry[1].append(entry_ids, moods, vectors)
+
+    def remove(self, user_id, entry_id):
+        with self._lock:
+            cached = [vectors for (cached_user, _), (_, vectors) in self._entries.items() if cached_user == user_id]
+        for vectors in cached:
+            vectors.remove(entry_id)
+
+    def vectors(self):
+        return sum(len(vectors) for _, vectors in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+vector_index = VectorIndex()
+
+
+def user_vectors_query(user_id, model):
+    """A user's stored vectors (and moods, for same-mood searches) in id order"""
+    return (
+        select(JournalEmbedding.analysis_id, JournalAnalysisModel.mood, JournalEmbedding.vector)
+        .join(JournalAnalysisModel, JournalAnalysisModel.id == JournalEmbedding.analysis_id)
+        .where(JournalEmbedding.user_id == user_id, JournalEmbedding.model == model)
+        .order_by(JournalEmbedding.analysis_id)
+    )
+
+
+def build_user_vectors(rows, dimensions):
+    """UserVectors from the rows of user_vectors_query"""
+    return UserVectors(
+        [row.analysis_id for row in rows],
+        [row.mood for row in rows],
+        from_blobs([row.vector for row in rows], dimensions),
+    )
+
+
+def embedding_rows(user_id, entry_ids, vectors, model):
+    return [
+        {"analysis_id": entry_id, "user_id": user_id, "model": model, "vector": to_blob(vector)}
+        for entry_id, vector in zip(entry_ids, vectors)
+    ]
+
+
+def missing_embeddings_query(model, user_id=None, after_id=0, limit=EMBEDDING_BATCH_SIZE):
+    """Entries with no vector from model, in id order"""
+    query = (
+        select(
+            JournalAnalysisModel.id, JournalAnalysisModel.user_id, JournalAnalysisModel.mood,
+            JournalAnalysisModel.journal_text, JournalAnalysisModel.summary,
+        )
+        .outerjoin(JournalEmbedding, JournalEmbedding.analysis_id == JournalAnalysisModel.id)
+        .where(
+            JournalAnalysisModel.id > after_id,
+            JournalAnalysisModel.user_id.is_not(None),
+            or_(JournalEmbedding.analysis_id.is_(None), JournalEmbedding.model != model),
+        )
+        .order_by(JournalAnalysisModel.id)
+        .limit(limit)
+    )
+    if user_id is not None:
+        query = query.where(JournalAnalysisModel.user_id == user_id)
+    return query
+
+
+async def backfill_embeddings(session_factory=AsyncSessionLocal, user_id=None, batch_size=EMBEDDING_BATCH_SIZE,
+                              embedder=embedder):
+    """Embed every entry without a current vector, one call and one commit per batch, returns the count"""
+    done, last_id = 0, 0
+    async with session_factory() as session:
+        while True:
+            rows = (await session.execute(
+                missing_embeddings_query(embedder.name, user_id, last_id, batch_size)
+            )).all()
+            if not rows:
+                break
+            vectors = await embedder.embed([entry_text(row.journal_text, row.summary) for row in rows])
+            ids = [row.id for row in rows]
+            # Replaces vectors left by a previous embedder
+            await session.execute(delete(JournalEmbedding).where(JournalEmbedding.analysis_id.in_(ids)))
+            await session.execute(insert(JournalEmbedding), [
+                {"analysis_id": row.id, "user_id": row.user_id, "model": embedder.name, "vector": to_blob(vector)}
+                for row, vector in zip(rows, vectors)
+            ])
+            await session.commit()
+            done += len(rows)
+            last_id = ids[-1]
+            logger.info("Embedding backfill progress", extra={"entries": done, "last_id": last_id})
+    # Cached matrices may predate the backfill
+    vector_index.clear()
+    return done
+
+
+if __name__ == "__main__":
+    import sys
+    from logging_config import configure_logging
+
+    configure_logging()
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        from migrations import ensure_schema
+
+        ensure_schema()
+        started = time.perf_counter()
+        count = asyncio.run(backfill_embeddings(user_id=int(sys.argv[2]) if len(sys.argv) > 2 else None))
+        print(f"Embedded {count} entries with {embedder.name} in {time.perf_counter() - started:.2f}s")
+    else:
+        print("Usage:")
+        print("  python embeddings.py backfill [user_id]   # Embed entries that have no vector from EMBEDDER yet")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible chat completions server for local testing
+
+Run it and point the backend at it:
+    python fake_llm_server.py
+    OPENAI_BASE_URL=http://localhost:8100/v1 python main.py
+
+FAKE_LLM_LATENCY sets the simulated completion time in seconds and
+FAKE_LLM_RATE_LIMIT_RATIO the share of requests answered with a 429.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))
+FAKE_LLM_RATE_LIMIT_RATIO = float(os.getenv("FAKE_LLM_RATE_LIMIT_RATIO", "0"))
+
+app = FastAPI()
+
+
+def fake_analysis(journal_text):
+    """Deterministic analysis so repeated runs give comparable output"""
+    moods = ["happy", "sad", "calm", "anxious", "hopeful", "stressed"]
+    mood = moods[sum(journal_text.encode("utf-8")) % len(moods)]
+    return {
+        "mood": mood,
+        "summary": f"The writer seems {mood}.",
+        "reflection": "Thanks for writing today. Keep taking a few minutes for yourself.",
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < FAKE_LLM_RATE_LIMIT_RATIO:
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+
+    prompt = body["messages"][-1]["content"]
+    batch_entries = re.split(r"\n\nEntry \d+:\n", "\n\n" + prompt)[1:]
+    if batch_entries:
+        content = json.dumps([dict(fake_analysis(entry), index=index) for index, entry in enumerate(batch_entries)])
+    else:
+        content = json.dumps(fake_analysis(prompt))
+
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream")
+
+    await asyncio.sleep(FAKE_LLM_LATENCY)
+    return {
+        "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(content.split()),
+            "total_tokens": len(prompt.split()) + len(content.split()),
+        },
+    }
+
+
+async def stream_chunks(body, content, chunk_size=8):
+    """Spread FAKE_LLM_LATENCY over small content deltas like a real stream"""
+    pieces = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+    completion_id = f"chatcmpl-fake-{int(time.time() * 1000)}"
+    for index, piece in enumerate(pieces):
+        await asyncio.sleep(FAKE_LLM_LATENCY / len(pieces))
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                    "finish_reason": "stop" if index == len(pieces) - 1 else None,
+                }
+            ],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FAKE_LLM_PORT", "8100")))
@@ -0,0 +1,91 @@
+"""
+Keyset-paginated journal entry listing for GET /journal-entries.
+
+Pages are ordered by (created_at, id) descending and the cursor is the last
+row's (created_at, id), so every page is a single range scan of the
+ix_journal_analysis_user_created index no matter how deep the client pages.
+Only the requested columns are selected, letting list views skip the large
+journal_text/summary/reflection columns.
+"""
+
+import base64
+import os
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+
+from models import JournalAnalysis as JournalAnalysisModel
+
+JOURNAL_PAGE_SIZE_DEFAULT = int(os.getenv("JOURNAL_PAGE_SIZE_DEFAULT", "50"))
+JOURNAL_PAGE_SIZE_MAX = int(os.getenv("JOURNAL_PAGE_SIZE_MAX", "200"))
+
+JOURNAL_ENTRY_FIELDS = ("id", "journal_text", "mood", "summary", "reflection", "created_at")
+# Always selected because the cursor is built from them
+_KEY_FIELDS = ("id", "created_at")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, entry_id):
+    raw = f"{created_at.isoformat()}|{entry_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, entry_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+
+def parse_fields(fields):
+    """Turn a fields= value into the list of columns to return"""
+    if not fields:
+        return list(JOURNAL_ENTRY_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in JOURNAL_ENTRY_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [field for field in JOURNAL_ENTRY_FIELDS if field in requested or field in _KEY_FIELDS]
+
+
+def journal_entries_query(user_id, limit=JOURNAL_PAGE_SIZE_DEFAULT, cursor=None, fields=None,
+                          date_from=None, date_to=None):
+    """SELECT for one page, newest first, fetching one extra row to detect more pages
+
+    date_from is inclusive and date_to exclusive. Returns (query, limit) with
+    limit clamped to JOURNAL_PAGE_SIZE_MAX.
+    """
+    columns = parse_fields(fields)
+    limit = max(1, min(limit, JOURNAL_PAGE_SIZE_MAX))
+
+    query = select(*(getattr(JournalAnalysisModel, column) for column in columns)).where(
+        JournalAnalysisModel.user_id == user_id
+    )
+    if date_from is not None:
+        query = query.where(JournalAnalysisModel.created_at >= date_from)
+    if date_to is not None:
+        query = query.where(JournalAnalysisModel.created_at < date_to)
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(JournalAnalysisModel.created_at, JournalAnalysisModel.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    query = query.order_by(JournalAnalysisModel.created_at.desc(), JournalAnalysisModel.id.desc()).limit(limit + 1)
+    return query, limit
+
+
+def journal_entries_page(rows, limit):
+    """Turn the rows of journal_entries_query into (entries, next_cursor)"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # created_at stays a datetime, responses.OrjsonResponse encodes it natively
+    entries = [row._asdict() for row in rows]
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return entries, next_cursor
@@ -0,0 +1,128 @@
+"""
+Full-text search over a user's journal entries for GET /journal-entries/search.
+
+journal_text, summary and reflection are indexed by the database itself
+(created by migrations.journal_search_index), so the index follows every
+insert, update and delete no matter which code path writes the row:
+
+- PostgreSQL: a generated `search_vector` tsvector column (journal_text
+  weighted above summary above reflection) with a GIN index, queried with
+  websearch_to_tsquery (quotes, `or` and `-word` work like a search engine)
+  and ranked with ts_rank_cd
+- SQLite: an external-content FTS5 table, journal_analysis_fts, kept in sync by
+  triggers and ranked with bm25; every word of q has to match
+
+Results come best match first with a snippet around the matched words. Ranking
+has to see every match anyway, so pages are offsets into the ranked list
+(wrapped in an opaque cursor, returned in X-Next-Cursor like /journal-entries)
+and snippets are only built for the rows of the requested page.
+"""
+
+import base64
+import os
+import re
+
+from sqlalchemy import DateTime, Float, Integer, String, Text, text
+
+from journal_entries import JOURNAL_PAGE_SIZE_MAX, InvalidCursor
+
+JOURNAL_SEARCH_PAGE_SIZE_DEFAULT = int(os.getenv("JOURNAL_SEARCH_PAGE_SIZE_DEFAULT", "20"))
+
+# Baked into the generated column, changing it needs a new migration
+SEARCH_CONFIG = "english"
+FTS_TABLE = "journal_analysis_fts"
+
+SNIPPET_START, SNIPPET_STOP = "**", "**"
+SNIPPET_WORDS = 24
+
+_WORD = re.compile(r"\w+")
+
+_RESULT_COLUMNS = dict(id=Integer, mood=String, summary=Text, created_at=DateTime, rank=Float, snippet=Text)
+
+_POSTGRESQL_SEARCH = f"""
+    WITH matches AS (
+        SELECT id, mood, summary, journal_text, reflection, created_at, query,
+               ts_rank_cd(search_vector, query) AS rank
+        FROM journal_analysis, websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS query
+        WHERE user_id = :user_id AND search_vector @@ query
+        ORDER BY rank DESC, id DESC
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT id, mood, summary, created_at, rank,
+           ts_headline(
+               '{SEARCH_CONFIG}',
+               CASE
+                   WHEN to_tsvector('{SEARCH_CONFIG}', journal_text) @@ query THEN journal_text
+                   WHEN to_tsvector('{SEARCH_CONFIG}', summary) @@ query THEN summary
+                   ELSE reflection
+               END,
+               query,
+               'StartSel="{SNIPPET_START}", StopSel="{SNIPPET_STOP}", MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=2'
+           ) AS snippet
+    FROM matches
+    ORDER BY rank DESC, id DESC
+"""
+
+_SQLITE_SEARCH = f"""
+    SELECT j.id, j.mood, j.summary, j.created_at,
+           -bm25({FTS_TABLE}, 10.0, 5.0, 2.0) AS rank,
+           snippet({FTS_TABLE}, -1, '{SNIPPET_START}', '{SNIPPET_STOP}', '…', {SNIPPET_WORDS}) AS snippet
+    FROM {FTS_TABLE}
+    JOIN journal_analysis j ON j.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :q AND j.user_id = :user_id
+    ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 2.0), j.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def encode_search_cursor(offset):
+    return base64.urlsafe_b64encode(f"search|{offset}".encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, offset = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        if kind != "search" or int(offset) < 0:
+            raise ValueError(cursor)
+        return int(offset)
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+
+
+def fts5_query(q):
+    """q as an FTS5 query matching entries that contain every word, free of FTS5 syntax"""
+    return " ".join(f'"{word}"' for word in _WORD.findall(q))
+
+
+def journal_search_query(dialect_name, user_id, q, limit=JOURNAL_SEARCH_PAGE_SIZE_DEFAULT, cursor=None):
+    """Statement for one page of matches, fetching one extra row to detect more pages
+
+    Returns (statement, limit, offset) with limit clamped to JOURNAL_PAGE_SIZE_MAX,
+    or (None, limit, offset) when q has nothing to search for.
+    """
+    limit = max(1, min(limit, JOURNAL_PAGE_SIZE_MAX))
+    offset = decode_search_cursor(cursor) if cursor else 0
+
+    if dialect_name == "postgresql":
+        sql, q = _POSTGRESQL_SEARCH, q.strip()
+    elif dialect_name == "sqlite":
+        sql, q = _SQLITE_SEARCH, fts5_query(q)
+    else:
+        raise NotImplementedError(f"Full-text search isn't supported on {dialect_name}")
+    if not q:
+        return None, limit, offset
+
+    statement = text(sql).bindparams(q=q, user_id=user_id, limit=limit + 1, offset=offset).columns(**_RESULT_COLUMNS)
+    return statement, limit, offset
+
+
+def journal_search_page(rows, limit, offset):
+    """Turn the rows of journal_search_query into (results, next_cursor)"""
+    has_more = len(rows) > limit
+    results = []
+    for row in rows[:limit]:
+        result = row._asdict()
+        result["rank"] = round(result["rank"], 6)
+        results.append(result)
+    return results, encode_search_cursor(offset + limit) if has_more else None
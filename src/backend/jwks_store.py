@@ -0,0 +1,221 @@
+"""
+In-process JWKS key store used to verify Auth0 access tokens.
+
+Public keys are fetched once, parsed into key objects per kid and kept for
+JWKS_CACHE_TTL seconds. A daemon thread refreshes them before they expire, and
+an unknown kid only triggers a refetch at most once per
+JWKS_MIN_REFETCH_INTERVAL seconds so a flood of bad tokens can't turn into a
+flood of requests to Auth0. Requests that find the keys stale share a single
+fetch, and after a failed fetch the last known keys keep being served while
+retries wait JWKS_MIN_REFETCH_INTERVAL seconds.
+
+The JWKS location can be an https:// URL, a file:// URL or a plain path to a
+local JWKS file, which makes it easy to point at a fixture or a stub server.
+
+Async callers use get_key_async: cached keys are returned directly and only a
+fetch (stale cache, unknown kid) runs in a worker thread, so a slow Auth0 never
+blocks the event loop.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from jose import jwk
+
+logger = logging.getLogger(__name__)
+
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "3600"))
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))
+JWKS_FETCH_TIMEOUT = float(os.getenv("JWKS_FETCH_TIMEOUT", "5"))
+JWKS_BACKGROUND_REFRESH = os.getenv("JWKS_BACKGROUND_REFRESH", "true").lower() == "true"
+
+
+class JWKSKeyStore:
+    """Cache of parsed JWKS public keys indexed by kid"""
+
+    def __init__(
+        self,
+        jwks_url,
+        algorithm="RS256",
+        ttl=JWKS_CACHE_TTL,
+        min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL,
+        timeout=JWKS_FETCH_TIMEOUT,
+        background_refresh=JWKS_BACKGROUND_REFRESH,
+    ):
+        self.jwks_url = jwks_url
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.background_refresh = background_refresh
+
+        self._keys = {}
+        self._fetched_at = None
+        self._last_forced_fetch = None
+        self._failed_at = None
+        self._last_error = None
+        self._fetch_lock = threading.Lock()
+        self._refresher = None
+        self._stop_event = threading.Event()
+
+        self.fetch_count = 0
+        self.forced_fetch_count = 0
+        self.throttled_count = 0
+        self.failed_fetch_count = 0
+
+    def _load_jwks(self):
+        """Read the raw JWKS document from the configured location"""
+        location = self.jwks_url
+        if location.startswith("file://"):
+            location = location[len("file://"):]
+        if not location.startswith(("http://", "https://")):
+            with open(location, "r") as f:
+                return json.load(f)
+
+        response = requests.get(location, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _parse_keys(self, jwks):
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = jwk.construct(key_data, key_data.get("alg", self.algorithm))
+            except Exception as e:
+                logger.warning("Skipping unusable JWK %s: %s", kid, e)
+        return keys
+
+    def refresh(self, if_stale=False):
+        """Fetch the JWKS document and replace the cached keys
+
+        With if_stale, callers that waited on the lock while another request
+        refreshed get its keys instead of fetching again, and a fetch that
+        failed less than min_refetch_interval ago isn't retried yet: the
+        cached keys are returned, or the last error raised if there are none.
+        """
+        with self._fetch_lock:
+            if if_stale and not self.is_stale():
+                return self._keys
+            if if_stale and self._backing_off():
+                if not self._keys:
+                    raise self._last_error
+                return self._keys
+
+            try:
+                keys = self._parse_keys(self._load_jwks())
+            except Exception as e:
+                self._failed_at = time.monotonic()
+                self._last_error = e
+                self.failed_fetch_count += 1
+                raise
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+            self._failed_at = self._last_error = None
+            self.fetch_count += 1
+        return keys
+
+    def prefetch(self):
+        """Load the keys and start the background refresh before the first request needs them"""
+        try:
+            self.refresh()
+        except Exception as e:
+            # get_key fetches again on the first request
+            logger.warning("JWKS prefetch failed: %s", e)
+        self._ensure_refresher()
+
+    def is_stale(self):
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl
+
+    def _backing_off(self):
+        return self._failed_at is not None and time.monotonic() - self._failed_at < self.min_refetch_interval
+
+    def get_key(self, kid):
+        """Return the parsed public key for kid, or None if Auth0 doesn't know it"""
+        self._ensure_refresher()
+
+        if self.is_stale():
+            try:
+                self.refresh(if_stale=True)
+            except Exception as e:
+                # Keep serving the keys we already have if Auth0 is unreachable
+                if not self._keys:
+                    raise
+                logger.warning("JWKS refresh failed, using cached keys: %s", e)
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        return self._refetch_for_unknown_kid(kid)
+
+    async def get_key_async(self, kid):
+        """get_key for the event loop, fetches run in a worker thread"""
+        # While a failed fetch is backing off the stale keys are served as they are
+        key = None if self.is_stale() and not self._backing_off() else self._keys.get(kid)
+        if key is not None:
+            return key
+        return await asyncio.to_thread(self.get_key, kid)
+
+    def _refetch_for_unknown_kid(self, kid):
+        """Refetch once for a kid we haven't seen (key rotation), rate limited"""
+        with self._fetch_lock:
+            # Another request may have refreshed while we waited for the lock
+            if kid in self._keys:
+                return self._keys[kid]
+
+            now = time.monotonic()
+            if self._last_forced_fetch is not None and now - self._last_forced_fetch < self.min_refetch_interval:
+                self.throttled_count += 1
+                return None
+            self._last_forced_fetch = now
+            self.forced_fetch_count += 1
+
+        try:
+            keys = self.refresh()
+        except Exception as e:
+            logger.warning("JWKS refetch for unknown kid failed: %s", e)
+            return None
+        return keys.get(kid)
+
+    def _ensure_refresher(self):
+        if not self.background_refresh or self._refresher is not None:
+            return
+        with self._fetch_lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="jwks-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        # Refresh a little before the TTL runs out so requests never wait on Auth0
+        interval = max(self.ttl * 0.8, 1.0)
+        while not self._stop_event.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Background JWKS refresh failed: %s", e)
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stop_event.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=1)
+            self._refresher = None
+        self._stop_event = threading.Event()
+
+    def stats(self):
+        return {
+            "keys": len(self._keys),
+            "fetches": self.fetch_count,
+            "forced_fetches": self.forced_fetch_count,
+            "throttled": self.throttled_count,
+            "failed_fetches": self.failed_fetch_count,
+        }
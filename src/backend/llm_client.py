@@ -0,0 +1,216 @@
+"""
+Async OpenAI client used by the analysis endpoints.
+
+The FastAPI handlers are async, so the model call must not block the event
+loop. One AsyncOpenAI instance is shared by the whole process, which keeps its
+HTTP connections pooled, and a semaphore caps how many completions are in
+flight at once (size it to the account's rate limit). Rate limit errors are
+retried with exponential backoff and full jitter before being re-raised.
+
+Set OPENAI_BASE_URL to point the client at a local fake server
+(see fake_llm_server.py) to run or benchmark the API without OpenAI.
+"""
+
+import asyncio
+import logging
+import os
+import random
+
+import openai
+
+from logging_config import get_request_id
+from metrics import LLM_REQUESTS, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+
+
+class AsyncLLMClient:
+    """Pooled, concurrency-bounded wrapper around openai.AsyncOpenAI"""
+
+    def __init__(
+        self,
+        api_key=None,
+        base_url=None,
+        model=LLM_MODEL,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        timeout=LLM_TIMEOUT,
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base=LLM_BACKOFF_BASE,
+        backoff_max=LLM_BACKOFF_MAX,
+    ):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url if base_url is not None else os.getenv("OPENAI_BASE_URL")
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._client = None
+        self._semaphore = None
+        self.in_flight = 0
+        self.retries = 0
+
+    def _get_client(self):
+        # Created lazily: AsyncOpenAI refuses to start without an API key, and
+        # the semaphore must belong to the running event loop
+        if self._client is None:
+            kwargs = {"api_key": self.api_key or "missing", "max_retries": 0, "timeout": self.timeout}
+            if self.base_url:
+                kwargs["base_url"] = self.base_url
+            self._client = openai.AsyncOpenAI(**kwargs)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _request_kwargs(self, messages, max_tokens, model, timeout):
+        kwargs = {
+            "model": model or self.model,
+            "messages": messages,
+            "timeout": timeout or self.timeout,
+        }
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        request_id = get_request_id()
+        if request_id:
+            # Lets a request be followed into the provider's or a proxy's logs
+            kwargs["extra_headers"] = {"X-Request-ID": request_id}
+        return kwargs
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        LLM_TOKENS.inc(usage.prompt_tokens or 0, type="prompt")
+        LLM_TOKENS.inc(usage.completion_tokens or 0, type="completion")
+
+    def _should_retry(self, error, attempt):
+        # An exhausted quota won't recover by waiting a few seconds
+        return attempt < self.max_retries and getattr(error, "code", None) != "insufficient_quota"
+
+    async def _wait_before_retry(self, attempt):
+        # Sleep outside the semaphore so waiting retries don't hold a slot
+        delay = self._backoff_delay(attempt)
+        self.retries += 1
+        logger.info("LLM rate limited, retry %d/%d in %.2fs", attempt + 1, self.max_retries, delay)
+        await asyncio.sleep(delay)
+
+    async def complete(self, messages, max_tokens=None, model=None, timeout=None):
+        """Run a chat completion and return the full response object"""
+        client = self._get_client()
+        kwargs = self._request_kwargs(messages, max_tokens, model, timeout)
+
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    response = await client.chat.completions.create(**kwargs)
+                    self._record_usage(response)
+                    LLM_REQUESTS.inc(kind="complete", outcome="ok")
+                    return response
+                except openai.RateLimitError as e:
+                    LLM_REQUESTS.inc(kind="complete", outcome="rate_limited")
+                    if not self._should_retry(e, attempt):
+                        raise
+                except Exception:
+                    LLM_REQUESTS.inc(kind="complete", outcome="error")
+                    raise
+                finally:
+                    self.in_flight -= 1
+
+            await self._wait_before_retry(attempt)
+            attempt += 1
+
+    async def embed(self, texts, model, dimensions=None, timeout=None):
+        """Embed texts with one request, returns the vectors in order"""
+        client = self._get_client()
+
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    kwargs = {"model": model, "input": list(texts), "timeout": timeout or self.timeout}
+                    if dimensions is not None:
+                        kwargs["dimensions"] = dimensions
+                    response = await client.embeddings.create(**kwargs)
+                    usage = getattr(response, "usage", None)
+                    if usage is not None:
+                        LLM_TOKENS.inc(usage.prompt_tokens or 0, type="prompt")
+                    LLM_REQUESTS.inc(kind="embed", outcome="ok")
+                    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                except openai.RateLimitError as e:
+                    LLM_REQUESTS.inc(kind="embed", outcome="rate_limited")
+                    if not self._should_retry(e, attempt):
+                        raise
+                except Exception:
+                    LLM_REQUESTS.inc(kind="embed", outcome="error")
+                    raise
+                finally:
+                    self.in_flight -= 1
+
+            await self._wait_before_retry(attempt)
+            attempt += 1
+
+    async def stream_text(self, messages, max_tokens=None, model=None, timeout=None):
+        """Yield message content deltas as the model produces them
+
+        Rate limits are only retried before the first token; the concurrency
+        slot is held until the stream is fully consumed.
+        """
+        client = self._get_client()
+        kwargs = self._request_kwargs(messages, max_tokens, model, timeout)
+        kwargs["stream"] = True
+
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    try:
+                        stream = await client.chat.completions.create(**kwargs)
+                    except openai.RateLimitError as e:
+                        LLM_REQUESTS.inc(kind="stream", outcome="rate_limited")
+                        if not self._should_retry(e, attempt):
+                            raise
+                        stream = None
+                    except Exception:
+                        LLM_REQUESTS.inc(kind="stream", outcome="error")
+                        raise
+
+                    if stream is not None:
+                        LLM_REQUESTS.inc(kind="stream", outcome="ok")
+                        async for chunk in stream:
+                            if getattr(chunk, "usage", None):
+                                self._record_usage(chunk)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                        return
+                finally:
+                    self.in_flight -= 1
+
+            await self._wait_before_retry(attempt)
+            attempt += 1
+
+    async def complete_text(self, messages, max_tokens=None, model=None, timeout=None):
+        """Run a chat completion and return just the message content"""
+        response = await self.complete(messages, max_tokens=max_tokens, model=model, timeout=timeout)
+        return response.choices[0].message.content
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        self._semaphore = None
@@ -0,0 +1,233 @@
+"""
+Structured logging for the API and the analysis workers.
+
+configure_logging() routes every logger through a QueueHandler, so a log call
+only builds the record and enqueues it; a QueueListener thread formats the
+JSON line and does the (blocking) write to stderr. On the calling side:
+  - every record gets the current request id (see RequestIdMiddleware), which
+    follows the request through auth, the LLM call and the DB writes because
+    it lives in a contextvar
+  - journal content and credentials are redacted: extra fields named in
+    REDACTED_FIELDS are replaced by their length and anything that looks like
+    a JWT or bearer token is masked in the message
+  - records logged with extra={"sample": True} (per-request debug lines) are
+    kept with probability LOG_SAMPLE_RATE
+
+Settings:
+    LOG_LEVEL=INFO
+    LOG_LEVELS=sqlalchemy.engine=INFO,httpx=WARNING   # per-logger overrides
+    LOG_FORMAT=json                                   # or text for local development
+    LOG_SAMPLE_RATE=0.1
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+# Chatty third-party loggers, overridable through LOG_LEVELS
+DEFAULT_LOGGER_LEVELS = {
+    "httpx": "WARNING", "httpx2": "WARNING", "httpcore": "WARNING", "httpcore2": "WARNING",
+    "openai": "WARNING", "aiosqlite": "WARNING", "asyncio": "WARNING",
+}
+
+REDACTED_FIELDS = frozenset({
+    "journal_text", "text", "summary", "reflection", "raw_output", "parsed",
+    "token", "access_token", "authorization", "payload", "email",
+})
+
+_TOKEN_PATTERNS = (
+    re.compile(r"\beyJ[\w-]+\.[\w-]+\.[\w-]*"),  # JWTs
+    re.compile(r"(?i)\bbearer\s+\S+"),
+)
+_REQUEST_ID_PATTERN = re.compile(r"^[\w.-]{1,64}$")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, anything else was passed through extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+_INTERNAL_ATTRS = frozenset({"request_id", "sample"})
+
+_listener = None
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def redact_text(text):
+    for pattern in _TOKEN_PATTERNS:
+        text = pattern.sub("[REDACTED]", text)
+    return text
+
+
+def _redacted_value(value):
+    if value is None:
+        return None
+    return f"[REDACTED len={len(value) if hasattr(value, '__len__') else '?'}]"
+
+
+class ContextFilter(logging.Filter):
+    """Drops unsampled records, then stamps the request id and redacts"""
+
+    def __init__(self, sample_rate=LOG_SAMPLE_RATE):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if getattr(record, "sample", False) and random.random() >= self.sample_rate:
+            return False
+        record.request_id = request_id_var.get()
+        for key in REDACTED_FIELDS.intersection(record.__dict__):
+            setattr(record, key, _redacted_value(getattr(record, key)))
+        return True
+
+
+class _ContextQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Render the message (and traceback) now, while the arguments are
+        # still valid, but keep the record's fields for the JSON formatter
+        record = copy.copy(record)
+        record.message = redact_text(record.getMessage())
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in _INTERNAL_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        line = super().format(record)
+        extras = {
+            key: value for key, value in record.__dict__.items()
+            if key not in _RECORD_ATTRS and key not in _INTERNAL_ATTRS
+        }
+        return f"{line} {extras}" if extras else line
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=LOG_LEVEL, levels=LOG_LEVELS, log_format=LOG_FORMAT, sample_rate=LOG_SAMPLE_RATE):
+    """Install the queue handler on the root logger, safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    output.setFormatter(TextFormatter() if log_format == "text" else JsonFormatter())
+
+    records = queue.SimpleQueue()
+    handler = _ContextQueueHandler(records)
+    handler.addFilter(ContextFilter(sample_rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name, logger_level in {**DEFAULT_LOGGER_LEVELS, **_parse_levels(levels)}.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI middleware that gives each request an id (X-Request-ID) for its log records
+
+    A well-formed incoming X-Request-ID (e.g. from a load balancer) is reused,
+    otherwise a new one is generated. It is echoed on the response.
+    """
+
+    def __init__(self, app, header_name="x-request-id"):
+        self.app = app
+        self.header_name = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == self.header_name:
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or new_request_id()
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(self.header_name, request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
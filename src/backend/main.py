@@ -1,25 +1,119 @@
-from fastapi import FastAPI, HTTPException, Depends
+import time
+
+# Cold start is measured from here to the first response sent (see StartupTimer)
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import inspect
-from db import engine
-from models import Base, User as UserModel, JournalAnalysis as JournalAnalysisModel, MonthlySummary as MonthlySummaryModel
-from collections import defaultdict, Counter
+from sqlalchemy.ext.asyncio import AsyncSession
+from logging_config import RequestIdMiddleware, configure_logging, shutdown_logging
+from db import async_engine, AsyncSessionLocal, get_db, pool_stats, warm_up_pool
+from migrations import check_schema
+from monthly_rollup import rollup_progress
+from scheduler import SCHEDULER_IN_PROCESS, create_scheduler
+from jwks_store import JWKSKeyStore
+from token_cache import VerifiedTokenCache
+from user_cache import CachedUser, UserIdentityCache
+from repositories import JournalAnalysisRepository, MonthlySummaryRepository, UserRepository
+from analysis import analysis_cache, analyze_text, llm_client
+from metrics import (
+    METRICS_ROUTE_LATENCY, FirstRequestMiddleware, RouteLatencyMiddleware, StartupTimer,
+    register_collector, render_metrics, stage_timer,
+)
+from mood_stats import GRANULARITIES, MOOD_STATS_DEFAULT_DAYS
+from journal_entries import JOURNAL_PAGE_SIZE_DEFAULT, JOURNAL_PAGE_SIZE_MAX
+from journal_search import JOURNAL_SEARCH_PAGE_SIZE_DEFAULT
+from conditional import cache_headers, conditional_requests, not_modified, user_etag
+from embeddings import SIMILAR_DEFAULT_LIMIT, SIMILAR_MAX_LIMIT, vector_index
+from responses import (
+    JournalEntryResponse, JournalSearchResult, MonthlySummaryResponse, OrjsonResponse, SimilarJournalEntry,
+)
+from analysis_batch import BATCH_MAX_ENTRIES, analyze_batch
+from analysis_stream import format_sse, stream_analysis_events
+from analysis_worker import (
+    ANALYSIS_WORKERS_IN_PROCESS, JOB_DONE, JOB_FAILED,
+    enqueue_job, get_job, load_job, serialize_job, worker_pool,
+)
+import asyncio
+import logging
 import openai
 import os
 import json
-import requests
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from jose import jwt
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+ANALYSIS_EVENTS_TIMEOUT = float(os.getenv("ANALYSIS_EVENTS_TIMEOUT", "120"))
+RESTORE_CHECK_INTERVAL = float(os.getenv("RESTORE_CHECK_INTERVAL", "5"))
+
+startup_timer = StartupTimer(IMPORT_STARTED)
+
+def log_cold_start(timer):
+    logger.info("First request served", extra={"cold_start": timer.snapshot()})
+
+async def latest_restore():
+    async with AsyncSessionLocal() as session:
+        return await UserRepository(session).latest_restore()
+
+async def watch_restores(last_seen, interval=RESTORE_CHECK_INTERVAL):
+    """Clear the caches keyed by user id once restore_db.py has replaced the users table
+
+    A restore drops users created after the backup, and their ids are handed
+    out again to new signups, so a cached auth0_id -> id could point at
+    somebody else's rows.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            latest = await latest_restore()
+        except Exception:
+            logger.warning("Checking restore_log failed", exc_info=True)
+            continue
+        if latest != last_seen:
+            user_cache.clear()
+            vector_index.clear()
+            logger.info("Database was restored, cleared cached users and vectors", extra={"restore_id": latest})
+            last_seen = latest
+
+@asynccontextmanager
+async def lifespan(app):
+    # Here rather than at import, so workers and tools importing main keep their own logging
+    configure_logging()
+    with startup_timer.phase("schema_check"):
+        await check_schema()
+    # Both are network round trips: run them side by side, off the request path
+    with startup_timer.phase("jwks_prefetch_and_pool_warmup"):
+        await asyncio.gather(asyncio.to_thread(jwks_store.prefetch), warm_up_pool())
+    with startup_timer.phase("background_workers"):
+        if ANALYSIS_WORKERS_IN_PROCESS:
+            await worker_pool.start()
+        scheduler = create_scheduler() if SCHEDULER_IN_PROCESS else None
+        if scheduler is not None:
+            scheduler.start()
+        restore_watcher = asyncio.create_task(watch_restores(await latest_restore()))
+    startup_timer.mark("ready")
+    logger.info("Startup complete", extra={"startup": startup_timer.snapshot()})
+    yield
+    restore_watcher.cancel()
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    await worker_pool.stop()
+    jwks_store.stop()
+    await async_engine.dispose()
+    shutdown_logging()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,34 +121,23 @@ app.add_middleware(
     allow_credentials = True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Request-ID"],
 )
+app.add_middleware(RequestIdMiddleware)
+if METRICS_ROUTE_LATENCY:
+    app.add_middleware(RouteLatencyMiddleware)
+app.add_middleware(FirstRequestMiddleware, timer=startup_timer, on_first_request=log_cold_start)
 
 security = HTTPBearer()
 
-JWKS_URL = "https://dev-3fas6re2rfmlpqmh.us.auth0.com/.well-known/jwks.json"
+JWKS_URL = os.getenv("JWKS_URL", "https://dev-3fas6re2rfmlpqmh.us.auth0.com/.well-known/jwks.json")
 AUDIENCE = "http://localhost:8000"
 ISSUER = "https://dev-3fas6re2rfmlpqmh.us.auth0.com/"
 ALGORITHMS = ["RS256"]
 
-SessionLocal = sessionmaker(autoflush=False, bind=engine)
-
-# Create tables if they don't exist (only if they don't exist)
-try:
-    # Check if tables exist before creating them
-    inspector = inspect(engine)
-    existing_tables = inspector.get_table_names()
-    
-    if not existing_tables:
-        print("No tables found. Creating database tables...")
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully.")
-    else:
-        print(f"Found existing tables: {existing_tables}")
-        print("Using existing database structure.")
-except Exception as e:
-    print(f"Error checking database: {e}")
-    print("Creating tables as fallback...")
-    Base.metadata.create_all(bind=engine)
+jwks_store = JWKSKeyStore(JWKS_URL, algorithm=ALGORITHMS[0])
+token_cache = VerifiedTokenCache()
+user_cache = UserIdentityCache()
 
 class JournalInput(BaseModel):
     journal_text: str
@@ -65,249 +148,225 @@ class JournalAnalysisResponse(BaseModel):
     reflection: str
     id: int = None
     created_at: datetime = None
+
+class BatchEntryInput(BaseModel):
+    journal_text: str
+    created_at: Optional[datetime] = None  # Original date for imported entries
+
+class BatchJournalInput(BaseModel):
+    entries: List[BatchEntryInput]
     
-def get_jwk(token):
+async def get_jwk(token):
     # Get the header without verifying signature
     unverified_header = jwt.get_unverified_header(token)
     
     if "kid" not in unverified_header:
         raise HTTPException(status_code=401, detail="Invalid token header")
 
-    jwks = requests.get(JWKS_URL).json()
-    
-    for key in jwks["keys"]:
-        if key["kid"] == unverified_header["kid"]:
-            return key
+    with stage_timer("jwks"):
+        key = await jwks_store.get_key_async(unverified_header["kid"])
+    if key is None:
+        raise HTTPException(status_code=401, detail="Public key not found")
     
-    raise HTTPException(status_code=401, detail="Public key not found")
+    return key
 
-def verify_token(token: str):
-    print(f"Verifying token...")
-    jwk = get_jwk(token)
-    print(f"Found JWK with kid: {jwk.get('kid', 'unknown')}")
+async def verify_token(token: str):
+    cached_payload = token_cache.get(token)
+    if cached_payload is not None:
+        return cached_payload
+    
+    jwk = await get_jwk(token)
     
     try:
-        # Use the JWK directly with python-jose
-        payload = jwt.decode(
-            token,
-            jwk,
-            algorithms=ALGORITHMS,
-            audience=AUDIENCE,
-            issuer=ISSUER
-        )
-        print(f"Token decoded successfully")
+        # The key is already parsed by the key store, so jose skips re-constructing it
+        with stage_timer("token_verify"):
+            payload = jwt.decode(
+                token,
+                jwk,
+                algorithms=ALGORITHMS,
+                audience=AUDIENCE,
+                issuer=ISSUER
+            )
+        token_cache.put(token, payload)
         return payload
     except jwt.ExpiredSignatureError:
-        print(f"Token expired")
+        logger.info("Token expired")
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.JWTClaimsError as e:
-        print(f"Invalid claims: {str(e)}")
+        logger.info("Invalid token claims: %s", e)
         raise HTTPException(status_code=401, detail=f"Invalid claims: {str(e)}")
     except Exception as e:
-        print(f"Token verification failed: {str(e)}")
+        logger.info("Token verification failed: %s", e)
         raise HTTPException(status_code=401, detail=f"Token verification failed: {str(e)}")
     
-def get_current_user(credentials=Depends(security)):
+async def get_current_user(credentials=Depends(security), db: AsyncSession = Depends(get_db)):
     token = credentials.credentials  # Bearer token
-    print(f"Received token: {token[:50]}...")
     
     try:
-        payload = verify_token(token)
-        print(f"Token verified successfully")
-        print(f"Token payload: {payload}")
-        
+        payload = await verify_token(token)
         auth0_sub = payload["sub"]  # The unique user ID
-        print(f"Auth0 sub: {auth0_sub}")
+        logger.debug("Token verified", extra={"auth0_sub": auth0_sub, "sample": True})
         
-        session = SessionLocal()
-        user = session.query(UserModel).filter_by(auth0_id=auth0_sub).first()
-        session.close()
-
-        if not user:
-            print(f"User not found in database for auth0_id: {auth0_sub}")
-            # Create user if not found
-            session = SessionLocal()
-            new_user = UserModel(
-                auth0_id=auth0_sub,
-                email=payload.get("email", ""),
-                name=payload.get("name", "")
+        user = user_cache.get(auth0_sub)
+        if user is not None:
+            return user
+        
+        with stage_timer("user_lookup"):
+            user = await UserRepository(db).get_or_create(
+                auth0_sub,
+                email=payload.get("email"),
+                name=payload.get("name")
             )
-            session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
-            session.close()
-            print(f"Created new user: {new_user.id}")
-            return new_user
         
-        print(f"Found existing user: {user.id}")
+        user_cache.set(user)
+        logger.info("Loaded user", extra={"user_id": user.id})
         return user
         
-    except Exception as e:
-        print(f"Error in get_current_user: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error in get_current_user")
         raise
     
-@app.get("/monthly-summary")
-def generate_monthly_summary(current_user: UserModel = Depends(get_current_user)):
-    db = SessionLocal()
+@app.get("/monthly-summary", response_model=MonthlySummaryResponse)
+async def generate_monthly_summary(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mood counts per day and in total for one month (YYYY-MM, defaults to the current month)
+
+    Answers 304 Not Modified when If-None-Match holds the current ETag.
+    """
+    month_str = month or datetime.utcnow().strftime("%Y-%m")
     try:
-        from datetime import datetime
-        start_of_month = datetime(datetime.now().year, datetime.now().month, 1)
-        entries = db.query(JournalAnalysisModel).filter(JournalAnalysisModel.user_id == current_user.id).all()
-        
-        print(f"Found {len(entries)} journal entries for user {current_user.id} from {start_of_month}")
-        
-        daily_data = defaultdict(lambda: Counter())
-        monthly_totals = Counter()
-        
-        for entry in entries:
-            day = entry.created_at.strftime("%Y-%m-%d")
-            daily_data[day][entry.mood] += 1
-            monthly_totals[entry.mood] += 1
-        
-        daily_data = {day: dict(counter) for day, counter in daily_data.items()}
-        monthly_totals = dict(monthly_totals)
-        
-        month_str = start_of_month.strftime("%Y-%m")
-        existing_summary = db.query(MonthlySummaryModel).filter_by(month=month_str, user_id=current_user.id).first()
-        
-        if existing_summary:
-            existing_summary.daily_data = daily_data
-            existing_summary.monthly_totals = monthly_totals
-            existing_summary.updated_at = datetime.now()
-            print(f"Updated existing monthly summary for {month_str}")
-        else:
-            summary = MonthlySummaryModel(
-                month=month_str,
-                user_id=current_user.id,
-                daily_data=daily_data,
-                monthly_totals=monthly_totals
-            )
-            db.add(summary)
-            print(f"Created new monthly summary for {month_str}")
-        
-        db.commit()
-        
-        # Return the summary data
-        return {
-            "month": month_str,
-            "daily_data": daily_data,
-            "monthly_totals": monthly_totals,
-            "total_entries": len(entries),
-            "user_id": current_user.id
-        }
-        
+        # The month is part of the ETag: without ?month= the URL stays the same when a new month starts
+        etag = user_etag(current_user.id, await UserRepository(db).data_version(current_user.id), month_str)
+        response = not_modified("monthly_summary", if_none_match, etag)
+        if response is not None:
+            return response
+        summary = await MonthlySummaryRepository(db).get_month(current_user.id, month_str)
+        logger.debug(
+            "Monthly summary served",
+            extra={"user_id": current_user.id, "month": month_str, "entries": summary["total_entries"], "sample": True}
+        )
+        return OrjsonResponse(summary, headers=cache_headers(etag))
     except Exception as e:
-        print(f"Error generating monthly summary: {e}")
-        db.rollback()
+        logger.exception("Error generating monthly summary")
         raise HTTPException(status_code=500, detail=f"Error generating monthly summary: {str(e)}")
-    finally:
-        db.close()
 
-@app.post("/analyze-journal", response_model=JournalAnalysisResponse)
-async def analyze_journal(payload: JournalInput, current_user: UserModel = Depends(get_current_user)):
-    print(f"Received journal analysis request for user: {current_user.id}")
-    print(f"Journal text length: {len(payload.journal_text)}")
-    prompt = (
-        "Analyze the following journal entry and return a JSON object with:\n"
-        "- mood (one word from a general category such as: happy, sad, angry, anxious, calm, stressed, hopeful, etc.)\n"
-        "- summary (analyze like a therapist but somehow make it's easy to understand)\n"
-        "- reflection (a thoughtful paragraph and some positive advise or encouragement depend on user's journal)\n"
-        "Only return the JSON.\n\n"
-        f"Journal Entry:\n{payload.journal_text}"
-    )
-    
+def _as_naive_utc(value, name):
+    """A datetime from the request as naive UTC like created_at, 400 if it can't be converted"""
+    if value is None or value.tzinfo is None:
+        return value
     try:
-        print(f"Calling OpenAI API with prompt: {prompt[:100]}...")
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # Using cheaper model for testing
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that analyzes journal entries."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=200  # Limit tokens to reduce cost
-        )
-            
-        raw_output = response.choices[0].message.content
-        print(f"OpenAI API call successful")
-    except openai.RateLimitError as e:
-        print(f"OpenAI rate limit error: {e}")
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    except (OverflowError, ValueError):
+        raise HTTPException(status_code=400, detail=f"'{name}' is out of range")
+
+@app.get("/mood-stats")
+async def get_mood_stats(
+    granularity: str = Query("day", pattern="^(" + "|".join(GRANULARITIES) + ")$"),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Mood counts per day, week or month over any range (from inclusive, to exclusive)
+
+    Defaults to the last MOOD_STATS_DEFAULT_DAYS days. The response is columnar:
+    counts[mood][i] and totals[i] belong to the bucket starting on buckets[i].
+    """
+    date_from, date_to = _as_naive_utc(date_from, "from"), _as_naive_utc(date_to, "to")
+    date_to = date_to or datetime.utcnow()
+    date_from = date_from or date_to - timedelta(days=MOOD_STATS_DEFAULT_DAYS)
+    try:
+        return await JournalAnalysisRepository(db).mood_stats(current_user.id, date_from, date_to, granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error generating mood stats")
+        raise HTTPException(status_code=500, detail="Error generating mood stats")
+
+def _analysis_error_response(e):
+    """Map an analysis failure to the placeholder response the frontend shows"""
+    if isinstance(e, openai.RateLimitError):
+        logger.warning("OpenAI rate limit error: %s", e)
         # Handle quota exceeded error specifically
         return JournalAnalysisResponse(
             mood="quota_exceeded",
             summary="OpenAI quota exceeded. Please check your account billing.",
             reflection="Your journal entry has been received. To enable AI analysis, please visit https://platform.openai.com/usage to check your account status and add billing information if needed.",
         )
-    except Exception as e:
-        print(f"OpenAI API error: {e}")
-        # Handle other OpenAI errors
-        return JournalAnalysisResponse(
-            mood="error",
-            summary=f"OpenAI API error: {str(e)}",
-            reflection="There was an error connecting to the AI service. Please try again later.",
-        )
-    
-    try:
-        print(f"Raw OpenAI output: {raw_output}")
-        parsed = json.loads(raw_output)
-        print(f"Parsed OpenAI response: {parsed}")
-        
-        # Create database session
-        session = SessionLocal()
-        try:
-            print(f"Creating journal analysis record for user_id: {current_user.id}")
-            # Create new journal analysis record
-            new_journal_analysis = JournalAnalysisModel(
-                user_id=current_user.id,
-                journal_text=payload.journal_text,
-                mood=parsed.get("mood", ""),
-                summary=parsed.get("summary", ""),
-                reflection=parsed.get("reflection", "")
-            )
-            
-            print(f"Adding journal analysis to session...")
-            session.add(new_journal_analysis)
-            print(f"Committing to database...")
-            session.commit()
-            print(f"Refreshing object...")
-            session.refresh(new_journal_analysis)
-            
-            print(f"Successfully saved journal entry with ID: {new_journal_analysis.id}")
-            print(f"Entry details: mood={new_journal_analysis.mood}, summary_length={len(new_journal_analysis.summary)}")
-            
-            # Return the response with database ID and timestamp
-            return JournalAnalysisResponse(
-                id=new_journal_analysis.id,
-                mood=new_journal_analysis.mood,
-                summary=new_journal_analysis.summary,
-                reflection=new_journal_analysis.reflection,
-                created_at=new_journal_analysis.created_at
-            )
-            
-        except Exception as db_error:
-            session.rollback()
-            print(f"Database error: {db_error}")
-            print(f"User ID: {current_user.id}")
-            print(f"Parsed data: {parsed}")
-            # Return response without database ID if database fails
-            return JournalAnalysisResponse(
-                mood=parsed.get("mood", ""),
-                summary=parsed.get("summary", ""),
-                reflection=parsed.get("reflection", "")
-            )
-        finally:
-            session.close()
-            
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Raw output that failed to parse: {raw_output}")
+    if isinstance(e, ValueError):
+        logger.warning("Could not parse analysis output: %s", e)
         # Handle JSON parsing errors
         return JournalAnalysisResponse(
             mood="parsing_error",
             summary="Could not parse AI response",
             reflection="There was an error processing the AI analysis. Please try again.",
         )
+    logger.error("OpenAI API error: %s", e)
+    # Handle other OpenAI errors
+    return JournalAnalysisResponse(
+        mood="error",
+        summary=f"OpenAI API error: {str(e)}",
+        reflection="There was an error connecting to the AI service. Please try again later.",
+    )
+
+async def _store_analysis(session, user_id, journal_text, parsed):
+    """Save an analysis and build the API response for it"""
+    try:
+        # Create new journal analysis record
+        with stage_timer("db_commit"):
+            new_journal_analysis = await JournalAnalysisRepository(session).add(user_id, journal_text, parsed)
+            await session.commit()
+        
+        logger.info(
+            "Saved journal entry",
+            extra={"user_id": user_id, "entry_id": new_journal_analysis.id, "mood": new_journal_analysis.mood}
+        )
+        
+        # Return the response with database ID and timestamp
+        return JournalAnalysisResponse(
+            id=new_journal_analysis.id,
+            mood=new_journal_analysis.mood,
+            summary=new_journal_analysis.summary,
+            reflection=new_journal_analysis.reflection,
+            created_at=new_journal_analysis.created_at
+        )
+        
+    except Exception as db_error:
+        await session.rollback()
+        logger.error("Database error saving journal entry: %s", db_error, extra={"user_id": user_id})
+        # Return response without database ID if database fails
+        return JournalAnalysisResponse(
+            mood=parsed.get("mood", ""),
+            summary=parsed.get("summary", ""),
+            reflection=parsed.get("reflection", "")
+        )
+
+@app.post("/analyze-journal", response_model=JournalAnalysisResponse)
+async def analyze_journal(
+    payload: JournalInput,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    logger.debug(
+        "Received journal analysis request",
+        extra={"user_id": current_user.id, "text_length": len(payload.journal_text), "sample": True}
+    )
+    
+    try:
+        parsed = await analyze_text(payload.journal_text)
     except Exception as e:
-        print(f"Unexpected error in journal analysis: {e}")
+        return _analysis_error_response(e)
+    
+    try:
+        return await _store_analysis(db, current_user.id, payload.journal_text, parsed)
+    except Exception:
+        logger.exception("Unexpected error in journal analysis")
         # Fallback response when anything fails
         return JournalAnalysisResponse(
             mood="neutral",
@@ -315,54 +374,313 @@ async def analyze_journal(payload: JournalInput, current_user: UserModel = Depen
             reflection="Your journal entry has been received. Please check your OpenAI account billing to enable AI analysis.",
         )
 
-@app.get("/journal-entries")
-async def get_journal_entries(current_user: UserModel = Depends(get_current_user)):
-    """Get all journal entries from the database"""
-    print(f"Fetching journal entries for user: {current_user.id}")
-    session = SessionLocal()
+@app.post("/analyze-journal/stream")
+async def analyze_journal_stream(payload: JournalInput, current_user: CachedUser = Depends(get_current_user)):
+    """Stream the analysis as server-sent events, then save it like /analyze-journal
+
+    Emits `field` events ({field, delta}) while the model writes, then one
+    `result` event with the saved entry (or the placeholder analysis on error).
+    """
+    logger.debug("Received streaming journal analysis request", extra={"user_id": current_user.id, "sample": True})
+    
+    async def events():
+        parsed = None
+        try:
+            async for event, data in stream_analysis_events(payload.journal_text):
+                if event == "field":
+                    yield format_sse("field", data)
+                else:
+                    parsed = data
+        except Exception as e:
+            yield format_sse("result", jsonable_encoder(_analysis_error_response(e)))
+            return
+        
+        # The generator outlives the request's dependencies, so it opens its own session
+        async with AsyncSessionLocal() as session:
+            result = await _store_analysis(session, current_user.id, payload.journal_text, parsed)
+        yield format_sse("result", jsonable_encoder(result))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analyze-journal/batch")
+async def analyze_journal_batch(payload: BatchJournalInput, current_user: CachedUser = Depends(get_current_user)):
+    """Analyze many journal entries at once (imports, backfills) and report per-entry status"""
+    if not payload.entries:
+        raise HTTPException(status_code=400, detail="No journal entries provided")
+    if len(payload.entries) > BATCH_MAX_ENTRIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ENTRIES} entries per batch")
+    
+    entries = [(entry.journal_text, _as_naive_utc(entry.created_at, "created_at")) for entry in payload.entries]
+    
+    logger.info("Received batch analysis request", extra={"user_id": current_user.id, "entries": len(entries)})
     try:
-        entries = session.query(JournalAnalysisModel).filter(JournalAnalysisModel.user_id == current_user.id).order_by(JournalAnalysisModel.created_at.desc()).all()
-        print(f"Found {len(entries)} journal entries for user {current_user.id}")
-        return [
-            {
-                "id": entry.id,
-                "journal_text": entry.journal_text,
-                "mood": entry.mood,
-                "summary": entry.summary,
-                "reflection": entry.reflection,
-                "created_at": entry.created_at.isoformat() if entry.created_at else None
-            }
-            for entry in entries
-        ]
-    except Exception as e:
-        print(f"Error fetching journal entries: {e}")
+        return await analyze_batch(current_user.id, entries)
+    except Exception:
+        logger.exception("Error in batch analysis")
+        raise HTTPException(status_code=500, detail="Failed to analyze journal entries")
+
+@app.post("/analysis", status_code=202)
+async def submit_analysis(
+    payload: JournalInput,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue a journal entry for analysis and return the job to poll"""
+    job = await serialize_job(db, await enqueue_job(db, current_user.id, payload.journal_text))
+    worker_pool.notify()
+    logger.debug("Queued analysis job", extra={"job_id": job["id"], "user_id": current_user.id, "sample": True})
+    return job
+
+@app.get("/analysis/{job_id}")
+async def get_analysis(job_id: int, current_user: CachedUser = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Get the status of an analysis job, with the analysis once it's done"""
+    job = await get_job(db, current_user.id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return await serialize_job(db, job)
+
+@app.get("/analysis/{job_id}/events")
+async def stream_analysis_status(job_id: int, current_user: CachedUser = Depends(get_current_user)):
+    """Server-sent events for an analysis job, ends once the job is done or failed"""
+    job = await load_job(current_user.id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+
+    async def events(job):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + ANALYSIS_EVENTS_TIMEOUT
+        last_status = None
+        while True:
+            if job["status"] != last_status:
+                last_status = job["status"]
+                event = "result" if last_status in (JOB_DONE, JOB_FAILED) else "status"
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+            if last_status in (JOB_DONE, JOB_FAILED) or loop.time() >= deadline:
+                return
+            await worker_pool.wait_for_update(job_id, timeout=worker_pool.poll_interval)
+            job = await load_job(current_user.id, job_id)
+
+    return StreamingResponse(
+        events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/journal-entries", response_model=List[JournalEntryResponse])
+async def get_journal_entries(
+    limit: int = Query(JOURNAL_PAGE_SIZE_DEFAULT, ge=1, le=JOURNAL_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get one page of journal entries, newest first
+
+    The cursor for the next page is returned in the X-Next-Cursor header,
+    `fields` selects columns (e.g. fields=id,mood,created_at) and from/to
+    filter on created_at (from inclusive, to exclusive). Answers 304 Not
+    Modified when If-None-Match holds the current ETag.
+    """
+    date_from, date_to = _as_naive_utc(date_from, "from"), _as_naive_utc(date_to, "to")
+    try:
+        # Every query parameter is in the URL, which clients key their copies by
+        etag = user_etag(current_user.id, await UserRepository(db).data_version(current_user.id))
+        response = not_modified("journal_entries", if_none_match, etag)
+        if response is not None:
+            return response
+        entries, next_cursor = await JournalAnalysisRepository(db).list_page(
+            current_user.id,
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+            date_from=date_from,
+            date_to=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error fetching journal entries")
         raise HTTPException(status_code=500, detail="Failed to fetch journal entries")
-    finally:
-        session.close()
+    
+    logger.debug("Journal entries served", extra={"user_id": current_user.id, "entries": len(entries), "sample": True})
+    headers = cache_headers(etag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return OrjsonResponse(entries, headers=headers)
+
+@app.get("/journal-entries/search", response_model=List[JournalSearchResult])
+async def search_journal_entries(
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(JOURNAL_SEARCH_PAGE_SIZE_DEFAULT, ge=1, le=JOURNAL_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search over journal text, summaries and reflections, best match first
+
+    Each result carries a snippet with the matched words wrapped in **; the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        results, next_cursor = await JournalAnalysisRepository(db).search(
+            current_user.id, q, limit=limit, cursor=cursor
+        )
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error searching journal entries")
+        raise HTTPException(status_code=500, detail="Failed to search journal entries")
+
+    logger.debug("Journal search served", extra={"user_id": current_user.id, "results": len(results), "sample": True})
+    return OrjsonResponse(results, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+@app.get("/journal-entries/{entry_id}/similar", response_model=List[SimilarJournalEntry])
+async def similar_journal_entries(
+    entry_id: int,
+    limit: int = Query(SIMILAR_DEFAULT_LIMIT, ge=1, le=SIMILAR_MAX_LIMIT),
+    same_mood: bool = False,
+    current_user: CachedUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Past entries most similar to this one (cosine similarity of their embeddings), closest first
+
+    same_mood=true only considers entries with the same mood.
+    """
+    try:
+        with stage_timer("similar"):
+            entries = await JournalAnalysisRepository(db).similar(current_user.id, entry_id, limit, same_mood=same_mood)
+    except Exception:
+        logger.exception("Error finding similar journal entries")
+        raise HTTPException(status_code=500, detail="Failed to find similar journal entries")
+
+    if entries is None:
+        raise HTTPException(status_code=404, detail="Journal entry not found")
+    return OrjsonResponse(entries)
 
 @app.delete("/delete-journal/{entry_id}")
-def delete_journal(entry_id: int, current_user: UserModel = Depends(get_current_user)):
+async def delete_journal(entry_id: int, current_user: CachedUser = Depends(get_current_user), session: AsyncSession = Depends(get_db)):
     """Delete journal based on it id from the database"""
-    print(f"Deleting journal: {entry_id} for user: {current_user.id}")
-    session = SessionLocal()
     try: 
-        entry = session.query(JournalAnalysisModel).filter(JournalAnalysisModel.user_id == current_user.id, JournalAnalysisModel.id == entry_id).first()
+        entries = JournalAnalysisRepository(session)
+        entry = await entries.get(current_user.id, entry_id)
         
         if not entry:
-            print(f"Entry {entry_id} for user {current_user.id} not found")
+            logger.info("Journal entry to delete not found", extra={"user_id": current_user.id, "entry_id": entry_id})
             return False
         
-        session.delete(entry)
-        session.commit()
-        print(f"Entry {entry_id} for user {current_user.id} deleted successfully")
+        # Jobs that produced this entry point at it, they are dropped with it
+        await entries.remove(entry)
+        await session.commit()
+        logger.info("Deleted journal entry", extra={"user_id": current_user.id, "entry_id": entry_id})
         return True
-    except Exception as e:
-        session.rollback()
-        print(f"Error deleting entry: {e}")
+    except Exception:
+        await session.rollback()
+        logger.exception("Error deleting journal entry")
         raise HTTPException(status_code=500, detail="Failed to delete journal entry")
-    finally: 
-        session.close()
+
+def _cache_requests():
+    analysis = analysis_cache.stats()
+    return {
+        ("token", "hit"): token_cache.hits,
+        ("token", "miss"): token_cache.misses,
+        ("user", "hit"): user_cache.hits,
+        ("user", "miss"): user_cache.misses,
+        ("analysis", "hit"): analysis["memory_hits"] + analysis["db_hits"],
+        ("analysis", "miss"): analysis["misses"],
+        ("vectors", "hit"): vector_index.hits,
+        ("vectors", "miss"): vector_index.misses,
+    }
+
+def _cache_hit_ratio():
+    totals = {}
+    for (cache, result), count in _cache_requests().items():
+        hits, lookups = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (count if result == "hit" else 0), lookups + count)
+    return {(cache,): hits / lookups for cache, (hits, lookups) in totals.items() if lookups}
+
+def _pool_usage():
+    stats = pool_stats()
+    return {(key,): stats[key] for key in ("size", "checked_out", "overflow") if key in stats}
+
+
+register_collector("journal_cache_requests_total", "Cache lookups by cache and result", "counter", ["cache", "result"], _cache_requests)
+register_collector("journal_cache_hit_ratio", "Share of cache lookups that hit since startup", "gauge", ["cache"], _cache_hit_ratio)
+register_collector(
+    "journal_vector_cache_vectors", "Entry vectors held in memory for similar-entry search", "gauge", [],
+    lambda: {(): vector_index.vectors()}
+)
+register_collector(
+    "journal_conditional_requests_total", "Conditional GETs by endpoint and result (not_modified: answered 304)",
+    "counter", ["endpoint", "result"], lambda: dict(conditional_requests)
+)
+register_collector("journal_db_pool_connections", "Database pool size and connections in use", "gauge", ["state"], _pool_usage)
+register_collector(
+    "journal_db_pool_checkouts_total", "Pool checkouts by result", "counter", ["result"],
+    lambda: {("ok",): pool_stats().get("checkouts", 0), ("timeout",): pool_stats().get("timeouts", 0)}
+)
+register_collector(
+    "journal_db_pool_wait_seconds_total", "Seconds spent waiting for a pooled connection", "counter", [],
+    lambda: {(): pool_stats().get("wait_seconds_total", 0.0)}
+)
+register_collector("journal_llm_in_flight", "LLM calls currently running", "gauge", [], lambda: {(): llm_client.in_flight})
+register_collector("journal_llm_retries_total", "LLM calls retried after a rate limit", "counter", [], lambda: {(): llm_client.retries})
+register_collector(
+    "journal_jwks_fetches_total", "JWKS fetches by kind", "counter", ["kind"],
+    lambda: {(kind,): value for kind, value in jwks_store.stats().items() if kind != "keys"}
+)
+register_collector(
+    "journal_analysis_jobs_total", "Analysis jobs finished by this process's workers", "counter", ["outcome"],
+    lambda: {("processed",): worker_pool.processed, ("failed",): worker_pool.failed}
+)
+register_collector(
+    "journal_monthly_rollup_runs_total", "Monthly rollup runs by outcome (skipped: another replica held the lock)",
+    "counter", ["outcome"], lambda: {(outcome,): count for outcome, count in rollup_progress.snapshot()["runs"].items()}
+)
+register_collector(
+    "journal_monthly_rollup_users", "Users in the current or last monthly rollup", "gauge", ["state"],
+    lambda: {("done",): rollup_progress.users_done, ("total",): rollup_progress.users_total}
+)
+register_collector(
+    "journal_monthly_rollup_duration_seconds", "Runtime of the last finished monthly rollup", "gauge", [],
+    lambda: {(): rollup_progress.duration_seconds or 0.0}
+)
+register_collector(
+    "journal_startup_phase_seconds", "Startup phases; import and ready are measured from the start of the import",
+    "gauge", ["phase"], lambda: {(phase,): seconds for phase, seconds in startup_timer.phases.items()}
+)
+register_collector(
+    "journal_cold_start_seconds", "Time from the start of the import to the first response sent", "gauge", [],
+    lambda: {} if startup_timer.first_request_seconds is None else {(): startup_timer.first_request_seconds}
+)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/health")
+async def health():
+    """Liveness check with connection pool usage (checked out, overflow, checkout wait times)"""
+    return {
+        "status": "ok",
+        "db_pool": pool_stats(),
+        "monthly_rollup": rollup_progress.snapshot(),
+        "startup": startup_timer.snapshot(),
+    }
+
+startup_timer.mark("import")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # log_config=None: uvicorn's loggers propagate to the structured root handler
+    configure_logging()
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_config=None)
     
\ No newline at end of file
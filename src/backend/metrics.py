@@ -0,0 +1,311 @@
+"""
+In-process metrics rendered in the Prometheus text format on GET /metrics.
+
+There is nothing to run next to the API: counters, histograms and summaries
+live in this process and are rendered on each scrape (Prometheus, or just
+curl). With several uvicorn workers each one reports its own numbers, so
+scrape them individually or aggregate by instance.
+
+Typical use:
+    with stage_timer("llm"):
+        raw_output = await llm_client.complete_text(...)
+
+Values that other components already count (cache hits, pool usage) are
+read at scrape time through register_collector instead of being copied.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_ROUTE_LATENCY = os.getenv("METRICS_ROUTE_LATENCY", "true").lower() == "true"
+METRICS_SUMMARY_WINDOW = int(os.getenv("METRICS_SUMMARY_WINDOW", "1024"))  # Recent samples per route for percentiles
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        lines = self._header()
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = (("le", "+Inf"),)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Summary(_Metric):
+    """Quantiles over the last `window` observations per label set, plus sum and count"""
+
+    kind = "summary"
+
+    def __init__(self, name, documentation, labelnames=(), quantiles=(0.5, 0.9, 0.99), window=METRICS_SUMMARY_WINDOW):
+        super().__init__(name, documentation, labelnames)
+        self.quantiles = quantiles
+        self.window = window
+        self._values = {}  # key -> [samples deque, sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [deque(maxlen=self.window), 0.0, 0]
+            series[0].append(value)
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {key: (sorted(samples), total, count) for key, (samples, total, count) in self._values.items()}
+        lines = self._header()
+        for key, (samples, total, count) in sorted(values.items()):
+            for quantile in self.quantiles:
+                value = samples[min(len(samples) - 1, int(quantile * len(samples)))]
+                q = (("quantile", str(quantile)),)
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key, q)} {_format_value(value)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+def register_collector(name, documentation, kind, labelnames, collect):
+    """Export values owned elsewhere; collect() returns {label values tuple: value} at scrape time"""
+    _collectors.append((name, documentation, kind, tuple(labelnames), collect))
+
+
+def render_metrics():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, documentation, kind, labelnames, collect in _collectors:
+        try:
+            values = collect()
+        except Exception:
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "journal_stage_duration_seconds",
+    "Time spent in each stage of handling a request",
+    ["stage"],
+)
+STAGE_ERRORS = Counter(
+    "journal_stage_errors_total",
+    "Stages that ended with an exception",
+    ["stage"],
+)
+LLM_REQUESTS = Counter(
+    "journal_llm_requests_total",
+    "LLM calls by kind (complete, stream, embed) and outcome",
+    ["kind", "outcome"],
+)
+LLM_TOKENS = Counter(
+    "journal_llm_tokens_total",
+    "Tokens reported by the LLM provider",
+    ["type"],
+)
+ROUTE_LATENCY = Summary(
+    "journal_http_request_duration_seconds",
+    "Request latency per route, quantiles over the most recent requests",
+    ["method", "route", "status"],
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a block as one stage (jwks, token_verify, user_lookup, llm, parse, db_commit, ...)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+
+
+class RouteLatencyMiddleware:
+    """ASGI middleware recording each request's latency under its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up cardinality
+            route_path = getattr(route, "path", None) or "unmatched"
+            ROUTE_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope.get("method", ""), route=route_path, status=status["code"]
+            )
+
+
+class StartupTimer:
+    """Cold start of this process: startup phases and the time from import to the first response"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+        self.first_request_seconds = None
+
+    def mark(self, phase):
+        """Record phase as ending now, measured from the start of the import"""
+        self.phases[phase] = time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = time.perf_counter() - started
+
+    def record_first_request(self):
+        if self.first_request_seconds is not None:
+            return False
+        self.first_request_seconds = time.perf_counter() - self.started
+        return True
+
+    def snapshot(self):
+        return {
+            "phases_seconds": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "first_request_seconds": (
+                round(self.first_request_seconds, 4) if self.first_request_seconds is not None else None
+            ),
+        }
+
+
+class FirstRequestMiddleware:
+    """ASGI middleware stopping a StartupTimer when the first HTTP response has been sent"""
+
+    def __init__(self, app, timer, on_first_request=None):
+        self.app = app
+        self.timer = timer
+        self.on_first_request = on_first_request
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.timer.first_request_seconds is not None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if self.timer.record_first_request() and self.on_first_request is not None:
+                self.on_first_request(self.timer)
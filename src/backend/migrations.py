@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations.
+
+Each migration runs once per database in its own transaction and is recorded
+in the schema_version table. Starting the API, a standalone
+worker or a command line tool costs one query (SELECT MAX(version) FROM
+schema_version, see check_schema/ensure_schema); pending migrations are applied
+then when MIGRATE_ON_STARTUP=true (the default), otherwise the process refuses
+to start until they have been run with
+
+    python migrations.py upgrade
+    python migrations.py status
+
+A new database gets today's tables from migration 2 (create_all), so every
+migration checks before it changes anything: it brings databases created by
+older versions of the app up to date and is a no-op on new ones. Add new
+migrations at the end of MIGRATIONS, never renumber applied ones.
+
+On PostgreSQL each migration transaction holds an advisory lock, so replicas
+starting at the same time apply every migration exactly once.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from db import async_engine, engine
+from journal_search import FTS_TABLE, SEARCH_CONFIG
+from models import Base
+from mood_counts import rebuild_mood_counts
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+MIGRATION_LOCK_KEY = 7_310_018_021  # Any constant shared by every replica
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _columns(connection, table_name):
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def _add_column_if_missing(connection, table_name, column_name, definition):
+    if not inspect(connection).has_table(table_name) or column_name in _columns(connection, table_name):
+        return False
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"))
+    return True
+
+
+def legacy_columns(connection):
+    """Columns added to users, journal_analysis and monthly_summaries after their first release
+
+    Tables that don't exist yet are left to create_tables.
+    """
+    _add_column_if_missing(connection, "users", "email", "VARCHAR")
+    _add_column_if_missing(connection, "users", "name", "VARCHAR")
+    _add_column_if_missing(connection, "journal_analysis", "user_id", "INTEGER")
+    _add_column_if_missing(connection, "journal_analysis", "journal_text", "TEXT")
+    if _add_column_if_missing(connection, "journal_analysis", "created_at", "TIMESTAMP"):
+        # SQLite only takes constant defaults in ADD COLUMN, so stamp existing rows separately
+        connection.execute(text("UPDATE journal_analysis SET created_at = CURRENT_TIMESTAMP"))
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE journal_analysis ALTER COLUMN created_at SET DEFAULT NOW()"))
+    # Summaries written before they were per user belonged to the first user
+    _add_column_if_missing(connection, "monthly_summaries", "user_id", "INTEGER NOT NULL DEFAULT 1")
+
+    inspector = inspect(connection)
+    # SQLite can't add constraints to an existing table
+    if connection.dialect.name == "postgresql" and inspector.has_table("users"):
+        foreign_keys = {
+            (table_name, tuple(fk["constrained_columns"]))
+            for table_name in ("journal_analysis", "monthly_summaries")
+            if inspector.has_table(table_name)
+            for fk in inspector.get_foreign_keys(table_name)
+        }
+        if inspector.has_table("journal_analysis") and ("journal_analysis", ("user_id",)) not in foreign_keys:
+            connection.execute(text(
+                "ALTER TABLE journal_analysis ADD CONSTRAINT fk_journal_user FOREIGN KEY (user_id) REFERENCES users(id)"
+            ))
+        if inspector.has_table("monthly_summaries") and ("monthly_summaries", ("user_id",)) not in foreign_keys:
+            connection.execute(text(
+                "ALTER TABLE monthly_summaries ADD CONSTRAINT fk_monthly_summaries_user "
+                "FOREIGN KEY (user_id) REFERENCES users(id)"
+            ))
+            connection.execute(text("ALTER TABLE monthly_summaries ALTER COLUMN user_id DROP DEFAULT"))
+
+
+def create_tables(connection):
+    """Create missing tables with their current columns and indexes"""
+    existing = set(inspect(connection).get_table_names())
+    Base.metadata.create_all(bind=connection)
+    if "journal_analysis" in existing and "daily_mood_counts" not in existing:
+        # Seed the counters from the entries written before they existed
+        rebuild_mood_counts(Session(bind=connection))
+
+
+def journal_listing_index(connection):
+    """(user_id, created_at DESC, id DESC) index behind /journal-entries pagination"""
+    connection.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_journal_analysis_user_created
+        ON journal_analysis (user_id, created_at DESC, id DESC)
+    """))
+
+
+def backup_tracking(connection):
+    """journal_analysis.updated_at (backfilled from created_at) and the deleted_rows tombstones"""
+    if _add_column_if_missing(
+        connection, "journal_analysis", "updated_at",
+        "TIMESTAMP" if connection.dialect.name == "postgresql" else "DATETIME"
+    ):
+        connection.execute(text("UPDATE journal_analysis SET updated_at = created_at WHERE updated_at IS NULL"))
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("ALTER TABLE journal_analysis ALTER COLUMN updated_at SET NOT NULL"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_journal_analysis_updated_at ON journal_analysis (updated_at)"))
+    Base.metadata.tables["deleted_rows"].create(bind=connection, checkfirst=True)
+
+
+def monthly_summary_unique(connection):
+    """Keep the most recently updated row per (user_id, month), then make the pair unique"""
+    connection.execute(text("""
+        DELETE FROM monthly_summaries
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, month ORDER BY updated_at DESC, id DESC
+                ) AS position
+                FROM monthly_summaries
+            ) ranked
+            WHERE position > 1
+        )
+    """))
+    connection.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_monthly_summaries_user_month
+        ON monthly_summaries (user_id, month)
+    """))
+
+
+def journal_search_index(connection):
+    """Full-text index over journal_text, summary and reflection (see journal_search)"""
+    if connection.dialect.name == "postgresql":
+        # Generated, so PostgreSQL keeps it current on every write; adding it rewrites the table once
+        connection.execute(text(f"""
+            ALTER TABLE journal_analysis ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(journal_text, '')), 'A') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(summary, '')), 'B') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(reflection, '')), 'C')
+            ) STORED
+        """))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_journal_analysis_search ON journal_analysis USING GIN (search_vector)"
+        ))
+        return
+    if connection.dialect.name != "sqlite":
+        logger.warning("No full-text index for %s, /journal-entries/search is unavailable", connection.dialect.name)
+        return
+
+    # External content: the FTS table only holds the index, the text stays in journal_analysis
+    connection.execute(text(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            journal_text, summary, reflection,
+            content='journal_analysis', content_rowid='id', tokenize='porter unicode61'
+        )
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON journal_analysis BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, journal_text, summary, reflection)
+            VALUES (new.id, new.journal_text, new.summary, new.reflection);
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON journal_analysis BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, journal_text, summary, reflection)
+            VALUES ('delete', old.id, old.journal_text, old.summary, old.reflection);
+        END
+    """))
+    connection.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF journal_text, summary, reflection
+        ON journal_analysis BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, journal_text, summary, reflection)
+            VALUES ('delete', old.id, old.journal_text, old.summary, old.reflection);
+            INSERT INTO {FTS_TABLE} (rowid, journal_text, summary, reflection)
+            VALUES (new.id, new.journal_text, new.summary, new.reflection);
+        END
+    """))
+    # Index the entries written before the triggers existed
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def journal_embeddings(connection):
+    """Per-entry vectors (see embeddings), filled for existing entries by `python embeddings.py backfill`"""
+    Base.metadata.tables["journal_embeddings"].create(bind=connection, checkfirst=True)
+
+
+def user_data_version(connection):
+    """users.data_version, the per-user write counter behind the list endpoints' ETags (see conditional)"""
+    _add_column_if_missing(connection, "users", "data_version", "BIGINT NOT NULL DEFAULT 0")
+
+
+def restore_log(connection):
+    """restore_log, written by restore_db so running API processes drop their cached user ids"""
+    Base.metadata.tables["restore_log"].create(bind=connection, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "Legacy users/journal_analysis/monthly_summaries columns", legacy_columns),
+    (2, "Create missing tables", create_tables),
+    (3, "journal_analysis listing index", journal_listing_index),
+    (4, "journal_analysis.updated_at and deleted_rows for incremental backups", backup_tracking),
+    (5, "Unique (user_id, month) on monthly_summaries", monthly_summary_unique),
+    (6, "Full-text search index on journal_analysis", journal_search_index),
+    (7, "journal_embeddings for similar-entry search", journal_embeddings),
+    (8, "users.data_version for conditional GET", user_data_version),
+    (9, "restore_log for cache invalidation after restores", restore_log),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _lock(connection):
+    if connection.dialect.name == "postgresql":
+        # Released when the transaction ends
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def current_version(connection):
+    """Highest applied migration, 0 for a database that predates versioning"""
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+async def database_version():
+    """The startup check: one query on the API's engine, 0 if nothing was ever applied"""
+    async with async_engine.connect() as connection:
+        try:
+            return (await connection.execute(select(func.max(schema_version.c.version)))).scalar() or 0
+        except DBAPIError:
+            # No schema_version table yet
+            return 0
+
+
+def migrate(bind=engine):
+    """Apply pending migrations in order, returns the versions applied"""
+    with bind.begin() as connection:
+        _lock(connection)
+        schema_version.create(bind=connection, checkfirst=True)
+
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        with bind.begin() as connection:
+            _lock(connection)
+            # Re-read under the lock, another replica may have just applied it
+            if current_version(connection) >= version:
+                continue
+            logger.info("Applying migration %d: %s", version, description)
+            upgrade(connection)
+            connection.execute(
+                insert(schema_version).values(version=version, description=description, applied_at=datetime.utcnow())
+            )
+        applied.append(version)
+    return applied
+
+
+def _outdated(version):
+    return RuntimeError(
+        f"Database schema is at version {version}, expected {LATEST_VERSION}: run `python migrations.py upgrade`"
+    )
+
+
+async def check_schema():
+    """Startup check for async processes: applies pending migrations if MIGRATE_ON_STARTUP, otherwise raises"""
+    version = await database_version()
+    if version >= LATEST_VERSION:
+        return []
+    if not MIGRATE_ON_STARTUP:
+        raise _outdated(version)
+    applied = await asyncio.to_thread(migrate)
+    logger.info("Applied database migrations", extra={"migrations": applied})
+    return applied
+
+
+def ensure_schema(bind=engine):
+    """check_schema for the sync command line tools"""
+    with bind.connect() as connection:
+        version = current_version(connection)
+    if version >= LATEST_VERSION:
+        return []
+    if not MIGRATE_ON_STARTUP:
+        raise _outdated(version)
+    applied = migrate(bind)
+    logger.info("Applied database migrations", extra={"migrations": applied})
+    return applied
+
+
+def status(bind=engine):
+    """(version, description, applied_at or None) for every migration"""
+    with bind.connect() as connection:
+        applied = {}
+        if inspect(connection).has_table(schema_version.name):
+            applied = dict(connection.execute(select(schema_version.c.version, schema_version.c.applied_at)).all())
+    return [(version, description, applied.get(version)) for version, description, _ in MIGRATIONS]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "upgrade":
+        applied = migrate()
+        print(f"Applied migrations {applied}" if applied else "Database schema is up to date")
+    elif len(sys.argv) > 1 and sys.argv[1] == "status":
+        for version, description, applied_at in status():
+            print(f"  {version:>3}  {'applied ' + str(applied_at) if applied_at else 'pending':<36}  {description}")
+    else:
+        print("Usage:")
+        print("  python migrations.py upgrade   # Apply pending migrations")
+        print("  python migrations.py status    # Show applied and pending migrations")
@@ -6,6 +6,12 @@ Base = declarative_base()
 from .user import User
 from .journal_analysis import JournalAnalysis
 from .monthly_summary import MonthlySummary
+from .analysis_cache import AnalysisCacheEntry
+from .analysis_job import AnalysisJob
+from .daily_mood_count import DailyMoodCount
+from .deleted_row import DeletedRow
+from .journal_embedding import JournalEmbedding
+from .restore_log import RestoreLog
 
 # Now that both models are imported, we can set up the relationships
 from sqlalchemy.orm import relationship
@@ -16,4 +22,4 @@ User.journal_entries = relationship("JournalAnalysis", back_populates="user")
 # Add relationship to JournalAnalysis model  
 JournalAnalysis.user = relationship("User", back_populates="journal_entries")
 
-__all__ = ['Base', 'User', 'JournalAnalysis', 'MonthlySummary']
+__all__ = ['Base', 'User', 'JournalAnalysis', 'MonthlySummary', 'AnalysisCacheEntry', 'AnalysisJob', 'DailyMoodCount', 'DeletedRow', 'JournalEmbedding', 'RestoreLog']
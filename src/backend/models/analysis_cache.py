@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from . import Base
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256 of normalized text + model + prompt version
+    model = Column(String(100), nullable=False)
+    prompt_version = Column(String(20), nullable=False, index=True)
+    mood = Column(String(100), nullable=False)
+    summary = Column(Text, nullable=False)
+    reflection = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False)
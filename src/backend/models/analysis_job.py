@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from datetime import datetime
+from . import Base
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    journal_text = Column(Text, nullable=False)
+    status = Column(String(20), default="queued", nullable=False, index=True)  # queued, running, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("journal_analysis.id"), nullable=True)  # Set once the analysis is saved
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Retries are delayed with backoff
+    started_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
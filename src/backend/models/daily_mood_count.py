@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, UniqueConstraint
+from . import Base
+
+class DailyMoodCount(Base):
+    __tablename__ = "daily_mood_counts"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)  # UTC day of JournalAnalysis.created_at
+    mood = Column(String(100), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        # Also the index behind per-user day range reads
+        UniqueConstraint("user_id", "day", "mood", name="uq_daily_mood_counts_user_day_mood"),
+    )
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from . import Base
+
+class DeletedRow(Base):
+    __tablename__ = "deleted_rows"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String(64), nullable=False)
+    row_id = Column(Integer, nullable=False)  # Primary key of the deleted row
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # Incremental backups read deletions since the previous backup
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from datetime import datetime
 from . import Base
 
@@ -11,4 +11,12 @@ class JournalAnalysis(Base):
     mood = Column(String(100), nullable=False)
     summary = Column(Text, nullable=False)
     reflection = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Serves per-user listings newest first and keyset pagination on (created_at, id)
+        Index("ix_journal_analysis_user_created", "user_id", created_at.desc(), id.desc()),
+        # Incremental backups read rows changed since the previous backup
+        Index("ix_journal_analysis_updated_at", "updated_at"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Index
+from datetime import datetime
+from . import Base
+
+class JournalEmbedding(Base):
+    __tablename__ = "journal_embeddings"
+    
+    analysis_id = Column(Integer, ForeignKey("journal_analysis.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    model = Column(String(100), nullable=False)  # Embedder that produced the vector, e.g. "hashing-256"
+    vector = Column(LargeBinary, nullable=False)  # L2-normalized little-endian float32, see embeddings.py
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # A user's vectors are loaded in one range read
+        Index("ix_journal_embeddings_user_model", "user_id", "model"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
 from datetime import datetime
 from . import Base
 
@@ -7,8 +7,13 @@ class MonthlySummary(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    month = Column(String(7), nullable=False)  # Removed unique constraint since multiple users can have same month
+    month = Column(String(7), nullable=False)  # YYYY-MM, unique per user (see below)
     daily_data = Column(JSON, nullable=False) 
     monthly_totals = Column(JSON, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # One row per user and month, also the conflict target of the rollup's upsert
+        Index("uq_monthly_summaries_user_month", "user_id", "month", unique=True),
+    )
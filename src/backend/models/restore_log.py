@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime
+from . import Base
+
+class RestoreLog(Base):
+    __tablename__ = "restore_log"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    backup = Column(String(64), nullable=False)  # Newest backup of the restored chain
+    restored_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # API processes clear their user caches when a new row appears
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import BigInteger, Column, Integer, String
 from . import Base
 
 class User(Base):
@@ -9,3 +9,5 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=True)
     name = Column(String, nullable=True)
     picture = Column(String, nullable=True)
+    # Bumped by every journal write, the ETags of the list endpoints are built from it (see conditional.py)
+    data_version = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Monthly rollup: stores every user's mood summary for a month in monthly_summaries.
+
+The rows are built from the per-day counters (daily_mood_counts) in chunks of
+users: per chunk one range read of the counters and one batched
+INSERT ... ON CONFLICT (user_id, month) DO UPDATE, each chunk committed on its
+own so progress survives a crash. Rerunning a month rewrites the same rows, so
+the job is idempotent and safe to retry.
+
+A database advisory lock keeps API replicas that all run the scheduler from
+rolling up at the same time; a replica that finds the lock taken skips the run.
+Progress and timings are kept in `rollup_progress` (exported on /metrics and
+/health) and logged per chunk.
+
+    python monthly_rollup.py            # the previous month
+    python monthly_rollup.py 2025-08    # a given month
+
+Settings:
+    ROLLUP_USER_CHUNK=500
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+
+from db import SessionLocal, advisory_lock, dialect_insert
+from logging_config import request_id_var
+from models import DailyMoodCount, DeletedRow, MonthlySummary
+from mood_counts import build_month_summary, month_bounds
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_USER_CHUNK = int(os.getenv("ROLLUP_USER_CHUNK", "500"))
+ROLLUP_LOCK_KEY = 7_310_018_221  # Any constant shared by every replica
+
+_MONTH_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+class RollupProgress:
+    """State of the current (or last) rollup run, read by /metrics and /health"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = "idle"  # idle, running, done, failed
+        self.month = None
+        self.users_total = 0
+        self.users_done = 0
+        self.started_at = None
+        self.finished_at = None
+        self.duration_seconds = None
+        self.error = None
+        self.runs = {"ok": 0, "failed": 0, "skipped": 0}
+
+    def start(self, month, users_total):
+        with self._lock:
+            self.state, self.month = "running", month
+            self.users_total, self.users_done = users_total, 0
+            self.started_at, self.finished_at = datetime.utcnow(), None
+            self.duration_seconds = self.error = None
+
+    def advance(self, users):
+        with self._lock:
+            self.users_done += users
+
+    def finish(self, seconds, error=None):
+        with self._lock:
+            self.state = "failed" if error else "done"
+            self.finished_at = datetime.utcnow()
+            self.duration_seconds = round(seconds, 3)
+            self.error = error
+            self.runs["failed" if error else "ok"] += 1
+
+    def skip(self):
+        with self._lock:
+            self.runs["skipped"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "month": self.month,
+                "users_total": self.users_total,
+                "users_done": self.users_done,
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+                "duration_seconds": self.duration_seconds,
+                "error": self.error,
+                "runs": dict(self.runs),
+            }
+
+
+rollup_progress = RollupProgress()
+
+
+def previous_month(today=None):
+    today = today or datetime.utcnow().date()
+    return f"{today.year - 1}-12" if today.month == 1 else f"{today.year}-{today.month - 1:02d}"
+
+
+def _month_users(month):
+    """Users with at least one counter in month"""
+    start, end = month_bounds(month)
+    return select(DailyMoodCount.user_id).distinct().where(DailyMoodCount.day >= start, DailyMoodCount.day < end)
+
+
+def delete_summaries(session, *criteria):
+    """Delete the MonthlySummary rows matching criteria, logging them in deleted_rows for incremental backups"""
+    ids = session.scalars(select(MonthlySummary.id).where(*criteria)).all()
+    if not ids:
+        return 0
+    session.execute(delete(MonthlySummary).where(MonthlySummary.id.in_(ids)))
+    session.execute(insert(DeletedRow), [{"table_name": MonthlySummary.__tablename__, "row_id": row_id} for row_id in ids])
+    return len(ids)
+
+
+def write_summaries(session, month, summaries):
+    """Upsert the month's rows for the users in summaries, the caller commits"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "month": month,
+            "daily_data": summary["daily_data"],
+            "monthly_totals": summary["monthly_totals"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for user_id, summary in summaries.items()
+    ]
+    if not rows:
+        return
+
+    insert_for_dialect = dialect_insert(session.get_bind().dialect.name)
+    if insert_for_dialect is None:
+        # No ON CONFLICT: replace the chunk's rows inside the caller's transaction
+        delete_summaries(session, MonthlySummary.month == month, MonthlySummary.user_id.in_(list(summaries)))
+        session.execute(insert(MonthlySummary), rows)
+        return
+
+    stmt = insert_for_dialect(MonthlySummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MonthlySummary.user_id, MonthlySummary.month],
+        set_={
+            "daily_data": stmt.excluded.daily_data,
+            "monthly_totals": stmt.excluded.monthly_totals,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt, rows)
+
+
+def rollup_chunk(session, month, user_ids):
+    """Summaries for one chunk of users: one counter read, one batched write"""
+    start, end = month_bounds(month)
+    rows = session.execute(
+        select(DailyMoodCount.user_id, DailyMoodCount.day, DailyMoodCount.mood, DailyMoodCount.count)
+        .where(DailyMoodCount.user_id.in_(user_ids), DailyMoodCount.day >= start, DailyMoodCount.day < end)
+        .order_by(DailyMoodCount.user_id, DailyMoodCount.day)
+    ).all()
+    per_user = defaultdict(list)
+    for user_id, day, mood, count in rows:
+        per_user[user_id].append((day, mood, count))
+    summaries = {user_id: build_month_summary(user_rows, user_id, month) for user_id, user_rows in per_user.items()}
+    write_summaries(session, month, summaries)
+    session.commit()
+    return len(summaries)
+
+
+def rollup_month(month, chunk_size=ROLLUP_USER_CHUNK, session_factory=SessionLocal, progress=rollup_progress):
+    """Compute and store every user's summary for month ("YYYY-MM"), returns the number of users"""
+    if not _MONTH_PATTERN.match(month):
+        raise ValueError(f"Invalid month {month!r}, expected YYYY-MM")
+    session = session_factory()
+    started = time.perf_counter()
+    try:
+        users_total = session.scalar(select(func.count()).select_from(_month_users(month).subquery()))
+        progress.start(month, users_total)
+        logger.info("Monthly rollup started", extra={"month": month, "users_total": users_total})
+
+        last_user_id = None
+        while True:
+            query = _month_users(month).order_by(DailyMoodCount.user_id).limit(chunk_size)
+            if last_user_id is not None:
+                query = query.where(DailyMoodCount.user_id > last_user_id)
+            user_ids = session.scalars(query).all()
+            if not user_ids:
+                break
+            progress.advance(rollup_chunk(session, month, user_ids))
+            last_user_id = user_ids[-1]
+            logger.info(
+                "Monthly rollup progress",
+                extra={"month": month, "users_done": progress.users_done, "users_total": users_total}
+            )
+
+        # Users whose entries for the month were all deleted since the last run
+        delete_summaries(session, MonthlySummary.month == month, MonthlySummary.user_id.not_in(_month_users(month)))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        progress.finish(time.perf_counter() - started, error=str(e))
+        logger.exception("Monthly rollup failed", extra={"month": month})
+        raise
+    finally:
+        session.close()
+
+    progress.finish(time.perf_counter() - started)
+    logger.info(
+        "Monthly rollup finished",
+        extra={"month": month, "users": progress.users_done, "duration_seconds": progress.duration_seconds}
+    )
+    return progress.users_done
+
+
+def run_monthly_rollup(month=None):
+    """Scheduler entry point: roll up month (default: the previous one) unless another replica is on it"""
+    month = month or previous_month()
+    token = request_id_var.set(f"rollup-{month}")
+    try:
+        with advisory_lock(ROLLUP_LOCK_KEY) as acquired:
+            if not acquired:
+                rollup_progress.skip()
+                logger.info("Monthly rollup already running elsewhere, skipping", extra={"month": month})
+                return None
+            return rollup_month(month)
+    finally:
+        request_id_var.reset(token)
+
+
+if __name__ == "__main__":
+    import sys
+    from logging_config import configure_logging
+
+    from migrations import ensure_schema
+
+    configure_logging()
+    ensure_schema()
+    try:
+        users = run_monthly_rollup(sys.argv[1] if len(sys.argv) > 1 else None)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    if users is None:
+        print("Another monthly rollup holds the lock, nothing done")
+    else:
+        print(f"Rolled up {users} users in {rollup_progress.duration_seconds}s")
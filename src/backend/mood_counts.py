@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained per-day mood counters (daily_mood_counts).
+
+Every insert or delete of a JournalAnalysis row adjusts the matching
+(user_id, day, mood) counter in the same transaction, so GET /monthly-summary
+is a single indexed range read instead of a rescan of the user's history.
+
+If the counters ever drift (manual SQL, restores), rebuild them with
+    python mood_counts.py rebuild            # every user
+    python mood_counts.py rebuild <user_id>  # one user
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, select, update
+
+from db import dialect_insert
+from models import DailyMoodCount, JournalAnalysis as JournalAnalysisModel
+
+
+def _as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def apply_mood_count_deltas(session, user_id, deltas):
+    """Add deltas ({(day, mood): n}) to the user's counters, the caller commits
+
+    Async code runs this through AsyncSession.run_sync so the counter logic
+    lives in one place.
+    """
+    increments = [
+        {"user_id": user_id, "day": _as_day(day), "mood": mood, "count": n}
+        for (day, mood), n in deltas.items() if n > 0
+    ]
+    decrements = [
+        {"user_id": user_id, "day": _as_day(day), "mood": mood, "count": -n}
+        for (day, mood), n in deltas.items() if n < 0
+    ]
+
+    if increments:
+        insert_for_dialect = dialect_insert(session.get_bind().dialect.name)
+        if insert_for_dialect is not None:
+            stmt = insert_for_dialect(DailyMoodCount)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DailyMoodCount.user_id, DailyMoodCount.day, DailyMoodCount.mood],
+                set_={"count": DailyMoodCount.count + stmt.excluded.count},
+            )
+            session.execute(stmt, increments)
+        else:
+            for row in increments:
+                updated = session.execute(
+                    update(DailyMoodCount)
+                    .filter_by(user_id=user_id, day=row["day"], mood=row["mood"])
+                    .values(count=DailyMoodCount.count + row["count"])
+                ).rowcount
+                if not updated:
+                    session.execute(insert(DailyMoodCount).values(**row))
+
+    for row in decrements:
+        session.execute(
+            update(DailyMoodCount)
+            .filter_by(user_id=user_id, day=row["day"], mood=row["mood"])
+            .values(count=DailyMoodCount.count - row["count"])
+        )
+    if decrements:
+        session.execute(delete(DailyMoodCount).where(DailyMoodCount.user_id == user_id, DailyMoodCount.count <= 0))
+
+
+def month_bounds(month):
+    """First day of month ("YYYY-MM") and of the month after it"""
+    start = datetime.strptime(month, "%Y-%m").date()
+    end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def month_summary_query(user_id, month):
+    """Counter rows for month ("YYYY-MM"), one indexed range read"""
+    start, end = month_bounds(month)
+    return (
+        select(DailyMoodCount.day, DailyMoodCount.mood, DailyMoodCount.count)
+        .where(DailyMoodCount.user_id == user_id, DailyMoodCount.day >= start, DailyMoodCount.day < end)
+        .order_by(DailyMoodCount.day)
+    )
+
+
+def build_month_summary(rows, user_id, month):
+    """Build the /monthly-summary payload from the rows of month_summary_query"""
+    daily_data = defaultdict(dict)
+    monthly_totals = Counter()
+    for day, mood, count in rows:
+        daily_data[day.strftime("%Y-%m-%d")][mood] = count
+        monthly_totals[mood] += count
+
+    return {
+        "month": month,
+        "daily_data": dict(daily_data),
+        "monthly_totals": dict(monthly_totals),
+        "total_entries": sum(monthly_totals.values()),
+        "user_id": user_id,
+    }
+
+
+def rebuild_mood_counts(session, user_id=None):
+    """Recompute counters from journal_analysis with one INSERT ... SELECT"""
+    clear = delete(DailyMoodCount)
+    day = func.date(JournalAnalysisModel.created_at)
+    source = select(
+        JournalAnalysisModel.user_id, day, JournalAnalysisModel.mood, func.count()
+    ).where(JournalAnalysisModel.user_id.is_not(None))
+    if user_id is not None:
+        clear = clear.where(DailyMoodCount.user_id == user_id)
+        source = source.where(JournalAnalysisModel.user_id == user_id)
+    source = source.group_by(JournalAnalysisModel.user_id, day, JournalAnalysisModel.mood)
+
+    session.execute(clear)
+    session.execute(
+        insert(DailyMoodCount).from_select(
+            [DailyMoodCount.user_id, DailyMoodCount.day, DailyMoodCount.mood, DailyMoodCount.count],
+            source
+        )
+    )
+    session.commit()
+    return session.scalar(select(func.count()).select_from(DailyMoodCount))
+
+
+if __name__ == "__main__":
+    import sys
+    from conditional import bump_data_version
+    from db import SessionLocal
+    from migrations import ensure_schema
+
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        ensure_schema()
+        session = SessionLocal()
+        try:
+            user_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+            rows = rebuild_mood_counts(session, user_id)
+            # Monthly summaries may have changed, invalidate the ETags handed out for them
+            session.execute(bump_data_version(user_id))
+            session.commit()
+            print(f"Rebuilt daily mood counts ({rows} counter rows)")
+        finally:
+            session.close()
+    else:
+        print("Usage:")
+        print("  python mood_counts.py rebuild            # Recompute counters for every user")
+        print("  python mood_counts.py rebuild <user_id>  # Recompute counters for one user")
@@ -0,0 +1,122 @@
+"""
+Mood trends over arbitrary date ranges for GET /mood-stats.
+
+Bucketing and counting happen in the database (GROUP BY bucket, mood) so only
+one small row per bucket and mood comes back, never the entries themselves.
+PostgreSQL uses date_trunc; SQLite gets the same Monday-based weeks and
+first-of-month buckets through its date() modifiers. The result is columnar
+(one array per mood aligned with `buckets`), which is what the charts plot.
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, cast, func, select
+
+from models import JournalAnalysis as JournalAnalysisModel
+
+MOOD_STATS_DEFAULT_DAYS = int(os.getenv("MOOD_STATS_DEFAULT_DAYS", "90"))
+MOOD_STATS_MAX_BUCKETS = int(os.getenv("MOOD_STATS_MAX_BUCKETS", "1000"))
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def bucket_expression(dialect_name, granularity, column):
+    """SQL expression for the start date of the bucket containing column"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    if dialect_name == "postgresql":
+        if granularity == "day":
+            return cast(column, Date)
+        return cast(func.date_trunc(granularity, column), Date)
+
+    if dialect_name == "sqlite":
+        if granularity == "day":
+            return func.date(column)
+        if granularity == "week":
+            # Step back six days then forward to the next Monday: the Monday on or before
+            return func.date(column, "-6 days", "weekday 1")
+        return func.strftime("%Y-%m-01", column)
+
+    raise ValueError(f"Mood stats are not supported on {dialect_name}")
+
+
+def bucket_start(value, granularity):
+    """Python equivalent of bucket_expression, used to lay out empty buckets"""
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    return value
+
+
+def next_bucket(value, granularity):
+    if granularity == "day":
+        return value + timedelta(days=1)
+    if granularity == "week":
+        return value + timedelta(days=7)
+    return date(value.year + 1, 1, 1) if value.month == 12 else date(value.year, value.month + 1, 1)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def bucket_starts(date_from, date_to, granularity):
+    """Start dates of every bucket overlapping [date_from, date_to)"""
+    if date_to <= date_from:
+        raise ValueError("'to' must be after 'from'")
+    buckets = []
+    current = bucket_start(_as_date(date_from), granularity)
+    last_day = _as_date(date_to - timedelta(microseconds=1))
+    while current <= last_day:
+        if len(buckets) >= MOOD_STATS_MAX_BUCKETS:
+            raise ValueError(f"Date range spans more than {MOOD_STATS_MAX_BUCKETS} {granularity} buckets")
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def mood_stats_query(dialect_name, user_id, date_from, date_to, granularity="day"):
+    """GROUP BY (bucket, mood) counts between date_from (inclusive) and date_to (exclusive)"""
+    bucket = bucket_expression(dialect_name, granularity, JournalAnalysisModel.created_at)
+    return (
+        select(bucket.label("bucket"), JournalAnalysisModel.mood, func.count().label("count"))
+        .where(
+            JournalAnalysisModel.user_id == user_id,
+            JournalAnalysisModel.created_at >= date_from,
+            JournalAnalysisModel.created_at < date_to,
+        )
+        .group_by(bucket, JournalAnalysisModel.mood)
+    )
+
+
+def build_mood_stats(rows, buckets, date_from, date_to, granularity="day"):
+    """Lay the rows of mood_stats_query out as columnar arrays over buckets (from bucket_starts)"""
+    positions = {value: index for index, value in enumerate(buckets)}
+
+    counts = {}
+    totals = [0] * len(buckets)
+    for row in rows:
+        position = positions.get(_as_date(row.bucket))
+        if position is None:
+            continue
+        series = counts.setdefault(row.mood, [0] * len(buckets))
+        series[position] += row.count
+        totals[position] += row.count
+
+    moods = sorted(counts, key=lambda mood: -sum(counts[mood]))
+    return {
+        "granularity": granularity,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "buckets": [value.isoformat() for value in buckets],
+        "moods": moods,
+        "counts": {mood: counts[mood] for mood in moods},
+        "totals": totals,
+    }
@@ -0,0 +1,53 @@
+"""
+Prompt templates for journal analysis.
+
+Bump ANALYSIS_PROMPT_VERSION whenever the wording below changes (the batch
+prompt asks for the same fields, so it shares the version). The version
+is part of the analysis cache key, so old cached analyses stop matching, and
+`python analysis_cache.py purge` removes them from the database.
+"""
+
+ANALYSIS_PROMPT_VERSION = "1"
+
+ANALYSIS_SYSTEM_PROMPT = "You are a helpful assistant that analyzes journal entries."
+
+
+def build_analysis_prompt(journal_text):
+    return (
+        "Analyze the following journal entry and return a JSON object with:\n"
+        "- mood (one word from a general category such as: happy, sad, angry, anxious, calm, stressed, hopeful, etc.)\n"
+        "- summary (analyze like a therapist but somehow make it's easy to understand)\n"
+        "- reflection (a thoughtful paragraph and some positive advise or encouragement depend on user's journal)\n"
+        "Only return the JSON.\n\n"
+        f"Journal Entry:\n{journal_text}"
+    )
+
+
+def build_analysis_messages(journal_text):
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_analysis_prompt(journal_text)},
+    ]
+
+
+def build_batch_analysis_prompt(journal_texts):
+    entries = "\n\n".join(
+        f"Entry {index}:\n{journal_text}" for index, journal_text in enumerate(journal_texts)
+    )
+    return (
+        "Analyze each of the following journal entries separately and return a JSON array "
+        "with one object per entry, in the same order, each with:\n"
+        "- index (the entry number)\n"
+        "- mood (one word from a general category such as: happy, sad, angry, anxious, calm, stressed, hopeful, etc.)\n"
+        "- summary (analyze like a therapist but somehow make it's easy to understand)\n"
+        "- reflection (a thoughtful paragraph and some positive advise or encouragement depend on user's journal)\n"
+        "Only return the JSON array.\n\n"
+        f"{entries}"
+    )
+
+
+def build_batch_analysis_messages(journal_texts):
+    return [
+        {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+        {"role": "user", "content": build_batch_analysis_prompt(journal_texts)},
+    ]
@@ -0,0 +1,250 @@
+"""
+Async data access for the API and the analysis workers.
+
+Each repository wraps one AsyncSession (from db.get_db or AsyncSessionLocal)
+and never commits on its own, so a handler can group several writes into one
+transaction. Query construction lives next to the feature it serves
+(journal_entries, journal_search, embeddings, mood_stats, mood_counts); the repositories only run it.
+The mood counter maintenance is shared with the sync command line tools and
+runs through AsyncSession.run_sync.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from conditional import bump_data_version
+from db import dialect_insert
+from embeddings import build_user_vectors, embedder, embedding_rows, entry_text, user_vectors_query, vector_index
+from journal_entries import journal_entries_page, journal_entries_query
+from journal_search import journal_search_page, journal_search_query
+from models import (
+    AnalysisJob, DeletedRow, JournalAnalysis as JournalAnalysisModel, JournalEmbedding, RestoreLog, User as UserModel,
+)
+from mood_counts import apply_mood_count_deltas, build_month_summary, month_summary_query
+from mood_stats import build_mood_stats, bucket_starts, mood_stats_query
+from user_cache import CachedUser
+
+logger = logging.getLogger(__name__)
+
+
+class UserRepository:
+    def __init__(self, session):
+        self.session = session
+
+    async def _upsert(self, values):
+        insert_for_dialect = dialect_insert(self.session.get_bind().dialect.name)
+        columns = (UserModel.id, UserModel.auth0_id, UserModel.email, UserModel.name, UserModel.picture)
+
+        if insert_for_dialect is None:
+            # No ON CONFLICT support: insert and fall back to reading the winner's row
+            existing = (await self.session.execute(select(*columns).filter_by(auth0_id=values["auth0_id"]))).first()
+            if existing is not None:
+                return existing
+            try:
+                self.session.add(UserModel(**values))
+                await self.session.commit()
+            except IntegrityError:
+                await self.session.rollback()
+            return (await self.session.execute(select(*columns).filter_by(auth0_id=values["auth0_id"]))).one()
+
+        stmt = insert_for_dialect(UserModel).values(**values)
+        # A no-op update (rather than DO NOTHING) makes RETURNING yield the existing row too
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserModel.auth0_id],
+            set_={"auth0_id": stmt.excluded.auth0_id},
+        ).returning(*columns)
+        row = (await self.session.execute(stmt)).one()
+        await self.session.commit()
+        return row
+
+    async def get_or_create(self, auth0_id, email=None, name=None):
+        """Insert-or-get the users row for auth0_id in one round trip, commits"""
+        values = {"auth0_id": auth0_id, "email": email or None, "name": name or None}
+        try:
+            row = await self._upsert(values)
+        except IntegrityError:
+            # The email is already attached to a different auth0 account (e.g. a
+            # second social login); create this account without it
+            await self.session.rollback()
+            values["email"] = None
+            row = await self._upsert(values)
+        return CachedUser(id=row.id, auth0_id=row.auth0_id, email=row.email, name=row.name, picture=row.picture)
+
+    async def data_version(self, user_id):
+        """The user's write counter that conditional GETs compare against, one primary-key read"""
+        version = await self.session.scalar(select(UserModel.data_version).where(UserModel.id == user_id))
+        return version or 0
+
+    async def latest_restore(self):
+        """Id of the newest restore_log row (0 if the database was never restored)"""
+        return await self.session.scalar(select(func.max(RestoreLog.id))) or 0
+
+
+class JournalAnalysisRepository:
+    def __init__(self, session):
+        self.session = session
+
+    async def add(self, user_id, journal_text, parsed, created_at=None):
+        """Add a JournalAnalysis row and its mood count, the caller commits"""
+        # Embed first: the statements below open the transaction, which mustn't wait on the embedder
+        vectors = await self._embed([entry_text(journal_text, parsed.get("summary", ""))])
+        entry = JournalAnalysisModel(
+            user_id=user_id,
+            journal_text=journal_text,
+            mood=parsed.get("mood", ""),
+            summary=parsed.get("summary", ""),
+            reflection=parsed.get("reflection", ""),
+            created_at=created_at or datetime.utcnow()
+        )
+        self.session.add(entry)
+        await self.session.run_sync(apply_mood_count_deltas, user_id, {(entry.created_at, entry.mood): 1})
+        await self.session.execute(bump_data_version(user_id))
+        if vectors is not None:
+            await self.session.flush()
+            await self._store_embeddings(user_id, [entry.id], [entry.mood], vectors)
+        return entry
+
+    async def add_many(self, user_id, items):
+        """Insert many analyses with one executemany, returns their ids in order
+
+        items are (journal_text, parsed, created_at) tuples, created_at may be None
+        """
+        if not items:
+            return []
+        vectors = await self._embed([entry_text(journal_text, parsed.get("summary", "")) for journal_text, parsed, _ in items])
+        rows = [
+            {
+                "user_id": user_id,
+                "journal_text": journal_text,
+                "mood": parsed.get("mood", ""),
+                "summary": parsed.get("summary", ""),
+                "reflection": parsed.get("reflection", ""),
+                "created_at": created_at or datetime.utcnow(),
+            }
+            for journal_text, parsed, created_at in items
+        ]
+        result = await self.session.execute(
+            insert(JournalAnalysisModel).returning(JournalAnalysisModel.id, sort_by_parameter_order=True),
+            rows
+        )
+        ids = [row.id for row in result]
+        await self.session.run_sync(
+            apply_mood_count_deltas, user_id, Counter((row["created_at"], row["mood"]) for row in rows)
+        )
+        await self.session.execute(bump_data_version(user_id))
+        if vectors is not None:
+            await self._store_embeddings(user_id, ids, [row["mood"] for row in rows], vectors)
+        return ids
+
+    async def _embed(self, texts):
+        """Vectors for texts, or None if the embedder failed (`python embeddings.py backfill` catches up)"""
+        try:
+            return await embedder.embed(texts)
+        except Exception:
+            logger.warning("Embedding failed, storing entries without vectors", exc_info=True)
+            return None
+
+    async def _store_embeddings(self, user_id, entry_ids, moods, vectors):
+        await self.session.execute(insert(JournalEmbedding), embedding_rows(user_id, entry_ids, vectors, embedder.name))
+        vector_index.add(user_id, embedder.name, entry_ids, moods, vectors)
+
+    async def get(self, user_id, entry_id):
+        return (await self.session.execute(
+            select(JournalAnalysisModel).where(
+                JournalAnalysisModel.user_id == user_id, JournalAnalysisModel.id == entry_id
+            )
+        )).scalar_one_or_none()
+
+    async def get_by_id(self, entry_id):
+        return await self.session.get(JournalAnalysisModel, entry_id)
+
+    async def remove(self, entry):
+        """Delete entry with its mood count and the jobs that produced it, the caller commits
+
+        Deletions are logged in deleted_rows so incremental backups can replay them.
+        """
+        job_ids = (await self.session.execute(
+            delete(AnalysisJob).where(AnalysisJob.analysis_id == entry.id).returning(AnalysisJob.id)
+        )).scalars().all()
+        await self.session.execute(delete(JournalEmbedding).where(JournalEmbedding.analysis_id == entry.id))
+        vector_index.remove(entry.user_id, entry.id)
+        await self.session.run_sync(apply_mood_count_deltas, entry.user_id, {(entry.created_at, entry.mood): -1})
+        await self.session.execute(bump_data_version(entry.user_id))
+        await self.session.delete(entry)
+        tombstones = [{"table_name": AnalysisJob.__tablename__, "row_id": job_id} for job_id in job_ids]
+        tombstones.append({"table_name": JournalEmbedding.__tablename__, "row_id": entry.id})
+        tombstones.append({"table_name": JournalAnalysisModel.__tablename__, "row_id": entry.id})
+        await self.session.execute(insert(DeletedRow), tombstones)
+
+    async def list_page(self, user_id, limit, cursor=None, fields=None, date_from=None, date_to=None):
+        """Return (entries, next_cursor) for one page, newest first"""
+        query, limit = journal_entries_query(user_id, limit, cursor, fields, date_from, date_to)
+        rows = (await self.session.execute(query)).all()
+        return journal_entries_page(rows, limit)
+
+    async def search(self, user_id, q, limit, cursor=None):
+        """Return (results, next_cursor) for one page of full-text matches, best first"""
+        query, limit, offset = journal_search_query(self.session.get_bind().dialect.name, user_id, q, limit, cursor)
+        if query is None:
+            return [], None
+        rows = (await self.session.execute(query)).all()
+        return journal_search_page(rows, limit, offset)
+
+    async def similar(self, user_id, entry_id, limit, same_mood=False):
+        """Entries closest to entry_id by cosine similarity, closest first, or None if it isn't the user's"""
+        entry = await self.get(user_id, entry_id)
+        if entry is None:
+            return None
+
+        vectors = vector_index.get(user_id, embedder.name)
+        if vectors is None:
+            rows = (await self.session.execute(user_vectors_query(user_id, embedder.name))).all()
+            vectors = build_user_vectors(rows, embedder.dimensions)
+            vector_index.put(user_id, embedder.name, vectors)
+        vector = vectors.vector_of(entry_id)
+        if vector is None:
+            # Not embedded yet (written before embeddings or while the embedder was down)
+            vector = (await embedder.embed([entry_text(entry.journal_text, entry.summary)]))[0]
+        matches = vectors.top_k(vector, limit, exclude_id=entry_id, mood=entry.mood if same_mood else None)
+        if not matches:
+            return []
+
+        rows = (await self.session.execute(
+            select(
+                JournalAnalysisModel.id, JournalAnalysisModel.mood, JournalAnalysisModel.summary,
+                JournalAnalysisModel.reflection, JournalAnalysisModel.created_at,
+            ).where(JournalAnalysisModel.user_id == user_id, JournalAnalysisModel.id.in_([match for match, _ in matches]))
+        )).all()
+        by_id = {row.id: row for row in rows}
+        return [
+            {
+                "id": match,
+                "mood": by_id[match].mood,
+                "summary": by_id[match].summary,
+                "reflection": by_id[match].reflection,
+                "created_at": by_id[match].created_at,
+                "score": round(score, 6),
+            }
+            # Vectors of entries whose write was rolled back can linger in the cache until it expires
+            for match, score in matches if match in by_id
+        ]
+
+    async def mood_stats(self, user_id, date_from, date_to, granularity="day"):
+        buckets = bucket_starts(date_from, date_to, granularity)
+        query = mood_stats_query(self.session.get_bind().dialect.name, user_id, date_from, date_to, granularity)
+        rows = (await self.session.execute(query)).all()
+        return build_mood_stats(rows, buckets, date_from, date_to, granularity)
+
+
+class MonthlySummaryRepository:
+    def __init__(self, session):
+        self.session = session
+
+    async def get_month(self, user_id, month):
+        """Daily and total mood counts for month ("YYYY-MM") from the per-day counters"""
+        rows = (await self.session.execute(month_summary_query(user_id, month))).all()
+        return build_month_summary(rows, user_id, month)
@@ -0,0 +1,62 @@
+"""
+Typed response models and JSON rendering for the list endpoints.
+
+The models are declared as each route's response_model, so /docs and generated
+clients know the payloads. The handlers still return their rows directly in an
+OrjsonResponse: orjson encodes dicts, lists, datetimes and dates natively in
+one pass, while having FastAPI validate every row against the model first (or
+walk it with jsonable_encoder when there is no model) costs several times more
+on long lists. `python benchmark_serialization.py` compares the three.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class OrjsonResponse(Response):
+    """JSON response rendered with orjson, naive datetimes as ISO 8601 like isoformat()"""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class JournalEntryResponse(BaseModel):
+    """One /journal-entries row; only id, created_at and the requested fields= are present"""
+    id: int
+    created_at: datetime
+    journal_text: Optional[str] = None
+    mood: Optional[str] = None
+    summary: Optional[str] = None
+    reflection: Optional[str] = None
+
+
+class JournalSearchResult(BaseModel):
+    id: int
+    mood: str
+    summary: str
+    created_at: datetime
+    rank: float
+    snippet: str
+
+
+class SimilarJournalEntry(BaseModel):
+    id: int
+    mood: str
+    summary: str
+    reflection: str
+    created_at: datetime
+    score: float  # Cosine similarity to the requested entry
+
+
+class MonthlySummaryResponse(BaseModel):
+    month: str
+    daily_data: Dict[str, Dict[str, int]]  # "YYYY-MM-DD" -> mood -> entries
+    monthly_totals: Dict[str, int]
+    total_entries: int
+    user_id: int
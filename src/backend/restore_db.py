@@ -2,125 +2,658 @@
 """
 Database restore script for AI Journal application
 Use this script to restore data from backup files
+
+Backups written by backup_db.py (backups/<timestamp>/manifest.json) are read
+chunk by chunk, so a restore holds at most one batch of rows in memory. Older
+single-file backups (backups/<table>_<timestamp>.json) can still be restored,
+but each of those files is loaded whole.
+
+A restore:
+  1. checks every chunk against the manifest checksums and the backup's
+     columns against the current schema, before touching the database
+  2. empties the restored tables (and tables referencing them), children
+     first, in one transaction
+  3. loads each table in its own transaction, parents before children; tables
+     that don't depend on each other load in parallel. PostgreSQL loads go
+     through COPY, other databases through executemany batches
+  4. moves the id sequences past the restored ids (PostgreSQL)
+
+Loading in parallel, a table that fails to load can't take the cleared tables
+back with it, so every row of the chain is decoded and converted before step 2.
+With one table at a time (RESTORE_PARALLELISM=1, and always on SQLite) steps
+2-4 and the incrementals below share a single transaction instead: any error,
+a constraint violation included, leaves the database as it was.
+
+Restoring an incremental backup (backup_db.py --incremental) restores the
+full backup it is based on as above, then replays each incremental of the
+chain in order, one transaction each: logged deletions first, then the
+changed rows (upserted by primary key, or replacing small whole-copied tables).
+
+With --dry-run it stops after decoding and converting every row of step 1.
+
+Settings:
+    RESTORE_BATCH_SIZE=1000     # rows per executemany batch
+    RESTORE_PARALLELISM=4       # tables loaded at once (always 1 on SQLite)
 """
 
-import os
+import base64
 import json
-from sqlalchemy import create_engine, text
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime
+
+from sqlalchemy import Connection, Integer, MetaData, create_engine, text
 from dotenv import load_dotenv
 
+from backup_db import BACKUP_DIR, MANIFEST_NAME, load_manifest, open_compressed_reader, verify_backup
+from conditional import bump_data_version
+from db import dialect_insert
+
 load_dotenv()
 
-def restore_database(backup_timestamp):
-    """Restore the database from JSON backup files"""
-    
+RESTORE_BATCH_SIZE = int(os.getenv("RESTORE_BATCH_SIZE", "1000"))
+RESTORE_PARALLELISM = int(os.getenv("RESTORE_PARALLELISM", "4"))
+
+_LEGACY_FILE = re.compile(r"^(?P<table>\w+?)_(?P<timestamp>\d{8}_\d{6})\.json$")
+
+
+class RestoreError(Exception):
+    pass
+
+
+class ManifestBackup:
+    """A backup_db.py backup directory, rows are streamed from its chunk files"""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = load_manifest(path)
+        self.name = self.manifest["timestamp"]
+        self.kind = self.manifest.get("type", "full")
+        self.base = self.manifest.get("base")
+        self.tables = list(self.manifest["tables"])
+
+    def columns(self, table_name):
+        return self.manifest["tables"][table_name]["columns"]
+
+    def expected_rows(self, table_name):
+        return self.manifest["tables"][table_name]["rows"]
+
+    def mode(self, table_name):
+        return self.manifest["tables"][table_name].get("mode", "replace")
+
+    def verify(self):
+        return verify_backup(self.path)
+
+    def iter_rows(self, table_name):
+        return self._iter_entry(self.manifest["tables"][table_name])
+
+    def iter_deletions(self):
+        """Logged deletions ({table_name, row_id, deleted_at}) in an incremental backup"""
+        deletions = self.manifest.get("deletions")
+        return self._iter_entry(deletions) if deletions else iter(())
+
+    def _iter_entry(self, entry):
+        for chunk in entry["chunks"]:
+            rows = 0
+            path = os.path.join(self.path, chunk["file"])
+            with open_compressed_reader(path, self.manifest["compression"]) as reader:
+                for line in reader:
+                    rows += 1
+                    yield json.loads(line)
+            if rows != chunk["rows"]:
+                raise RestoreError(f"{chunk['file']}: read {rows} rows, manifest says {chunk['rows']}")
+
+
+class LegacyBackup:
+    """Per-table <table>_<timestamp>.json files from the old backup script"""
+
+    kind = "full"
+    base = None
+
+    def __init__(self, backup_dir, timestamp):
+        self.name = timestamp
+        self.files = {}
+        for file in sorted(os.listdir(backup_dir)):
+            match = _LEGACY_FILE.match(file)
+            if match and match.group("timestamp") == timestamp:
+                self.files[match.group("table")] = os.path.join(backup_dir, file)
+        self.tables = list(self.files)
+
+    def _load(self, table_name):
+        with open(self.files[table_name]) as f:
+            return json.load(f)
+
+    def columns(self, table_name):
+        rows = self._load(table_name)
+        return list(rows[0]) if rows else []
+
+    def expected_rows(self, table_name):
+        return None
+
+    def mode(self, table_name):
+        return "replace"
+
+    def verify(self):
+        return []
+
+    def iter_rows(self, table_name):
+        yield from self._load(table_name)
+
+    def iter_deletions(self):
+        return iter(())
+
+
+def find_backup(name, backup_dir=BACKUP_DIR):
+    """Backup for a timestamp (or a backup directory path)"""
+    for path in (name, os.path.join(backup_dir, name)):
+        if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+            return ManifestBackup(path)
+    if os.path.isdir(backup_dir):
+        legacy = LegacyBackup(backup_dir, name)
+        if legacy.tables:
+            return legacy
+    raise RestoreError(f"No backup {name!r} found in {backup_dir}/")
+
+
+def backup_chain(name, backup_dir=BACKUP_DIR):
+    """The full backup a backup builds on followed by each incremental up to it"""
+    chain = [find_backup(name, backup_dir)]
+    while chain[0].kind == "incremental":
+        base_dir = os.path.dirname(os.path.normpath(chain[0].path))
+        try:
+            chain.insert(0, find_backup(chain[0].base, base_dir))
+        except RestoreError:
+            raise RestoreError(f"Backup {chain[0].name} builds on {chain[0].base}, which is missing from {base_dir}/")
+    return chain
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _parse_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def _parse_json(value):
+    # Backups taken through raw SQL on SQLite hold JSON columns as text
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _parse_bytes(value):
+    # backup_db.py writes binary columns (embedding vectors) as base64
+    return base64.b64decode(value) if isinstance(value, str) else value
+
+
+def _converter(column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if python_type is datetime:
+        return _parse_datetime
+    if python_type is date:
+        return _parse_date
+    if python_type in (dict, list):
+        return _parse_json
+    if python_type is bytes:
+        return _parse_bytes
+    return None
+
+
+def row_converter(table, columns):
+    """Maps a decoded backup row onto table's columns, parsing dates and JSON"""
+    converters = [(name, _converter(table.columns[name])) for name in columns]
+
+    def convert(row):
+        return {
+            name: convert_value(row.get(name)) if convert_value and row.get(name) is not None else row.get(name)
+            for name, convert_value in converters
+        }
+    return convert
+
+
+def check_columns(table, backup_columns):
+    """Returns (columns to load, problems, warnings) for one table"""
+    backup_columns = list(backup_columns)
+    columns = [name for name in backup_columns if name in table.columns]
+    problems, warnings = [], []
+    ignored = [name for name in backup_columns if name not in table.columns]
+    if ignored:
+        warnings.append(f"{table.name}: ignoring columns missing from the database: {', '.join(ignored)}")
+    if not backup_columns:
+        # An empty legacy backup file, there are no rows to check
+        return columns, problems, warnings
+    for column in table.columns:
+        if column.name in columns or column.nullable or column.server_default is not None or column.computed is not None:
+            continue
+        if column.primary_key and column.autoincrement in (True, "auto"):
+            continue
+        problems.append(f"{table.name}: backup has no values for required column {column.name}")
+    return columns, problems, warnings
+
+
+def dependency_levels(tables):
+    """Group tables so every table comes after the ones its foreign keys point at"""
+    names = {table.name for table in tables}
+    remaining = {
+        table.name: {fk.target_fullname.split(".")[0] for fk in table.foreign_keys} & names - {table.name}
+        for table in tables
+    }
+    levels = []
+    while remaining:
+        ready = sorted(name for name, depends_on in remaining.items() if not depends_on)
+        if not ready:
+            raise RestoreError(f"Circular foreign keys between {', '.join(sorted(remaining))}")
+        levels.append(ready)
+        for name in ready:
+            del remaining[name]
+        for depends_on in remaining.values():
+            depends_on.difference_update(ready)
+    return levels
+
+
+def _dependents(metadata, names):
+    """names plus every table that (transitively) references one of them"""
+    found = set(names)
+    changed = True
+    while changed:
+        changed = False
+        for table in metadata.tables.values():
+            if table.name in found:
+                continue
+            if any(fk.target_fullname.split(".")[0] in found for fk in table.foreign_keys):
+                found.add(table.name)
+                changed = True
+    return found
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, bytes):
+        value = "\\x" + value.hex()  # bytea hex format
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class _CopyStream:
+    """File-like object feeding rows to COPY ... FROM STDIN (text format) as it is read"""
+
+    def __init__(self, rows, columns):
+        self.rows = 0
+        self._lines = ("\t".join(_copy_value(row.get(name)) for name in columns) + "\n" for row in rows)
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self.rows += 1
+            self._buffer += line.encode("utf-8")
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _copy_rows(connection, table, columns, rows):
+    quote = connection.dialect.identifier_preparer.quote
+    stream = _CopyStream(map(row_converter(table, columns), rows), columns)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {quote(table.name)} ({', '.join(quote(name) for name in columns)}) FROM STDIN",
+            stream
+        )
+    finally:
+        cursor.close()
+    return stream.rows
+
+
+def _batches(rows, convert, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(convert(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_rows(connection, table, columns, rows, batch_size):
+    count = 0
+    for batch in _batches(rows, row_converter(table, columns), batch_size):
+        connection.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def _upsert_rows(connection, table, columns, rows, batch_size):
+    """Insert rows, overwriting those whose primary key already exists"""
+    primary_key = [column.name for column in table.primary_key.columns]
+    insert_for_dialect = dialect_insert(connection.dialect.name)
+    stmt = None
+    if insert_for_dialect is not None:
+        stmt = insert_for_dialect(table)
+        updates = {name: stmt.excluded[name] for name in columns if name not in primary_key}
+        stmt = (
+            stmt.on_conflict_do_update(index_elements=primary_key, set_=updates) if updates
+            else stmt.on_conflict_do_nothing(index_elements=primary_key)
+        )
+
+    count = 0
+    for batch in _batches(rows, row_converter(table, columns), batch_size):
+        if stmt is not None:
+            connection.execute(stmt, batch)
+        else:
+            (key,) = table.primary_key.columns
+            connection.execute(table.delete().where(key.in_([row[key.name] for row in batch])))
+            connection.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def _supports_copy(connection):
+    # COPY goes through psycopg2's copy_expert, the driver behind postgresql:// URLs
+    return connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+
+def _transaction(bind):
+    """A new transaction on an engine, or the one a connection is already in"""
+    return nullcontext(bind) if isinstance(bind, Connection) else bind.begin()
+
+
+def load_table(bind, backup, table, columns, batch_size=RESTORE_BATCH_SIZE):
+    """Load one table from the backup in a single transaction, returns (rows, seconds)"""
+    started = time.perf_counter()
+    with _transaction(bind) as connection:
+        rows = backup.iter_rows(table.name)
+        if _supports_copy(connection):
+            count = _copy_rows(connection, table, columns, rows)
+        else:
+            count = _insert_rows(connection, table, columns, rows, batch_size)
+    return count, time.perf_counter() - started
+
+
+def apply_incremental(bind, backup, tables, columns, batch_size=RESTORE_BATCH_SIZE):
+    """Replay one incremental backup in a single transaction, returns (summary lines, seconds)
+
+    tables are the reflected tables parents first. Deletions go first, so an
+    id that was deleted and then reused by a new row ends up with the new row.
+    """
+    started = time.perf_counter()
+    by_name = {table.name: table for table in tables}
+    deleted_ids = {}
+    for tombstone in backup.iter_deletions():
+        if tombstone["table_name"] in by_name:
+            deleted_ids.setdefault(tombstone["table_name"], []).append(tombstone["row_id"])
+
+    summary = []
+    with _transaction(bind) as connection:
+        for table in reversed(tables):
+            ids = deleted_ids.get(table.name)
+            if not ids:
+                continue
+            (key,) = table.primary_key.columns
+            for start in range(0, len(ids), batch_size):
+                connection.execute(table.delete().where(key.in_(ids[start:start + batch_size])))
+            summary.append(f"{table.name}: {len(ids)} deleted")
+
+        for table in tables:
+            if table.name not in backup.tables:
+                continue
+            rows = backup.iter_rows(table.name)
+            if backup.mode(table.name) == "upsert":
+                count = _upsert_rows(connection, table, columns[table.name], rows, batch_size)
+                summary.append(f"{table.name}: {count} upserted")
+            else:
+                connection.execute(table.delete())
+                count = _insert_rows(connection, table, columns[table.name], rows, batch_size)
+                summary.append(f"{table.name}: replaced with {count} rows")
+    return summary, time.perf_counter() - started
+
+
+def validate_rows(backup, table, columns):
+    """Decode and convert every row of a table without writing, returns the row count"""
+    convert = row_converter(table, columns)
+    count = 0
+    for row in backup.iter_rows(table.name):
+        convert(row)
+        count += 1
+    return count
+
+
+def validate_chain(chain, levels, restored, chain_tables, columns):
+    """Decode and convert every row a restore of chain would write, yields a line per table or incremental"""
+    backup, incrementals = chain[0], chain[1:]
+    for level in levels:
+        for name in level:
+            rows = validate_rows(backup, restored[name], columns[backup.name][name])
+            yield f"- {name}: {rows} rows would be restored"
+    for item in incrementals:
+        changes = [
+            f"{table.name} {validate_rows(item, table, columns[item.name][table.name])}"
+            for table in chain_tables if table.name in item.tables
+        ]
+        deletions = sum(1 for _ in item.iter_deletions())
+        yield f"- {item.name}: rows {', '.join(changes)}; {deletions} deletions would be replayed"
+
+
+def clear_tables(connection, tables):
+    """Empty tables (given parents first) in the caller's transaction"""
+    if connection.dialect.name == "postgresql":
+        quote = connection.dialect.identifier_preparer.quote
+        connection.execute(text(f"TRUNCATE {', '.join(quote(table.name) for table in tables)}"))
+        return
+    for table in reversed(tables):
+        connection.execute(table.delete())
+
+
+def reset_sequences(connection, tables):
+    """Move serial/identity sequences past the highest restored id (PostgreSQL)
+
+    SQLite needs nothing: a rowid primary key continues from MAX(id).
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    for table in tables:
+        for column in table.primary_key.columns:
+            if not isinstance(column.type, Integer):
+                continue
+            connection.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                    f"COALESCE((SELECT MAX({quote(column.name)}) FROM {quote(table.name)}), 0) + 1, false)"
+                ),
+                {"table": quote(table.name), "column": column.name}
+            )
+
+
+def restore_database(backup_timestamp, dry_run=False, parallelism=RESTORE_PARALLELISM, batch_size=RESTORE_BATCH_SIZE):
+    """Restore the database from a backup, returns True on success"""
+
     # Get database URL
     DATABASE_URL = os.environ.get("DATABASE_URL")
     if not DATABASE_URL:
         print("DATABASE_URL not found in environment variables!")
-        return
-    
-    # Create engine
-    engine = create_engine(DATABASE_URL)
-    
-    backup_dir = "backups"
-    
+        return False
+
+    try:
+        chain = backup_chain(backup_timestamp)
+    except RestoreError as e:
+        print(e)
+        return False
+    backup, incrementals = chain[0], chain[1:]
+    if incrementals:
+        print(f"Restoring full backup {backup.name} + {len(incrementals)} incremental(s) up to {chain[-1].name}")
+
+    engine = create_engine(DATABASE_URL, pool_size=max(parallelism, 1))
+    if engine.dialect.name == "sqlite":
+        # SQLite has a single writer, parallel loads would only wait on each other
+        parallelism = 1
+
     try:
-        with engine.connect() as connection:
-            # Restore users table
-            users_file = f"{backup_dir}/users_{backup_timestamp}.json"
-            if os.path.exists(users_file):
-                with open(users_file, "r") as f:
-                    users_data = json.load(f)
-                
-                # Clear existing users
-                connection.execute(text("DELETE FROM users"))
-                
-                # Insert backup data
-                for user in users_data:
-                    connection.execute(text("""
-                        INSERT INTO users (id, auth0_id, email, name, picture)
-                        VALUES (:id, :auth0_id, :email, :name, :picture)
-                    """), user)
-                
-                print(f"Restored {len(users_data)} users")
-            
-            # Restore journal_analysis table
-            journal_file = f"{backup_dir}/journal_analysis_{backup_timestamp}.json"
-            if os.path.exists(journal_file):
-                with open(journal_file, "r") as f:
-                    journal_data = json.load(f)
-                
-                # Clear existing journal entries
-                connection.execute(text("DELETE FROM journal_analysis"))
-                
-                # Insert backup data
-                for entry in journal_data:
-                    connection.execute(text("""
-                        INSERT INTO journal_analysis (id, user_id, journal_text, mood, summary, reflection, created_at)
-                        VALUES (:id, :user_id, :journal_text, :mood, :summary, :reflection, :created_at)
-                    """), entry)
-                
-                print(f"Restored {len(journal_data)} journal entries")
-            
-            # Restore monthly_summaries table
-            summary_file = f"{backup_dir}/monthly_summaries_{backup_timestamp}.json"
-            if os.path.exists(summary_file):
-                with open(summary_file, "r") as f:
-                    summary_data = json.load(f)
-                
-                # Clear existing summaries
-                connection.execute(text("DELETE FROM monthly_summaries"))
-                
-                # Insert backup data
-                for summary in summary_data:
-                    connection.execute(text("""
-                        INSERT INTO monthly_summaries (id, month, daily_data, monthly_totals, created_at, updated_at)
-                        VALUES (:id, :month, :daily_data, :monthly_totals, :created_at, :updated_at)
-                    """), summary)
-                
-                print(f"Restored {len(summary_data)} monthly summaries")
-            
-            connection.commit()
-            print("Database restore completed successfully!")
-            
+        metadata = MetaData()
+        metadata.reflect(bind=engine)
+
+        problems = []
+        columns = {}  # backup name -> table name -> columns to load
+        for item in chain:
+            problems += [f"{item.name}/{problem}" for problem in item.verify()]
+            columns[item.name] = {}
+            for name in item.tables:
+                if name not in metadata.tables:
+                    problems.append(f"{item.name}/{name}: table doesn't exist in the database")
+                    continue
+                columns[item.name][name], table_problems, warnings = check_columns(
+                    metadata.tables[name], item.columns(name)
+                )
+                problems += [f"{item.name}/{problem}" for problem in table_problems]
+                for warning in warnings:
+                    print(f"Warning: {item.name}/{warning}")
+        tables = [metadata.tables[name] for name in backup.tables if name in metadata.tables]
+        # Every table any backup in the chain touches, parents first
+        chain_tables = [
+            table for table in metadata.sorted_tables
+            if any(table.name in item.tables for item in chain)
+        ]
+
+        if problems:
+            print("Backup can't be restored:")
+            for problem in problems:
+                print(f"  {problem}")
+            return False
+
+        levels = dependency_levels(tables)
+        restored = {table.name: table for table in tables}
+
+        if dry_run or parallelism > 1:
+            for line in validate_chain(chain, levels, restored, chain_tables, columns):
+                if dry_run:
+                    print(line)
+        if dry_run:
+            print("Dry run finished, the database was not modified")
+            return True
+
+        cleared = _dependents(metadata, restored)
+        extra = sorted(cleared - set(restored))
+        if extra:
+            print(f"Also emptying tables not in the backup that reference restored rows: {', '.join(extra)}")
+
+        started = time.perf_counter()
+        # Loading one table at a time, the whole restore is a single transaction
+        with engine.begin() if parallelism <= 1 else nullcontext(engine) as bind:
+            with _transaction(bind) as connection:
+                clear_tables(connection, [table for table in metadata.sorted_tables if table.name in cleared])
+
+            with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+                for level in levels:
+                    futures = {
+                        name: executor.submit(load_table, bind, backup, restored[name], columns[backup.name][name], batch_size)
+                        for name in level
+                    }
+                    failed = []
+                    for name, future in futures.items():
+                        try:
+                            rows, seconds = future.result()
+                        except Exception as e:
+                            failed.append(name)
+                            print(f"Error restoring {name}: {e}")
+                            continue
+                        expected = backup.expected_rows(name)
+                        print(f"- {name}: restored {rows} rows in {seconds:.2f}s"
+                              + (f" (manifest says {expected})" if expected is not None and expected != rows else ""))
+                    if failed:
+                        # Tables in later levels reference these, loading them would violate foreign keys
+                        raise RestoreError(
+                            "Restore rolled back, the database is unchanged" if isinstance(bind, Connection)
+                            else f"Stopping: {', '.join(failed)} failed and were rolled back"
+                        )
+
+            for item in incrementals:
+                summary, seconds = apply_incremental(bind, item, chain_tables, columns[item.name], batch_size)
+                print(f"- {item.name}: {', '.join(summary) or 'no changes'} in {seconds:.2f}s")
+
+            with _transaction(bind) as connection:
+                reset_sequences(connection, chain_tables)
+                if "users" in metadata.tables and "data_version" in metadata.tables["users"].c:
+                    # The restored versions were handed out before; move past every ETag clients may hold
+                    connection.execute(bump_data_version())
+                if "restore_log" in metadata.tables:
+                    connection.execute(
+                        metadata.tables["restore_log"].insert().values(backup=chain[-1].name, restored_at=datetime.utcnow())
+                    )
+
+        print(f"Database restore completed successfully in {time.perf_counter() - started:.2f}s!")
+        if "restore_log" not in metadata.tables:
+            print("Restart the API: without restore_log (`python migrations.py upgrade`) it keeps cached user ids")
+        if "daily_mood_counts" in cleared and "daily_mood_counts" not in restored:
+            print("Run `python mood_counts.py rebuild` to recompute the daily mood counters")
+        if "journal_embeddings" in cleared and "journal_embeddings" not in restored:
+            print("Run `python embeddings.py backfill` to re-embed the restored journal entries")
+        return True
+
+    except RestoreError as e:
+        print(e)
+        return False
     except Exception as e:
         print(f"Error restoring database: {e}")
+        return False
+    finally:
+        engine.dispose()
+
 
-def list_backups():
-    """List available backup files"""
-    backup_dir = "backups"
+def list_backups(backup_dir=BACKUP_DIR):
+    """List available backups"""
     if not os.path.exists(backup_dir):
         print("No backups directory found!")
         return
-    
-    backups = []
+
+    backups = {}
     for file in os.listdir(backup_dir):
-        if file.endswith('.json'):
-            timestamp = file.split('_')[1].split('.')[0]
-            backups.append(timestamp)
-    
+        if os.path.exists(os.path.join(backup_dir, file, MANIFEST_NAME)):
+            manifest = load_manifest(os.path.join(backup_dir, file))
+            kind = manifest.get("type", "full")
+            if kind == "incremental":
+                kind = f"incremental on {manifest['base']}"
+            backups[file] = f"{kind}, {manifest.get('total_rows', '?')} rows, {manifest['compression']}"
+            continue
+        match = _LEGACY_FILE.match(file)
+        if match:
+            backups.setdefault(match.group("timestamp"), "legacy JSON files")
+
     if backups:
         print("Available backups:")
         for backup in sorted(backups, reverse=True):
-            print(f"  {backup}")
+            print(f"  {backup}  ({backups[backup]})")
     else:
         print("No backup files found!")
 
+
 if __name__ == "__main__":
     import sys
-    
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "list":
-            list_backups()
-        else:
-            restore_database(sys.argv[1])
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if args and args[0] == "list":
+        list_backups()
+    elif args:
+        ok = restore_database(args[0], dry_run="--dry-run" in sys.argv)
+        sys.exit(0 if ok else 1)
     else:
         print("Usage:")
-        print("  python restore_db.py list                    # List available backups")
-        print("  python restore_db.py 20241230_143022        # Restore from specific backup")
-
-
-
-
-
+        print("  python restore_db.py list                          # List available backups")
+        print("  python restore_db.py 20241230_143022               # Restore from specific backup")
+        print("  python restore_db.py 20241230_143022 --dry-run     # Validate a backup without restoring it")
@@ -1,7 +1,36 @@
+"""
+Scheduled jobs.
+
+The API runs them in-process (SCHEDULER_IN_PROCESS=true), or set it to false
+and host them with `python scheduler.py`. Every API replica may run the
+scheduler: jobs take a database advisory lock, so each run happens once.
+"""
+
+import os
+
 from apscheduler.schedulers.background import BackgroundScheduler
-from main import generate_monthly_summary
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+from monthly_rollup import run_monthly_rollup
+
+SCHEDULER_IN_PROCESS = os.getenv("SCHEDULER_IN_PROCESS", "true").lower() == "true"
+
+
+def create_scheduler(scheduler_class=BackgroundScheduler):
+    scheduler = scheduler_class(timezone="UTC")
+    # Roll up the month that just ended; a run missed while the process was down
+    # is caught up once within the grace time
+    scheduler.add_job(
+        run_monthly_rollup, "cron", day=1, hour=0, minute=0,
+        id="monthly_rollup", max_instances=1, coalesce=True, misfire_grace_time=6 * 3600
+    )
+    return scheduler
+
+
+if __name__ == "__main__":
+    from logging_config import configure_logging
+    from migrations import ensure_schema
 
-# Initalize the scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(generate_monthly_summary, 'cron', day=1, hour=0, minute=0)
-scheduler.start()
\ No newline at end of file
+    configure_logging()
+    ensure_schema()
+    create_scheduler(BlockingScheduler).start()
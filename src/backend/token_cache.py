@@ -0,0 +1,102 @@
+"""
+Bounded LRU cache of verified access token payloads.
+
+Clients send the same bearer token on every request for the whole session, so
+the RS256 signature check and claims validation only need to happen once per
+token. Entries are keyed by a SHA-256 of the token (the raw token is never
+kept) and dropped as soon as the token's exp claim passes.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TOKEN_CACHE_ENABLED = os.getenv("TOKEN_CACHE_ENABLED", "true").lower() == "true"
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """Thread-safe LRU of token hash -> (exp, payload)"""
+
+    def __init__(self, maxsize=TOKEN_CACHE_MAXSIZE, enabled=TOKEN_CACHE_ENABLED):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, token):
+        """Return the cached payload for token, or None if it must be verified"""
+        if not self.enabled:
+            return None
+
+        key = hash_token(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            exp, payload = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, token, payload):
+        """Remember a payload that just passed verification"""
+        if not self.enabled:
+            return
+
+        exp = payload.get("exp")
+        # Tokens without an expiry are never cached; we'd have no safe eviction time
+        if not isinstance(exp, (int, float)) or exp <= time.time():
+            return
+
+        key = hash_token(token)
+        with self._lock:
+            self._entries[key] = (exp, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def purge_expired(self):
+        """Drop every expired entry, returns how many were removed"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (exp, _) in self._entries.items() if exp <= now]
+            for key in expired:
+                del self._entries[key]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
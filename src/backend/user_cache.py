@@ -0,0 +1,104 @@
+"""
+auth0_id -> user identity cache.
+
+get_current_user runs on every request, but a user's id and profile almost
+never change, so they are kept in memory for USER_CACHE_TTL seconds instead of
+being re-queried each time. The storage is pluggable: anything implementing
+get/set/delete/clear (e.g. a Redis-backed backend shared between workers) can
+be passed to UserIdentityCache.
+
+On a miss the row comes from repositories.UserRepository.get_or_create, a
+single INSERT ... ON CONFLICT that returns the row whether it was just
+inserted or already existed, so two concurrent first logins can't both insert.
+
+Users rows are never updated or deleted by the API. The one thing that can
+change the auth0_id -> id mapping under a running API is restore_db.py, which
+logs every restore in restore_log; the API polls it and clears the cache (see
+main.watch_restores).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of a users row, safe to share between requests"""
+    id: int
+    auth0_id: str
+    email: Optional[str] = None
+    name: Optional[str] = None
+    picture: Optional[str] = None
+
+
+class InMemoryUserCacheBackend:
+    """Process-local LRU with per-entry expiry"""
+
+    def __init__(self, maxsize=USER_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserIdentityCache:
+    """Caches CachedUser snapshots by auth0_id"""
+
+    def __init__(self, backend=None, ttl=USER_CACHE_TTL):
+        self.backend = backend if backend is not None else InMemoryUserCacheBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, auth0_id):
+        user = self.backend.get(auth0_id)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def set(self, user):
+        self.backend.set(user.auth0_id, user, self.ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,129 @@
+"""
+Shared fixtures for the backend tests.
+
+    cd src && python -m pytest tests
+
+The backend reads its settings when it is imported, so they are set here
+first: a throwaway SQLite database and backup directory, a JWKS file holding
+the public half of a key generated for the session (tokens are signed with
+make_token), and OPENAI_BASE_URL pointing at fake_llm_server.py, which
+llm_server starts on a free port.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix="journal-tests-")
+JWKS_PATH = os.path.join(TEST_DIR, "jwks.json")
+KID = "test-key"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+LLM_PORT = _free_port()
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(TEST_DIR, 'journal.db')}",
+    BACKUP_DIR=os.path.join(TEST_DIR, "backups"),
+    JWKS_URL=JWKS_PATH,
+    JWKS_BACKGROUND_REFRESH="false",
+    OPENAI_API_KEY="test",
+    OPENAI_BASE_URL=f"http://127.0.0.1:{LLM_PORT}/v1",
+    FAKE_LLM_LATENCY="0",
+    LLM_MAX_RETRIES="0",
+    ANALYSIS_WORKERS_IN_PROCESS="false",
+    SCHEDULER_IN_PROCESS="false",
+    LOG_LEVEL="WARNING",
+)
+
+_private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+_private_pem = _private_key.private_bytes(
+    serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+).decode("ascii")
+_public_jwk = {
+    key: value.decode("ascii") if isinstance(value, bytes) else value
+    for key, value in jwk.construct(_private_pem, "RS256").public_key().to_dict().items()
+}
+_public_jwk.update(kid=KID, use="sig", alg="RS256")
+with open(JWKS_PATH, "w") as f:
+    json.dump({"keys": [_public_jwk]}, f)
+
+
+def make_token(sub, expires_in=3600, kid=KID, **claims):
+    """An access token for sub signed with the key in the test JWKS"""
+    import main
+
+    claims = dict(sub=sub, aud=main.AUDIENCE, iss=main.ISSUER, exp=int(time.time()) + expires_in, **claims)
+    return jwt.encode(claims, _private_pem, algorithm="RS256", headers={"kid": kid})
+
+
+def auth_headers(sub):
+    return {"Authorization": f"Bearer {make_token(sub)}"}
+
+
+def run_with_sessions(work):
+    """Run `await work(session_factory)` on an engine of its own, outside the API's event loop"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from db import ASYNC_DATABASE_URL
+
+    async def run():
+        engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+        try:
+            return await work(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope="session")
+def llm_server():
+    """fake_llm_server.py listening on OPENAI_BASE_URL for the whole session"""
+    import uvicorn
+    import fake_llm_server
+
+    server = uvicorn.Server(uvicorn.Config(fake_llm_server.app, host="127.0.0.1", port=LLM_PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("fake LLM server didn't start")
+        time.sleep(0.01)
+    yield os.environ["OPENAI_BASE_URL"]
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture(scope="session")
+def client(llm_server):
+    """TestClient for the API, with its lifespan (migrations, JWKS prefetch) run once"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user(request):
+    """Auth headers for a user of this test alone, so tests don't see each other's entries"""
+    return auth_headers(f"auth0|{request.node.name}")
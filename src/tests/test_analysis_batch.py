@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from analysis import analysis_cache
+from analysis_batch import STATUS_CACHED, STATUS_OK, pack_entries, parse_batch_output
+from db import async_engine
+
+
+def analysis(index=None, mood="happy"):
+    item = {"mood": mood, "summary": f"Summary of {mood}", "reflection": "Keep going."}
+    if index is not None:
+        item["index"] = index
+    return item
+
+
+def test_results_follow_the_indexes_not_the_order():
+    parsed = parse_batch_output(json.dumps([analysis(1, "sad"), analysis(0, "calm")]), 2)
+    assert [item["mood"] for item in parsed] == ["calm", "sad"]
+
+
+def test_items_without_index_use_their_position_and_wrapped_arrays_are_unwrapped():
+    parsed = parse_batch_output(json.dumps({"entries": [analysis(mood="calm"), analysis(mood="sad")]}), 2)
+    assert [item["mood"] for item in parsed] == ["calm", "sad"]
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        [analysis(0), analysis(0)],            # Repeated index
+        [analysis(0), analysis(2)],            # Out of range
+        [analysis(0), analysis("1")],          # Not an integer
+        [analysis(0)],                         # Too few
+        [analysis(0), analysis(1), analysis(2)],
+        [analysis(0), "not an object"],
+    ],
+)
+def test_mismatched_output_raises(items):
+    with pytest.raises(ValueError):
+        parse_batch_output(json.dumps(items), 2)
+
+
+def test_pack_entries_respects_budget_and_entry_limit():
+    texts = [(index, "x" * 400) for index in range(7)]  # ~101 tokens each
+    packs = pack_entries(texts, budget=250, max_per_call=5)
+    assert [[index for index, _ in pack] for pack in packs] == [[0, 1], [2, 3], [4, 5], [6]]
+
+    packs = pack_entries(texts, budget=10_000, max_per_call=3)
+    assert [len(pack) for pack in packs] == [3, 3, 1]
+
+
+def test_batch_endpoint_analyzes_and_stores_every_entry(client, user):
+    entries = [{"journal_text": f"Batch entry number {index} about a long walk."} for index in range(7)]
+
+    report = client.post("/analyze-journal/batch", json={"entries": entries}, headers=user).json()
+
+    assert report["total"] == 7 and report["failed"] == 0
+    assert {result["status"] for result in report["results"]} == {STATUS_OK}
+    stored = client.get("/journal-entries", headers=user).json()
+    assert sorted(entry["id"] for entry in stored) == sorted(result["id"] for result in report["results"])
+
+    # The analyses were cached, resubmitting doesn't call the model again
+    again = client.post("/analyze-journal/batch", json={"entries": entries[:2]}, headers=user).json()
+    assert {result["status"] for result in again["results"]} == {STATUS_CACHED}
+
+
+def test_batch_created_at_with_an_offset_is_stored_as_utc(client, user):
+    entries = [{"journal_text": "Late evening entry west of UTC.", "created_at": "2024-01-05T23:30:00-05:00"}]
+
+    report = client.post("/analyze-journal/batch", json={"entries": entries}, headers=user).json()
+    assert report["failed"] == 0
+
+    stored = client.get("/journal-entries", headers=user).json()
+    assert [entry["created_at"] for entry in stored] == ["2024-01-06T04:30:00"]
+    summary = client.get("/monthly-summary", params={"month": "2024-01"}, headers=user).json()
+    assert list(summary["daily_data"]) == ["2024-01-06"] and summary["total_entries"] == 1
+
+
+def test_cached_entries_are_looked_up_in_one_query(client, user):
+    entries = [{"journal_text": f"Entry {index} resubmitted from an import."} for index in range(6)]
+    client.post("/analyze-journal/batch", json={"entries": entries}, headers=user)
+    analysis_cache.clear_memory()
+
+    statements = []
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        report = client.post("/analyze-journal/batch", json={"entries": entries}, headers=user).json()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert {result["status"] for result in report["results"]} == {STATUS_CACHED}
+    lookups = [statement for statement in statements if statement.lstrip().startswith("SELECT") and "analysis_cache" in statement]
+    assert len(lookups) == 1
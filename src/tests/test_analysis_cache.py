@@ -0,0 +1,75 @@
+from sqlalchemy import select
+
+from analysis_cache import AnalysisCache, make_cache_key, normalize_journal_text
+from conftest import run_with_sessions
+from models import AnalysisCacheEntry
+
+ANALYSIS = {"mood": "calm", "summary": "A slow Sunday.", "reflection": "Rest counts too."}
+
+
+def test_keys_ignore_whitespace_and_unicode_form_but_not_model_or_prompt():
+    key = make_cache_key("A  slow\nSunday. ", "model-a")
+    assert normalize_journal_text("  A slow \t Sunday.") == "A slow Sunday."
+    assert make_cache_key("A slow Sunday.", "model-a") == key
+    assert make_cache_key("A slow Sunday.", "model-b") != key
+    assert make_cache_key("A slow Sunday.", "model-a", prompt_version="v0") != key
+
+
+def test_stored_analyses_outlive_the_memory_cache(client):
+    key = make_cache_key("Cached across restarts.", "model-a")
+
+    async def work(session_factory):
+        cache = AnalysisCache(session_factory, maxsize=10)
+        await cache.put(key, "model-a", {**ANALYSIS, "extra": "dropped"})
+        memory = await cache.get(key)
+        cache.clear_memory()
+        stored = await cache.get(key)
+        async with session_factory() as session:
+            entry = (await session.execute(select(AnalysisCacheEntry).filter_by(cache_key=key))).scalar_one()
+        return memory, stored, entry.hit_count, cache.stats()
+
+    memory, stored, hit_count, stats = run_with_sessions(work)
+    assert memory == stored == ANALYSIS
+    assert hit_count == 1
+    assert stats["memory_hits"] == 1 and stats["db_hits"] == 1
+
+
+def test_malformed_output_is_not_cached_and_disabled_caches_store_nothing(client):
+    async def work(session_factory):
+        cache = AnalysisCache(session_factory)
+        await cache.put("empty-mood", "model-a", {"mood": "", "summary": "x"})
+        await cache.put("not-a-dict", "model-a", ["calm"])
+        disabled = AnalysisCache(session_factory, enabled=False)
+        await disabled.put("disabled", "model-a", ANALYSIS)
+        cache.clear_memory()
+        return [await cache.get(key) for key in ("empty-mood", "not-a-dict", "disabled")]
+
+    assert run_with_sessions(work) == [None, None, None]
+
+
+def test_get_many_mixes_memory_and_database_hits(client):
+    keys = [make_cache_key(f"Bulk entry {index}", "model-a") for index in range(4)]
+
+    async def work(session_factory):
+        cache = AnalysisCache(session_factory)
+        for key in keys[:3]:
+            await cache.put(key, "model-a", ANALYSIS)
+        cache.clear_memory()
+        await cache.get(keys[0])
+        return await cache.get_many(keys + [keys[1]]), cache.stats()
+
+    found, stats = run_with_sessions(work)
+    assert set(found) == set(keys[:3])
+    assert stats["memory_hits"] == 1 and stats["db_hits"] == 3 and stats["misses"] == 1
+
+
+def test_resubmitting_an_entry_reuses_its_analysis(client, user):
+    from analysis import analysis_cache
+
+    first = client.post("/analyze-journal", json={"journal_text": "Same words,  twice."}, headers=user).json()
+    hits = analysis_cache.memory_hits
+    second = client.post("/analyze-journal", json={"journal_text": "Same words, twice."}, headers=user).json()
+
+    assert analysis_cache.memory_hits == hits + 1
+    assert {field: second[field] for field in ANALYSIS} == {field: first[field] for field in ANALYSIS}
+    assert second["id"] != first["id"]
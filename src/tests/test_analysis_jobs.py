@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from analysis_worker import (
+    ANALYSIS_JOB_MAX_ATTEMPTS, ANALYSIS_JOB_TIMEOUT, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING,
+    AnalysisWorkerPool, claim_job, fail_job, requeue_stale_jobs,
+)
+from conftest import auth_headers
+from db import SessionLocal
+from models import AnalysisJob
+
+
+@pytest.fixture
+def call(client):
+    """Run a coroutine function on the API's event loop, where its engine lives"""
+    def run(function, *args):
+        return client.portal.call(function, *args)
+    return run
+
+
+@pytest.fixture
+def drained(call):
+    """No runnable job left behind by other tests"""
+    while call(claim_job) is not None:
+        pass
+
+
+def submit(client, user, text):
+    response = client.post("/analysis", json={"journal_text": text}, headers=user)
+    assert response.status_code == 202
+    return response.json()
+
+
+def set_job(job_id, **values):
+    with SessionLocal() as session:
+        session.execute(update(AnalysisJob).where(AnalysisJob.id == job_id).values(**values))
+        session.commit()
+
+
+def test_a_claimed_job_is_processed_once(client, user, call, drained):
+    job = submit(client, user, "Queued entry about the garden.")
+    assert job["status"] == JOB_QUEUED and job["analysis"] is None
+
+    claimed = call(claim_job)
+    assert claimed[0] == job["id"]
+    assert call(claim_job) is None
+    assert client.get(f"/analysis/{job['id']}", headers=user).json()["status"] == JOB_RUNNING
+
+    call(AnalysisWorkerPool()._process, claimed)
+
+    done = client.get(f"/analysis/{job['id']}", headers=user).json()
+    assert done["status"] == JOB_DONE and done["attempts"] == 1
+    assert done["analysis"]["id"] in [entry["id"] for entry in client.get("/journal-entries", headers=user).json()]
+
+
+def test_failures_back_off_then_give_up(client, user, call, drained):
+    job = submit(client, user, "Entry whose analysis keeps failing.")
+
+    for attempt in range(1, ANALYSIS_JOB_MAX_ATTEMPTS + 1):
+        assert call(claim_job)[0] == job["id"]
+        call(fail_job, job["id"], "LLM unavailable")
+        state = client.get(f"/analysis/{job['id']}", headers=user).json()
+        assert state["attempts"] == attempt and state["error"] == "LLM unavailable"
+        if attempt < ANALYSIS_JOB_MAX_ATTEMPTS:
+            assert state["status"] == JOB_QUEUED
+            # Not runnable until its backoff passes
+            assert call(claim_job) is None
+            set_job(job["id"], available_at=datetime.utcnow())
+
+    assert state["status"] == JOB_FAILED
+    assert call(claim_job) is None
+
+
+def test_jobs_left_running_by_a_dead_worker_are_requeued(client, user, call, drained):
+    job = submit(client, user, "Entry claimed by a worker that crashed.")
+    call(claim_job)
+    set_job(job["id"], started_at=datetime.utcnow() - timedelta(seconds=ANALYSIS_JOB_TIMEOUT + 1))
+
+    assert call(requeue_stale_jobs) == 1
+    assert call(claim_job)[0] == job["id"]
+
+
+def test_other_users_jobs_are_not_visible(client, user):
+    job = submit(client, user, "Private queued entry.")
+    assert client.get(f"/analysis/{job['id']}", headers=auth_headers("auth0|someone-else")).status_code == 404
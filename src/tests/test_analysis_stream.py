@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from analysis_stream import IncrementalAnalysisParser
+
+ANALYSIS = {
+    "mood": "calm",
+    "summary": "A quiet \"slow\" morning\nwith tea \\ toast.",
+    "reflection": "Café visits and \U0001F600 moments matter.",
+}
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalAnalysisParser()
+    deltas = []
+    for start in range(0, len(text), size):
+        deltas += parser.feed(text[start:start + size])
+    return parser, deltas
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_any_chunking_decodes_the_same_values(size):
+    raw = json.dumps(ANALYSIS)  # Escapes the emoji into a surrogate pair, é into é
+    parser, deltas = feed_in_chunks(raw, size)
+
+    assert parser.values == ANALYSIS
+    assert parser.done
+    for field in ANALYSIS:
+        assert "".join(delta for name, delta in deltas if name == field) == ANALYSIS[field]
+
+
+def test_deltas_arrive_before_the_object_is_complete():
+    parser = IncrementalAnalysisParser()
+    assert parser.feed('{"mood": "hap') == [("mood", "hap")]
+    assert parser.feed('py", "summary": "Sun') == [("mood", "py"), ("summary", "Sun")]
+    assert not parser.done
+
+
+def test_text_around_the_object_and_unknown_fields_are_ignored():
+    raw = '```json\n{"confidence": 0.9, "tags": {"a": ["x", "}"]}, "mood": "sad", "extra": "no"}\n```'
+    parser, deltas = feed_in_chunks(raw, 4)
+
+    assert parser.values == {"mood": "sad", "summary": "", "reflection": ""}
+    assert {name for name, _ in deltas} == {"mood"}
+    assert parser.done
+
+
+def test_stream_endpoint_sends_field_deltas_then_the_saved_entry(client, user):
+    response = client.post("/analyze-journal/stream", json={"journal_text": "Streamed entry about the sea."}, headers=user)
+    assert response.status_code == 200
+
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+
+    kinds = [event for event, _ in events]
+    assert kinds[-1] == "result" and set(kinds[:-1]) == {"field"} and len(kinds) > 2
+    result = events[-1][1]
+    streamed = {field: "" for field in ("mood", "summary", "reflection")}
+    for _, data in events[:-1]:
+        streamed[data["field"]] += data["delta"]
+    assert streamed == {field: result[field] for field in streamed}
+    assert result["id"] in [entry["id"] for entry in client.get("/journal-entries", headers=user).json()]
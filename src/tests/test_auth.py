@@ -0,0 +1,31 @@
+from conftest import make_token
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_token_signed_with_the_local_jwks_is_accepted(client):
+    assert client.get("/journal-entries", headers=bearer(make_token("auth0|auth-ok"))).status_code == 200
+
+
+def test_missing_expired_and_unknown_key_tokens_are_rejected(client):
+    assert client.get("/journal-entries").status_code in (401, 403)
+
+    response = client.get("/journal-entries", headers=bearer(make_token("auth0|auth-expired", expires_in=-60)))
+    assert response.status_code == 401 and response.json()["detail"] == "Token expired"
+
+    response = client.get("/journal-entries", headers=bearer(make_token("auth0|auth-kid", kid="rotated-away")))
+    assert response.status_code == 401 and response.json()["detail"] == "Public key not found"
+
+
+def test_unknown_kids_refetch_the_jwks_at_most_once_per_interval(client):
+    import main
+
+    before = main.jwks_store.stats()
+    for attempt in range(3):
+        client.get("/journal-entries", headers=bearer(make_token("auth0|auth-flood", kid=f"forged-{attempt}")))
+    after = main.jwks_store.stats()
+
+    assert after["forced_fetches"] - before["forced_fetches"] <= 1
+    assert after["throttled"] - before["throttled"] >= 2
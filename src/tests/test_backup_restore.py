@@ -0,0 +1,87 @@
+import os
+import time
+
+from sqlalchemy import func, select, text
+
+import backup_db
+from backup_db import backup_database, verify_backup
+from db import SessionLocal, engine
+from models import JournalAnalysis, RestoreLog
+from restore_db import ManifestBackup, restore_database
+
+
+def entry_ids(client, headers):
+    return sorted(entry["id"] for entry in client.get("/journal-entries", params={"fields": "id"}, headers=headers).json())
+
+
+def test_restore_brings_back_a_backup(client, user):
+    for index in range(3):
+        client.post("/analyze-journal", json={"journal_text": f"Backed up entry {index}."}, headers=user)
+    ids = entry_ids(client, user)
+    etag = client.get("/journal-entries", headers=user).headers["ETag"]
+
+    backup_path = backup_database()
+    assert backup_path is not None and verify_backup(backup_path) == []
+    backup_name = os.path.basename(os.path.normpath(backup_path))
+
+    assert client.delete(f"/delete-journal/{ids[0]}", headers=user).status_code == 200
+    assert entry_ids(client, user) == ids[1:]
+
+    assert restore_database(backup_name, dry_run=True)
+    assert entry_ids(client, user) == ids[1:]
+
+    assert restore_database(backup_name)
+
+    assert entry_ids(client, user) == ids
+    with SessionLocal() as session:
+        assert session.scalar(select(func.count()).select_from(JournalAnalysis).where(JournalAnalysis.id == ids[0])) == 1
+        assert session.scalar(select(func.count()).select_from(RestoreLog)) >= 1
+    # Clients holding an ETag from before the backup must not get a 304 for restored data
+    assert client.get("/journal-entries", headers={**user, "If-None-Match": etag}).status_code == 200
+
+
+def test_a_failed_load_leaves_the_database_unchanged(client, user, tmp_path):
+    for index in range(2):
+        client.post("/analyze-journal", json={"journal_text": f"Entry {index} that must survive."}, headers=user)
+    backup_path = backup_database(backup_dir=str(tmp_path))
+    client.post("/analyze-journal", json={"journal_text": "Entry written after the backup."}, headers=user)
+    ids = entry_ids(client, user)
+
+    # The last table to load fails on a constraint after the others were cleared and loaded
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TRIGGER reject_restore BEFORE INSERT ON analysis_cache "
+            "BEGIN SELECT RAISE(ABORT, 'constraint failed'); END"
+        ))
+    try:
+        assert not restore_database(backup_path)
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TRIGGER reject_restore"))
+
+    assert entry_ids(client, user) == ids
+
+
+def test_incrementals_hold_only_changes_and_replay_on_top_of_the_full_backup(client, user, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup_db, "BACKUP_INCREMENTAL_OVERLAP", 0)
+    for index in range(3):
+        client.post("/analyze-journal", json={"journal_text": f"Entry {index} before the full backup."}, headers=user)
+    kept, deleted, other = entry_ids(client, user)
+    full_path = backup_database(backup_dir=str(tmp_path))
+    time.sleep(1)  # Backups are named by the second
+
+    added = client.post("/analyze-journal", json={"journal_text": "Entry after the full backup."}, headers=user).json()["id"]
+    assert client.delete(f"/delete-journal/{deleted}", headers=user).status_code == 200
+    incremental_path = backup_database(backup_dir=str(tmp_path), incremental=True)
+    assert incremental_path is not None and verify_backup(incremental_path) == []
+
+    incremental = ManifestBackup(incremental_path)
+    assert incremental.kind == "incremental" and incremental.base == ManifestBackup(full_path).name
+    assert [row["id"] for row in incremental.iter_rows("journal_analysis")] == [added]
+    assert {(row["table_name"], row["row_id"]) for row in incremental.iter_deletions()} >= {
+        ("journal_analysis", deleted), ("journal_embeddings", deleted),
+    }
+
+    client.post("/analyze-journal", json={"journal_text": "Entry after the incremental backup."}, headers=user)
+    assert restore_database(incremental_path)
+    assert entry_ids(client, user) == [kept, other, added]
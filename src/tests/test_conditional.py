@@ -0,0 +1,48 @@
+import pytest
+
+from conditional import etag_matches, user_etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        ('W/"1-7-42"', True),
+        ('"1-7-42"', True),                  # Weak comparison ignores W/
+        ('"other", W/"1-7-42"', True),
+        ("*", True),
+        ('W/"1-7-41"', False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, 'W/"1-7-42"') is matches
+
+
+def test_etag_covers_user_version_and_parts():
+    assert user_etag(7, 42) != user_etag(8, 42)
+    assert user_etag(7, 42) != user_etag(7, 43)
+    assert user_etag(7, 42, "2026-01") != user_etag(7, 42, "2026-02")
+
+
+def test_not_modified_until_the_user_writes(client, user):
+    client.post("/analyze-journal", json={"journal_text": "Conditional GET entry."}, headers=user)
+
+    first = client.get("/journal-entries", headers=user)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    revalidated = client.get("/journal-entries", headers={**user, "If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    summary = client.get("/monthly-summary", headers=user)
+    assert client.get("/monthly-summary", headers={**user, "If-None-Match": summary.headers["ETag"]}).status_code == 304
+
+    entry_id = first.json()[0]["id"]
+    assert client.delete(f"/delete-journal/{entry_id}", headers=user).status_code == 200
+
+    after_write = client.get("/journal-entries", headers={**user, "If-None-Match": etag})
+    assert after_write.status_code == 200 and after_write.headers["ETag"] != etag
+    assert client.get("/monthly-summary", headers={**user, "If-None-Match": summary.headers["ETag"]}).status_code == 200
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+import db
+from db import MeteredQueuePool, PoolMetrics, _engine_options, async_database_url, pool_stats
+
+
+class IsolatedPool(MeteredQueuePool):
+    metrics = PoolMetrics()
+
+
+def test_server_databases_get_the_pool_settings():
+    options = _engine_options(make_url("postgresql://user@db/journal"), MeteredQueuePool)
+    assert options["poolclass"] is MeteredQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (db.DB_POOL_SIZE, db.DB_MAX_OVERFLOW)
+    assert options["pool_pre_ping"] == db.DB_POOL_PRE_PING and options["pool_recycle"] == db.DB_POOL_RECYCLE
+
+    # In-memory SQLite keeps its single-connection pool
+    assert "poolclass" not in _engine_options(make_url("sqlite://"), MeteredQueuePool)
+
+
+def test_async_urls_swap_the_driver():
+    assert str(async_database_url("sqlite:///journal.db")) == "sqlite+aiosqlite:///journal.db"
+    url = async_database_url("postgresql://user@db/journal?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg" and dict(url.query) == {"ssl": "require"}
+    with pytest.raises(ValueError):
+        async_database_url("mysql://user@db/journal")
+
+
+def test_checkout_waits_and_timeouts_are_recorded(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=IsolatedPool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    try:
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        stats = pool_stats(engine.pool)
+    finally:
+        engine.dispose()
+
+    assert stats["pool"] == "IsolatedPool"
+    assert stats["checkouts"] == 1 and stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0.05
+    assert stats["size"] == 1 and stats["checked_out"] == 0
+
+
+def test_startup_warms_the_pool_and_health_reports_it(client):
+    health = client.get("/health").json()
+    assert health["db_pool"]["pool"] == "MeteredAsyncQueuePool"
+    assert health["db_pool"]["checked_in"] >= 1
+
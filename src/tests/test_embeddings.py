@@ -0,0 +1,78 @@
+import numpy as np
+from sqlalchemy import func, select
+
+from backup_db import backup_database
+from db import SessionLocal
+from embeddings import HashingEmbedder, UserVectors, _VectorBlock, vector_index
+from models import JournalEmbedding
+from restore_db import restore_database
+
+
+def unit_vectors(count, dimensions=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder(dimensions=64)
+    first, second = embedder.embed_sync(["A walk by the sea", "A walk by the sea"])
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+
+def test_appended_vectors_are_searched_like_loaded_ones():
+    vectors = unit_vectors(40)
+    moods = ["happy", "sad"] * 20
+    loaded = UserVectors(np.arange(1, 41), moods, vectors)
+    appended = UserVectors(np.arange(1, 21), moods[:20], vectors[:20])
+    for start in range(20, 40, 5):
+        appended.append(np.arange(start + 1, start + 6), moods[start:start + 5], vectors[start:start + 5])
+
+    assert len(appended) == 40
+    for query in unit_vectors(5, seed=1):
+        assert appended.top_k(query, 5) == loaded.top_k(query, 5)
+        assert appended.top_k(query, 3, mood="sad") == loaded.top_k(query, 3, mood="sad")
+
+    best_id, _ = loaded.top_k(vectors[9], 1)[0]
+    assert best_id == 10
+    assert 10 not in [entry_id for entry_id, _ in loaded.top_k(vectors[9], 5, exclude_id=10)]
+
+
+def test_removed_vectors_are_masked_then_compacted():
+    block = _VectorBlock(np.arange(1, 33), unit_vectors(32))
+    block.remove(5)
+    assert block.size == 32 and block.position(5) is None and block.live() == 31
+
+    for entry_id in range(6, 10):  # Past COMPACT_RATIO of the block
+        block.remove(entry_id)
+    ids, _, removed = block.snapshot()
+    assert block.size == 27 and not removed and not set(range(5, 10)) & set(ids.tolist())
+
+
+def test_out_of_order_append_replaces_a_re_embedded_entry():
+    vectors = unit_vectors(4)
+    block = _VectorBlock([1, 2, 3], vectors[:3])
+    block.append([2], vectors[3:])
+    ids, matrix, _ = block.snapshot()
+    assert ids.tolist() == [1, 2, 3]
+    assert np.array_equal(matrix[block.position(2)], vectors[3])
+
+
+def embedding_count():
+    with SessionLocal() as session:
+        return session.scalar(select(func.count()).select_from(JournalEmbedding))
+
+
+def test_embeddings_survive_a_backup_and_restore(client, user, tmp_path):
+    texts = ["Rainy walk by the harbour.", "Rainy walk along the harbour wall.", "Quiet evening with a book."]
+    ids = [client.post("/analyze-journal", json={"journal_text": text}, headers=user).json()["id"] for text in texts]
+    similar = client.get(f"/journal-entries/{ids[0]}/similar", headers=user).json()
+    assert similar[0]["id"] == ids[1]
+
+    stored = embedding_count()
+    backup_path = backup_database(backup_dir=str(tmp_path))
+    assert restore_database(backup_path)
+    vector_index.clear()
+
+    assert embedding_count() == stored
+    assert client.get(f"/journal-entries/{ids[0]}/similar", headers=user).json() == similar
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from journal_entries import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 4, 5, 6, 7, 890123)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "Zm9v", encode_cursor(datetime(2026, 1, 1), 1)[:-3]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def write_entries(client, headers, count):
+    for index in range(count):
+        response = client.post("/analyze-journal", json={"journal_text": f"Entry {index} of a paged journal."}, headers=headers)
+        assert response.status_code == 200
+
+
+def test_pages_follow_the_next_cursor_to_the_last_entry(client, user):
+    write_entries(client, user, 5)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/journal-entries", params={"limit": 2, **({"cursor": cursor} if cursor else {})}, headers=user)
+        assert response.status_code == 200
+        seen += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert [entry["id"] for entry in seen] == sorted((entry["id"] for entry in seen), reverse=True)
+
+
+def test_fields_and_bad_cursor(client, user):
+    write_entries(client, user, 1)
+
+    entries = client.get("/journal-entries", params={"fields": "mood"}, headers=user).json()
+    assert set(entries[0]) == {"id", "created_at", "mood"}
+    assert client.get("/journal-entries", params={"cursor": "nope"}, headers=user).status_code == 400
+
+
+def test_timezone_aware_date_filters(client, user):
+    write_entries(client, user, 1)
+
+    response = client.get("/journal-entries", params={"from": "2000-01-01T00:00:00+09:00", "to": "2999-01-01T00:00:00Z"}, headers=user)
+    assert response.status_code == 200 and len(response.json()) == 1
+    response = client.get("/journal-entries", params={"to": "2000-01-01T00:00:00Z"}, headers=user)
+    assert response.status_code == 200 and response.json() == []
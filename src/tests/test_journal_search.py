@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import auth_headers
+from journal_entries import InvalidCursor
+from journal_search import decode_search_cursor, encode_search_cursor, fts5_query
+
+
+def add_entry(client, user, text):
+    return client.post("/analyze-journal", json={"journal_text": text}, headers=user).json()["id"]
+
+
+def search(client, user, q, **params):
+    response = client.get("/journal-entries/search", params={"q": q, **params}, headers=user)
+    assert response.status_code == 200
+    return response.json(), response.headers.get("X-Next-Cursor")
+
+
+def test_queries_and_cursors_carry_no_fts5_syntax():
+    assert fts5_query('tea AND "biscuits" -rain*') == '"tea" "AND" "biscuits" "rain"'
+    assert fts5_query("?!") == ""
+    assert decode_search_cursor(encode_search_cursor(40)) == 40
+    with pytest.raises(InvalidCursor):
+        decode_search_cursor("not-a-cursor")
+
+
+def test_matches_come_with_snippets_and_follow_deletes(client, user):
+    lighthouse = add_entry(client, user, "Walked to the lighthouse at dawn and watched the ferries.")
+    both = add_entry(client, user, "The lighthouse keeper showed us the lighthouse lamp.")
+    add_entry(client, user, "Stayed in and read all afternoon.")
+
+    results, _ = search(client, user, "lighthouse")
+    assert {result["id"] for result in results} == {lighthouse, both}
+    assert all("**lighthouse**" in result["snippet"].lower() for result in results)
+    assert [result["rank"] for result in results] == sorted((result["rank"] for result in results), reverse=True)
+    # Every word has to match
+    assert [result["id"] for result in search(client, user, "lighthouse keeper")[0]] == [both]
+
+    client.delete(f"/delete-journal/{both}", headers=user)
+    assert [result["id"] for result in search(client, user, "lighthouse")[0]] == [lighthouse]
+    assert search(client, auth_headers("auth0|someone-else"), "lighthouse")[0] == []
+    assert search(client, user, "?!") == ([], None)
+
+
+def test_pages_follow_the_cursor(client, user):
+    ids = {add_entry(client, user, f"Orchard visit number {index}.") for index in range(5)}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        results, cursor = search(client, user, "orchard", limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [result["id"] for result in results]
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3 and sorted(seen) == sorted(ids)
+
+    response = client.get("/journal-entries/search", params={"q": "orchard", "cursor": "bogus"}, headers=user)
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import JWKS_PATH, KID
+from jwks_store import JWKSKeyStore
+
+
+class SlowJWKSStore(JWKSKeyStore):
+    """Key store reading the test JWKS slowly, or failing while `down` is set"""
+
+    def __init__(self, **options):
+        super().__init__(JWKS_PATH, background_refresh=False, **options)
+        self.loads = 0
+        self.down = False
+
+    def _load_jwks(self):
+        self.loads += 1
+        time.sleep(0.05)
+        if self.down:
+            raise ConnectionError("JWKS endpoint unreachable")
+        with open(JWKS_PATH) as f:
+            return json.load(f)
+
+
+def test_concurrent_stale_lookups_share_one_fetch():
+    store = SlowJWKSStore()
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(store.get_key(KID))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.loads == 1 and store.stats()["fetches"] == 1
+    assert len(keys) == 10 and None not in keys
+
+
+def test_failed_refresh_serves_cached_keys_and_backs_off():
+    store = SlowJWKSStore(ttl=0.01, min_refetch_interval=60)
+    key = store.get_key(KID)
+    time.sleep(0.02)
+    store.down = True
+
+    for _ in range(5):
+        assert store.get_key(KID) is key
+    assert store.loads == 2 and store.stats()["failed_fetches"] == 1
+
+
+def test_without_cached_keys_the_error_is_raised_until_the_retry():
+    store = SlowJWKSStore(min_refetch_interval=0.1)
+    store.down = True
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            store.get_key(KID)
+    assert store.loads == 1
+
+    store.down = False
+    time.sleep(0.1)
+    assert store.get_key(KID) is not None and store.loads == 2
@@ -0,0 +1,81 @@
+import json
+import logging
+import queue
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import async_engine, engine
+from logging_config import ContextFilter, JsonFormatter, _ContextQueueHandler, request_id_var
+
+JOURNAL_TEXT = "Dear diary, nobody else should read this line."
+
+
+@pytest.fixture
+def log_lines():
+    """A logger going through the same handler, filter and formatter as configure_logging"""
+    records = queue.SimpleQueue()
+    handler = _ContextQueueHandler(records)
+    handler.addFilter(ContextFilter(sample_rate=0))
+    test_logger = logging.getLogger("tests.logging")
+    test_logger.addHandler(handler)
+    test_logger.setLevel(logging.DEBUG)
+    test_logger.propagate = False
+
+    def lines():
+        formatter = JsonFormatter()
+        output = []
+        while not records.empty():
+            output.append(formatter.format(records.get_nowait()))
+        return output
+
+    yield test_logger, lines
+    test_logger.removeHandler(handler)
+
+
+def test_journal_fields_are_replaced_by_their_length(log_lines):
+    test_logger, lines = log_lines
+    test_logger.info("Entry saved", extra={"journal_text": JOURNAL_TEXT, "user_id": 3})
+
+    [line] = lines()
+    entry = json.loads(line)
+    assert entry["journal_text"] == f"[REDACTED len={len(JOURNAL_TEXT)}]"
+    assert entry["user_id"] == 3 and JOURNAL_TEXT not in line
+
+
+def test_tokens_in_messages_are_masked(log_lines):
+    test_logger, lines = log_lines
+    test_logger.warning("Rejected Authorization: Bearer abc.def.ghi and eyJhbGciOi.eyJzdWIi.c2ln")
+
+    [line] = lines()
+    assert json.loads(line)["msg"] == "Rejected Authorization: [REDACTED] and [REDACTED]"
+
+
+def test_request_id_is_stamped_and_sampled_records_are_dropped(log_lines):
+    test_logger, lines = log_lines
+    token = request_id_var.set("req-42")
+    try:
+        test_logger.info("Kept")
+        test_logger.debug("Per-request detail", extra={"sample": True})
+    finally:
+        request_id_var.reset(token)
+
+    [line] = lines()
+    assert json.loads(line)["request_id"] == "req-42"
+
+
+def test_database_errors_dont_log_statement_parameters(log_lines):
+    test_logger, lines = log_lines
+    with pytest.raises(SQLAlchemyError) as error:
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO no_such_table (journal_text) VALUES (:journal_text)"), {"journal_text": JOURNAL_TEXT})
+    test_logger.error("Database error saving journal entry: %s", error.value)
+    try:
+        raise error.value
+    except SQLAlchemyError:
+        test_logger.exception("Error in analyze_journal")
+
+    output = "\n".join(lines())
+    assert "no_such_table" in output and JOURNAL_TEXT not in output
+    assert async_engine.sync_engine.hide_parameters
@@ -0,0 +1,77 @@
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, StartupTimer, Summary, stage_timer
+
+
+@pytest.fixture(autouse=True)
+def unregistered():
+    """Metrics made by a test don't stay in the process-wide registry"""
+    registered = list(metrics._metrics)
+    yield
+    metrics._metrics[:] = registered
+
+
+def test_counter_renders_escaped_labels_and_checks_names():
+    counter = Counter("test_events_total", "Events", ["kind"])
+    counter.inc(kind='say "hi"\n')
+    counter.inc(2, kind='say "hi"\n')
+
+    assert counter.render()[-1] == 'test_events_total{kind="say \\"hi\\"\\n"} 3'
+    with pytest.raises(ValueError):
+        counter.inc(stage="wrong")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Durations", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    lines = histogram.render()[2:]
+    assert lines == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1.0"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 4.25",
+        "test_seconds_count 4",
+    ]
+
+
+def test_summary_quantiles_cover_the_recent_window_only():
+    summary = Summary("test_latency_seconds", "Latency", quantiles=(0.5, 0.99), window=4)
+    for value in (100.0, 1.0, 2.0, 3.0, 4.0):
+        summary.observe(value)
+
+    lines = summary.render()[2:]
+    assert lines[:2] == ['test_latency_seconds{quantile="0.5"} 3.0', 'test_latency_seconds{quantile="0.99"} 4.0']
+    assert lines[2:] == ["test_latency_seconds_sum 110.0", "test_latency_seconds_count 5"]
+
+
+def test_stage_timer_counts_failed_stages():
+    errors = metrics.STAGE_ERRORS._values.get(("test_stage",), 0)
+    with pytest.raises(RuntimeError):
+        with stage_timer("test_stage"):
+            raise RuntimeError("boom")
+    assert metrics.STAGE_ERRORS._values[("test_stage",)] == errors + 1
+    assert metrics.STAGE_SECONDS._values[("test_stage",)][-1] >= 1
+
+
+def test_startup_timer_records_the_first_request_once():
+    timer = StartupTimer()
+    with timer.phase("warmup"):
+        pass
+    assert timer.record_first_request() and not timer.record_first_request()
+    assert set(timer.snapshot()["phases_seconds"]) == {"warmup"}
+
+
+def test_metrics_endpoint_reports_routes_startup_and_caches(client, user):
+    client.get("/journal-entries", headers=user)
+    client.get("/no-such-route")
+
+    body = client.get("/metrics").text
+    assert 'journal_http_request_duration_seconds_count{method="GET",route="/journal-entries",status="200"}' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'journal_startup_phase_seconds{phase="schema_check"}' in body
+    assert "journal_cold_start_seconds " in body
+    assert 'journal_cache_requests_total{cache="token",result="hit"}' in body
+    assert 'journal_stage_duration_seconds_count{stage="jwks"}' in body
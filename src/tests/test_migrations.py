@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+
+import migrations
+from conftest import BACKEND_DIR
+from migrations import LATEST_VERSION, MIGRATIONS, ensure_schema, migrate, status
+from models import DailyMoodCount
+
+
+@pytest.fixture
+def fresh_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_new_database_gets_every_migration_once(fresh_engine):
+    assert migrate(fresh_engine) == [version for version, _, _ in MIGRATIONS]
+    assert all(applied_at is not None for _, _, applied_at in status(fresh_engine))
+    assert migrate(fresh_engine) == []
+    assert ensure_schema(fresh_engine) == []
+
+
+def test_legacy_database_is_brought_up_to_date(fresh_engine):
+    with fresh_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, auth0_id VARCHAR)"))
+        connection.execute(text(
+            "CREATE TABLE journal_analysis (id INTEGER PRIMARY KEY, user_id INTEGER, mood VARCHAR(100), summary TEXT, reflection TEXT)"
+        ))
+        connection.execute(text("INSERT INTO users (id, auth0_id) VALUES (1, 'auth0|legacy')"))
+        connection.execute(text(
+            "INSERT INTO journal_analysis (id, user_id, mood, summary, reflection) VALUES (1, 1, 'happy', 'Old', 'Entry')"
+        ))
+
+    migrate(fresh_engine)
+
+    with fresh_engine.connect() as connection:
+        columns = {column["name"] for column in inspect(connection).get_columns("journal_analysis")}
+        assert {"journal_text", "created_at", "updated_at"} <= columns
+        assert None not in connection.execute(text("SELECT created_at, updated_at FROM journal_analysis")).one()
+        # The mood counters are seeded from the entries that predate them
+        assert connection.execute(select(func.sum(DailyMoodCount.count))).scalar() == 1
+
+
+def test_outdated_schema_is_refused_without_migrate_on_startup(fresh_engine, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATE_ON_STARTUP", False)
+    with pytest.raises(RuntimeError, match=f"expected {LATEST_VERSION}"):
+        ensure_schema(fresh_engine)
+    assert not inspect(fresh_engine).has_table("users")
+
+
+def test_importing_main_has_no_side_effects(tmp_path):
+    database = tmp_path / "untouched.db"
+    check = (
+        "import logging, threading\n"
+        "handlers = list(logging.getLogger().handlers)\n"
+        "import main, logging_config\n"
+        "assert logging_config._listener is None\n"
+        "assert logging.getLogger().handlers == handlers\n"
+        "assert [t.name for t in threading.enumerate()] == ['MainThread'], threading.enumerate()\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    assert not database.exists()
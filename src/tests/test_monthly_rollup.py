@@ -0,0 +1,121 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import IntegrityError
+
+from db import SessionLocal, advisory_lock
+from migrations import monthly_summary_unique
+from models import DeletedRow, MonthlySummary
+from monthly_rollup import (
+    ROLLUP_LOCK_KEY, previous_month, rollup_month, rollup_progress, run_monthly_rollup, write_summaries,
+)
+
+
+def add_entries(client, user, created_at):
+    entries = [{"journal_text": f"Rolled up entry {index}.", "created_at": day} for index, day in enumerate(created_at)]
+    return client.post("/analyze-journal/batch", json={"entries": entries}, headers=user).json()["results"]
+
+
+def stored_summaries(user_id, month):
+    with SessionLocal() as session:
+        return session.execute(
+            select(MonthlySummary.id, MonthlySummary.daily_data, MonthlySummary.monthly_totals)
+            .where(MonthlySummary.user_id == user_id, MonthlySummary.month == month)
+        ).all()
+
+
+def test_previous_month_crosses_the_year():
+    assert previous_month(date(2026, 1, 15)) == "2025-12"
+    assert previous_month(date(2026, 3, 1)) == "2026-02"
+
+
+def test_rollup_stores_the_summaries_and_reruns_in_place(client, user):
+    results = add_entries(client, user, ["2024-02-03T09:00:00", "2024-02-03T21:00:00", "2024-02-29T12:00:00"])
+    live = client.get("/monthly-summary", params={"month": "2024-02"}, headers=user).json()
+
+    users = rollup_month("2024-02", chunk_size=1)
+    assert users >= 1
+    progress = rollup_progress.snapshot()
+    assert progress["state"] == "done" and progress["month"] == "2024-02"
+    assert progress["users_done"] == progress["users_total"] == users
+
+    [(row_id, daily_data, monthly_totals)] = stored_summaries(live["user_id"], "2024-02")
+    assert daily_data == live["daily_data"] and monthly_totals == live["monthly_totals"]
+
+    # Rerunning rewrites the same row
+    assert rollup_month("2024-02") == users
+    assert [row[0] for row in stored_summaries(live["user_id"], "2024-02")] == [row_id]
+
+    # Once the user's entries for the month are gone, so is their summary
+    for result in results:
+        client.delete(f"/delete-journal/{result['id']}", headers=user)
+    rollup_month("2024-02")
+    assert stored_summaries(live["user_id"], "2024-02") == []
+    with SessionLocal() as session:
+        assert session.scalar(select(DeletedRow.id).filter_by(table_name="monthly_summaries", row_id=row_id)) is not None
+
+
+def test_invalid_months_are_refused():
+    with pytest.raises(ValueError):
+        rollup_month("2024-13")
+
+
+def test_advisory_lock_is_exclusive_without_postgresql():
+    with advisory_lock(12345) as first:
+        with advisory_lock(12345) as second:
+            assert first and not second
+    with advisory_lock(12345) as again:
+        assert again
+
+
+def test_a_run_is_skipped_while_another_holds_the_lock(client):
+    skipped = rollup_progress.runs["skipped"]
+    with advisory_lock(ROLLUP_LOCK_KEY):
+        assert run_monthly_rollup("2024-02") is None
+    assert rollup_progress.runs["skipped"] == skipped + 1
+    assert run_monthly_rollup("2024-02") is not None
+
+
+def test_summaries_are_unique_per_user_and_month_and_writes_upsert(client, user):
+    user_id = client.get("/monthly-summary", params={"month": "2023-07"}, headers=user).json()["user_id"]
+    first = {"daily_data": {"2023-07-01": {"calm": 1}}, "monthly_totals": {"calm": 1}}
+    second = {"daily_data": {"2023-07-01": {"calm": 2}}, "monthly_totals": {"calm": 2}}
+
+    with SessionLocal() as session:
+        write_summaries(session, "2023-07", {user_id: first})
+        session.commit()
+        write_summaries(session, "2023-07", {user_id: second})
+        session.commit()
+    [(_, daily_data, monthly_totals)] = stored_summaries(user_id, "2023-07")
+    assert (daily_data, monthly_totals) == (second["daily_data"], second["monthly_totals"])
+
+    with SessionLocal() as session:
+        session.add(MonthlySummary(user_id=user_id, month="2023-07", **first))
+        with pytest.raises(IntegrityError):
+            session.commit()
+
+
+def test_migration_keeps_the_latest_duplicate(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'duplicates.db'}")
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE monthly_summaries (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, "
+                "daily_data JSON NOT NULL, monthly_totals JSON NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL)"
+            ))
+            connection.execute(text(
+                "INSERT INTO monthly_summaries VALUES "
+                "(1, 1, '2023-07', '{}', '{}', '2023-08-01', '2023-08-01'), "
+                "(2, 1, '2023-07', '{}', '{}', '2023-08-01', '2023-08-03'), "
+                "(3, 1, '2023-07', '{}', '{}', '2023-08-01', '2023-08-02'), "
+                "(4, 2, '2023-07', '{}', '{}', '2023-08-01', '2023-08-01')"
+            ))
+            monthly_summary_unique(connection)
+            assert connection.execute(text("SELECT id FROM monthly_summaries ORDER BY id")).scalars().all() == [2, 4]
+            with pytest.raises(IntegrityError):
+                connection.execute(text(
+                    "INSERT INTO monthly_summaries VALUES (5, 1, '2023-07', '{}', '{}', '2023-08-04', '2023-08-04')"
+                ))
+    finally:
+        engine.dispose()
@@ -0,0 +1,57 @@
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import select
+
+from db import SessionLocal
+from models import DailyMoodCount
+from mood_counts import apply_mood_count_deltas, month_bounds, rebuild_mood_counts
+
+
+def add_entries(client, user, created_at):
+    entries = [{"journal_text": f"Counted entry {index}.", "created_at": day} for index, day in enumerate(created_at)]
+    return client.post("/analyze-journal/batch", json={"entries": entries}, headers=user).json()["results"]
+
+
+def counters(user_id):
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(DailyMoodCount.day, DailyMoodCount.mood, DailyMoodCount.count).where(DailyMoodCount.user_id == user_id)
+        ).all()
+    return {(day, mood): count for day, mood, count in rows}
+
+
+def test_month_bounds_cross_the_year():
+    assert month_bounds("2025-12") == (date(2025, 12, 1), date(2026, 1, 1))
+
+
+def test_summary_follows_writes_and_deletes(client, user):
+    results = add_entries(client, user, ["2025-03-04T10:00:00", "2025-03-04T18:00:00", "2025-03-30T23:59:00"])
+    expected = Counter((result["mood"], day) for result, day in zip(results, ["2025-03-04", "2025-03-04", "2025-03-30"]))
+
+    summary = client.get("/monthly-summary", params={"month": "2025-03"}, headers=user).json()
+    assert summary["total_entries"] == 3
+    assert {(mood, day): count for day, moods in summary["daily_data"].items() for mood, count in moods.items()} == expected
+
+    for result in results:
+        assert client.delete(f"/delete-journal/{result['id']}", headers=user).status_code == 200
+    summary = client.get("/monthly-summary", params={"month": "2025-03"}, headers=user).json()
+    assert summary["total_entries"] == 0 and summary["daily_data"] == {}
+    # Counters that drop to zero are deleted rather than kept at 0
+    assert counters(summary["user_id"]) == {}
+
+
+def test_deltas_add_up_and_rebuild_matches_them(client, user):
+    add_entries(client, user, ["2025-05-01T08:00:00", "2025-05-02T08:00:00"])
+    user_id = client.get("/monthly-summary", params={"month": "2025-05"}, headers=user).json()["user_id"]
+    incremental = counters(user_id)
+
+    with SessionLocal() as session:
+        apply_mood_count_deltas(session, user_id, {(date(2025, 5, 1), "curious"): 2})
+        apply_mood_count_deltas(session, user_id, {(date(2025, 5, 1), "curious"): -1})
+        session.commit()
+    assert counters(user_id)[(date(2025, 5, 1), "curious")] == 1
+
+    with SessionLocal() as session:
+        rebuild_mood_counts(session, user_id)
+    assert counters(user_id) == incremental
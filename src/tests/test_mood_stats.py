@@ -0,0 +1,48 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from mood_stats import MOOD_STATS_MAX_BUCKETS, bucket_starts
+
+
+def test_day_buckets_cover_a_partial_last_day():
+    buckets = bucket_starts(datetime(2026, 2, 27, 15), datetime(2026, 3, 2, 0, 0, 1), "day")
+    assert buckets == [date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 1), date(2026, 3, 2)]
+
+
+def test_exclusive_end_at_midnight_adds_no_bucket():
+    assert bucket_starts(datetime(2026, 3, 1), datetime(2026, 3, 3), "day") == [date(2026, 3, 1), date(2026, 3, 2)]
+
+
+def test_week_buckets_start_on_monday():
+    # 2026-01-01 is a Thursday
+    assert bucket_starts(datetime(2026, 1, 1), datetime(2026, 1, 13), "week") == [
+        date(2025, 12, 29), date(2026, 1, 5), date(2026, 1, 12),
+    ]
+
+
+def test_month_buckets_cross_the_year():
+    assert bucket_starts(datetime(2025, 11, 15), datetime(2026, 2, 1), "month") == [
+        date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1),
+    ]
+
+
+def test_invalid_ranges():
+    with pytest.raises(ValueError):
+        bucket_starts(datetime(2026, 3, 2), datetime(2026, 3, 1), "day")
+    with pytest.raises(ValueError):
+        bucket_starts(datetime(2000, 1, 1), datetime(2000, 1, 1) + timedelta(days=MOOD_STATS_MAX_BUCKETS + 1), "day")
+
+
+def test_endpoint_accepts_timezone_aware_bounds(client, user):
+    client.post("/analyze-journal", json={"journal_text": "Mood stats entry."}, headers=user)
+
+    response = client.get("/mood-stats", params={"from": "2000-01-01T00:00:00Z", "granularity": "month"}, headers=user)
+    assert response.status_code == 200
+    assert sum(response.json()["totals"]) == 1
+
+    response = client.get("/mood-stats", params={"from": "2026-03-01T00:00:00+09:00", "to": "2026-03-02T00:00:00+09:00"}, headers=user)
+    assert response.status_code == 200
+    assert response.json()["from"] == "2026-02-28T15:00:00"
+
+    assert client.get("/mood-stats", params={"to": "0001-01-01T00:00:00+01:00"}, headers=user).status_code == 400
@@ -0,0 +1,34 @@
+from datetime import date, datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from responses import JournalEntryResponse, MonthlySummaryResponse, OrjsonResponse
+
+
+def test_orjson_renders_what_jsonable_encoder_did():
+    content = [
+        {"id": 1, "created_at": datetime(2025, 3, 4, 18, 30, 5, 123456), "mood": "grateful", "summary": "Café au lait ☕"},
+        {"id": 2, "created_at": datetime(2025, 3, 5, 7, 0), "mood": None, "daily_data": {"2025-03-05": {"calm": 2}}},
+        {"day": date(2025, 3, 6), "tags": []},
+    ]
+    assert OrjsonResponse(content).body == JSONResponse(jsonable_encoder(content)).body
+
+
+def test_list_endpoints_match_their_response_models(client, user):
+    client.post("/analyze-journal", json={"journal_text": "Día tranquilo, té y un paseo junto al río."}, headers=user)
+
+    response = client.get("/journal-entries", headers=user)
+    assert response.headers["content-type"] == "application/json"
+    [entry] = TypeAdapter(List[JournalEntryResponse]).validate_python(response.json())
+    assert entry.journal_text == "Día tranquilo, té y un paseo junto al río."
+    assert "Día tranquilo".encode("utf-8") in response.content
+
+    month = entry.created_at.strftime("%Y-%m")
+    summary = client.get("/monthly-summary", params={"month": month}, headers=user).json()
+    assert MonthlySummaryResponse.model_validate(summary).total_entries == 1
+
+    schema = client.get("/openapi.json").json()["components"]["schemas"]
+    assert {"JournalEntryResponse", "MonthlySummaryResponse", "JournalSearchResult"} <= set(schema)
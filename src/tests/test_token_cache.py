@@ -0,0 +1,57 @@
+import time
+
+from conftest import make_token
+from token_cache import VerifiedTokenCache
+
+
+def payload(expires_in=3600, sub="auth0|cached"):
+    return {"sub": sub, "exp": time.time() + expires_in}
+
+
+def test_verified_payloads_are_served_until_they_expire():
+    cache = VerifiedTokenCache(maxsize=10)
+    cache.put("token-a", payload())
+    cache.put("token-b", payload(expires_in=0.05))
+
+    assert cache.get("token-a")["sub"] == "auth0|cached"
+    assert cache.get("token-b") is not None
+    time.sleep(0.06)
+    assert cache.get("token-b") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_tokens_without_a_future_exp_are_not_cached():
+    cache = VerifiedTokenCache()
+    cache.put("no-exp", {"sub": "auth0|x"})
+    cache.put("expired", payload(expires_in=-1))
+    cache.put("string-exp", {"sub": "auth0|x", "exp": "9999999999"})
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_tokens_are_evicted_first():
+    cache = VerifiedTokenCache(maxsize=2)
+    cache.put("first", payload())
+    cache.put("second", payload())
+    cache.get("first")
+    cache.put("third", payload())
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None and cache.get("third") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_raw_tokens_are_not_kept():
+    cache = VerifiedTokenCache()
+    cache.put("secret-token", payload())
+    assert "secret-token" not in repr(cache._entries)
+
+
+def test_repeated_requests_verify_the_token_once(client):
+    import main
+
+    headers = {"Authorization": f"Bearer {make_token('auth0|token-cache')}"}
+    client.get("/journal-entries", headers=headers)
+    hits = main.token_cache.hits
+    for _ in range(3):
+        assert client.get("/journal-entries", headers=headers).status_code == 200
+    assert main.token_cache.hits - hits == 3
@@ -0,0 +1,74 @@
+import time
+
+from sqlalchemy import func, select
+
+from conftest import auth_headers, run_with_sessions
+from models import User
+from repositories import UserRepository
+from user_cache import CachedUser, InMemoryUserCacheBackend, UserIdentityCache
+
+
+def run_in_session(work):
+    async def run(session_factory):
+        async with session_factory() as session:
+            return await work(session)
+    return run_with_sessions(run)
+
+
+def test_backend_expires_and_evicts_entries():
+    backend = InMemoryUserCacheBackend(maxsize=2)
+    backend.set("a", 1, ttl=60)
+    backend.set("b", 2, ttl=0.05)
+    backend.get("a")
+    backend.set("c", 3, ttl=60)  # Evicts b, the least recently used
+    assert backend.get("b") is None and len(backend) == 2
+
+    backend.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get("d") is None and backend.get("c") == 3
+
+
+def test_identity_cache_counts_hits_and_misses():
+    cache = UserIdentityCache(ttl=60)
+    user = CachedUser(id=7, auth0_id="auth0|cache")
+    assert cache.get(user.auth0_id) is None
+    cache.set(user)
+    assert cache.get(user.auth0_id) is user
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_get_or_create_returns_the_same_row_every_time(client):
+    async def work(session):
+        repository = UserRepository(session)
+        first = await repository.get_or_create("auth0|upsert", email="upsert@example.com", name="Upsert")
+        second = await repository.get_or_create("auth0|upsert", email="upsert@example.com", name="Upsert")
+        await session.commit()
+        rows = await session.scalar(select(func.count()).select_from(User).where(User.auth0_id == "auth0|upsert"))
+        return first, second, rows
+
+    first, second, rows = run_in_session(work)
+    assert first == second and rows == 1
+    assert first.email == "upsert@example.com"
+
+
+def test_an_email_taken_by_another_account_is_dropped(client):
+    async def work(session):
+        repository = UserRepository(session)
+        owner = await repository.get_or_create("auth0|email-owner", email="shared@example.com")
+        second = await repository.get_or_create("google-oauth2|email-second", email="shared@example.com")
+        await session.commit()
+        return owner, second
+
+    owner, second = run_in_session(work)
+    assert owner.id != second.id
+    assert owner.email == "shared@example.com" and second.email is None
+
+
+def test_requests_after_the_first_are_served_from_the_cache(client):
+    import main
+
+    headers = auth_headers("auth0|user-cache-api")
+    client.get("/journal-entries", headers=headers)
+    hits = main.user_cache.hits
+    client.get("/journal-entries", headers=headers)
+    assert main.user_cache.hits == hits + 1